@@ -1,162 +1,626 @@
-from flask import Flask, request, jsonify, render_template
+from flask import (Flask, Response, abort, request, jsonify, render_template, send_file, send_from_directory,
+                   stream_with_context)
 from flask_cors import CORS
+import json
 import os
+import time
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from disaster_model import DisasterFundModel
+from reallocation import ReallocationPolicy
 from tax_model import TaxOptimizationModel
 from budget_forecast_model import BudgetForecastModel
+from historical_data import HistoricalBudgetStore
+from model_store import ModelStore
+from model_registry import DEFAULT_TENANT, ModelRegistry, TenantModels, UnknownTenantError, directory_size
+from training_jobs import TrainingJobQueue
+from response_cache import ResponseCache
+from sweep import SweepEngine
+from metrics import MetricsRegistry, cache_collector, registry_collector
+from documents import ENCODINGS, DocumentLibrary
+from search_index import DocumentIndex
+from pdf_tables import AllocationTableExtractor, training_frame
+from taxonomy import DEFAULT_SECTORS, LEAVES, SectorTaxonomy
+from exports import EXPORT_FORMATS, AllocationExporter, available_formats, encode
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+# The front end lives next to the code, so only these files are served from the app directory;
+# data, tenant files, model artifacts and document caches kept there are never public
+STATIC_FILES = ('index.html', 'script.js', 'app.js', 'styles.css', 'style.css')
+
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize the disaster model with sample training data
-def initialize_disaster_model():
-    model = DisasterFundModel()
-    
-    # Sample historical data for training
-    sample_data = {
-        'Severity(1-10)': [3, 5, 7, 9, 4, 6, 8, 2],
-        'Estimated_Damage_Cr': [500, 1000, 2000, 5000, 700, 1500, 3000, 300],
-        'Budget_Allocated_Cr': [200, 600, 1500, 4500, 350, 1000, 2500, 100],
-    }
-    
-    df = pd.DataFrame(sample_data)
-    model.train_models(df)
-    return model
+# Trained models are saved here and reused until their training data changes
+model_store = ModelStore(os.environ.get(
+    'MODEL_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_artifacts')
+))
+
+# Published budget PDFs, with the precompressed copies written by `python documents.py` in DOCUMENT_CACHE_DIR
+document_library = DocumentLibrary(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf folder'),
+    cache_dir=os.environ.get(
+        'DOCUMENT_CACHE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'document_cache')
+    )
+)
+if os.environ.get('DOCUMENT_PRECOMPRESS', '0') == '1':
+    # Opt-in: compressing every PDF on each worker's start is slow, so it is normally a build step
+    document_library.precompress()
+# Full-text page index over the documents, built by `python search_index.py` (needs pypdf)
+document_index = DocumentIndex(document_library, os.path.join(document_library.cache_dir, 'search'))
+# Seconds between checks of the document folder for added or replaced files
+DOCUMENT_INDEX_CHECK_INTERVAL = float(os.environ.get('DOCUMENT_INDEX_CHECK_INTERVAL', 5))
+
+def run_document_job(job):
+    """Run job(executor) on a process pool of DOCUMENT_INDEX_WORKERS, or inline with one worker."""
+    workers = int(os.environ.get('DOCUMENT_INDEX_WORKERS', 1))
+    if workers <= 1:
+        return job(None)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return job(executor)
+
+if document_index.available and os.environ.get('DOCUMENT_INDEX', '0') == '1':
+    # Opt-in: parse documents never indexed before (normally done by `python search_index.py`)
+    run_document_job(lambda executor: document_index.refresh(executor=executor))
+else:
+    # Load the index files the build step wrote; no PDF is parsed
+    document_index.refresh(extract=False)
+# Seconds browsers may reuse a document before revalidating it with its ETag
+DOCUMENT_MAX_AGE = int(os.environ.get('DOCUMENT_MAX_AGE', 3600))
+# Behind nginx/Apache, hand file bodies to the proxy with X-Sendfile instead of streaming them
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
+# Serve only from saved artifacts: never train at startup and defer the forecast
+# model's scikit-learn/XGBoost estimators (and their imports) to the first prediction
+SERVE_FROM_ARTIFACTS = os.environ.get('SERVE_FROM_ARTIFACTS', '0') == '1'
+
+# Historical sector allocations, loaded once and shared by the forecaster and /api/historical-budget
+historical_store = HistoricalBudgetStore.from_file(os.environ.get(
+    'HISTORICAL_BUDGET_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'historical_budget.csv')
+))
+if os.environ.get('HISTORICAL_BUDGET_FROM_PDFS', '0') == '1' and document_index.available:
+    # Add (or replace) the years whose allocation for every sector is printed in the PDFs
+    allocation_extractor = AllocationTableExtractor(document_index, os.path.join(document_library.cache_dir, 'tables'))
+    pdf_years = training_frame(run_document_job(allocation_extractor.extract), historical_store.sectors)
+    try:
+        if len(pdf_years):
+            historical_store = historical_store.merged(pdf_years)
+        app.logger.info(f"Merged {len(pdf_years)} complete years of allocations from the budget PDFs")
+    except ValueError as e:
+        app.logger.warning(f"Not merging allocations from the budget PDFs: {str(e)}")
+
+# Responses of deterministic endpoints, keyed on their inputs and the model version
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+)
+
+# Route and model latency histograms served at /metrics; METRICS_ENABLED=0 installs no instrumentation
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1') == '1')
+metrics.init_app(app)
+# Instrumented before the models are built so startup training is recorded too
+metrics.instrument_methods(BudgetForecastModel, [
+    'train_models', 'update', 'predict', 'predict_many', 'simulate',
+    'distribute_budget', 'distribute_budget_many', 'sector_proportion_matrix'
+])
+metrics.instrument_methods(DisasterFundModel, [
+    'train_models', 'calculate_disaster_fund', 'adjust_sector_budgets',
+    'calculate_disaster_fund_batch', 'adjust_sector_budgets_batch'
+])
+metrics.instrument_methods(TaxOptimizationModel, [
+    'train_models', 'optimize_taxes', 'project_revenue', 'project_revenue_matrix'
+])
+metrics.instrument_methods(SweepEngine, ['evaluate_chunk'])
 
-# Initialize the tax model with sample training data
-def initialize_tax_model():
-    model = TaxOptimizationModel()
+# Initialize the disaster model, by default with sample training data
+def initialize_disaster_model(df=None):
+    if df is None:
+        # Sample historical data for training
+        sample_data = {
+            'Severity(1-10)': [3, 5, 7, 9, 4, 6, 8, 2],
+            'Estimated_Damage_Cr': [500, 1000, 2000, 5000, 700, 1500, 3000, 300],
+            'Budget_Allocated_Cr': [200, 600, 1500, 4500, 350, 1000, 2500, 100],
+        }
+        df = pd.DataFrame(sample_data)
     
-    # Sample historical tax data for training
-    sample_data = {
-        'Tax_Type': ['Income Tax', 'Corporate Tax', 'GST', 'Property Tax', 'Customs Duty', 'Excise Duty'],
-        'Tax_Rate_Percent': [30, 25, 18, 10, 15, 12],
-        'Revenue_Generated_Cr': [50000, 30000, 45000, 15000, 20000, 18000],
-        'Collection_Efficiency_Percent': [85, 90, 92, 75, 88, 80]
-    }
+    return model_store.load_or_train('disaster', DisasterFundModel, df, allow_train=not SERVE_FROM_ARTIFACTS)
+
+# Initialize the tax model, by default with sample training data
+def initialize_tax_model(df=None):
+    if df is None:
+        # Sample historical tax data for training
+        sample_data = {
+            'Tax_Type': ['Income Tax', 'Corporate Tax', 'GST', 'Property Tax', 'Customs Duty', 'Excise Duty'],
+            'Tax_Rate_Percent': [30, 25, 18, 10, 15, 12],
+            'Revenue_Generated_Cr': [50000, 30000, 45000, 15000, 20000, 18000],
+            'Collection_Efficiency_Percent': [85, 90, 92, 75, 88, 80]
+        }
+        df = pd.DataFrame(sample_data)
     
-    df = pd.DataFrame(sample_data)
-    model.train_models(df)
+    return model_store.load_or_train('tax', TaxOptimizationModel, df, allow_train=not SERVE_FROM_ARTIFACTS)
+
+# 'per_sector' (default) or 'multi_output'; each engine keeps its own artifact
+FORECAST_ENGINE = os.environ.get('FORECAST_ENGINE', 'per_sector')
+FORECAST_ARTIFACT = 'budget_forecast' if FORECAST_ENGINE == 'per_sector' else f'budget_forecast_{FORECAST_ENGINE}'
+
+# Initialize the budget forecast model from a historical budget store
+def initialize_budget_forecast_model(store=None):
+    df = (store or historical_store).training_frame()
+    return model_store.load_or_train(FORECAST_ARTIFACT, BudgetForecastModel, df, engine=FORECAST_ENGINE,
+                                     load_kwargs={'lazy': SERVE_FROM_ARTIFACTS},
+                                     allow_train=not SERVE_FROM_ARTIFACTS)
+
+# Ministries, departments and schemes below the sectors; without a file the taxonomy is just the sectors
+SECTOR_TAXONOMY_PATH = os.environ.get('SECTOR_TAXONOMY_PATH')
+sector_taxonomy = (SectorTaxonomy.from_file(SECTOR_TAXONOMY_PATH) if SECTOR_TAXONOMY_PATH
+                   else SectorTaxonomy.flat(DEFAULT_SECTORS))
+
+# Per-state / per-ministry data: TENANT_DATA_DIR/<tenant>/ holds any of
+# historical_budget.csv (or .parquet), disaster.csv and tax.csv. Models whose
+# data a tenant does not override are shared with the default tenant.
+TENANT_DATA_DIR = os.environ.get(
+    'TENANT_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tenants')
+)
+# Estimated size of the tenant models kept resident before the least recently used are evicted
+MODEL_REGISTRY_MAX_MB = float(os.environ.get('MODEL_REGISTRY_MAX_MB', 512))
+
+# Models /api/training-jobs can retrain, with the columns their training data needs
+TRAINING_KINDS = {
+    'forecast': {'name': FORECAST_ARTIFACT, 'cls': BudgetForecastModel, 'columns': ['Year'] + DEFAULT_SECTORS,
+                 'model_kwargs': {'engine': FORECAST_ENGINE}, 'load_kwargs': {'lazy': SERVE_FROM_ARTIFACTS}},
+    'disaster': {'name': 'disaster', 'cls': DisasterFundModel,
+                 'columns': ['Severity(1-10)', 'Estimated_Damage_Cr', 'Budget_Allocated_Cr']},
+    'tax': {'name': 'tax', 'cls': TaxOptimizationModel,
+            'columns': ['Tax_Type', 'Tax_Rate_Percent', 'Revenue_Generated_Cr', 'Collection_Efficiency_Percent']}
+}
+# Processes background training jobs run on
+TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS', 1))
+# Seconds between checks for models deployed by other server processes
+TRAINING_SYNC_INTERVAL = float(os.environ.get('TRAINING_SYNC_INTERVAL', 5))
+_training_executor = None
+
+def get_training_executor():
+    """Process pool for training jobs, created on first use so it is never forked from a preloading master."""
+    global _training_executor
+    if _training_executor is None:
+        _training_executor = ProcessPoolExecutor(max_workers=TRAINING_WORKERS)
+    return _training_executor
+
+def _tenant_file(tenant, stem):
+    if tenant == DEFAULT_TENANT:
+        return None
+    for extension in ('.csv', '.parquet'):
+        path = os.path.join(TENANT_DATA_DIR, tenant, stem + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _read_table(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+def list_tenants():
+    if not os.path.isdir(TENANT_DATA_DIR):
+        return [DEFAULT_TENANT]
+    return sorted({DEFAULT_TENANT} | {
+        name for name in os.listdir(TENANT_DATA_DIR) if os.path.isdir(os.path.join(TENANT_DATA_DIR, name))
+    })
+
+def _serving(model):
+    """Attach the sector taxonomy to a model about to serve requests."""
+    if hasattr(model, 'set_taxonomy'):
+        model.set_taxonomy(sector_taxonomy)
     return model
 
-# Initialize the budget forecast model with sample training data
-def initialize_budget_forecast_model():
-    model = BudgetForecastModel()
+def original_model(tenant, kind):
+    """A tenant's model trained on its own data file, or on the default data if it has none."""
+    if kind == 'forecast':
+        path = _tenant_file(tenant, 'historical_budget')
+        return _serving(initialize_budget_forecast_model(HistoricalBudgetStore.from_file(path) if path else None))
+    path = _tenant_file(tenant, kind)
+    initialize = initialize_disaster_model if kind == 'disaster' else initialize_tax_model
+    return _serving(initialize(_read_table(path) if path else None))
+
+def load_tenant(tenant):
+    """
+    Build a tenant's models: the version a training job last deployed, else one
+    trained on the tenant's data file, else the default tenant's model (shared).
+    """
+    if tenant != DEFAULT_TENANT and not os.path.isdir(os.path.join(TENANT_DATA_DIR, tenant)):
+        raise UnknownTenantError(f"Unknown tenant: {tenant}")
     
-    # Sample historical budget data for training (5 years of data)
-    sample_data = {
-        'Year': [2019, 2020, 2021, 2022, 2023],
-        'Healthcare': [40000, 43000, 47000, 48500, 50000],
-        'Education': [35000, 37000, 38500, 39000, 40000],
-        'Defence': [30000, 32000, 33500, 34000, 35000],
-        'Infrastructure': [38000, 40000, 42000, 44000, 45000],
-        'Agriculture': [25000, 26500, 28000, 29000, 30000],
-        'Environment': [20000, 21000, 22500, 24000, 25000]
-    }
+    shared = model_registry.get(DEFAULT_TENANT) if tenant != DEFAULT_TENANT else None
+    models, artifacts = {}, []
+    for kind, spec in TRAINING_KINDS.items():
+        version = training_jobs.deployed(tenant, kind)
+        data_file = _tenant_file(tenant, 'historical_budget' if kind == 'forecast' else kind)
+        if version:
+            models[kind] = _serving(training_jobs.load_version(kind, version))
+        elif shared is None or data_file:
+            models[kind] = original_model(tenant, kind)
+        else:
+            models[kind] = getattr(shared, kind)
+            continue
+        artifacts.append(model_store.artifact_dir(spec['name'], models[kind].version))
     
-    df = pd.DataFrame(sample_data)
-    model.train_models(df)
-    return model
+    historical_path = _tenant_file(tenant, 'historical_budget')
+    historical = HistoricalBudgetStore.from_file(historical_path) if historical_path else historical_store
+    # Saved artifacts approximate the resident size of the models they restore
+    size = directory_size(artifacts) + (historical.amounts.nbytes if historical_path else 0)
+    return TenantModels(tenant, models['disaster'], models['tax'], models['forecast'], historical, size_bytes=size)
 
-# Initialize the models
-disaster_model = initialize_disaster_model()
-tax_model = initialize_tax_model()
-budget_forecast_model = initialize_budget_forecast_model()
+def swap_model(tenant, kind, model):
+    """Put a retrained model into service; requests already running keep the models they fetched."""
+    current = model_registry.get(tenant)
+    model_registry.put(tenant, current.replaced(**{kind: _serving(model)}))
+    if tenant == DEFAULT_TENANT:
+        # Tenants sharing the replaced default model reload and pick up the new one
+        for name, models in model_registry.resident().items():
+            if name != DEFAULT_TENANT and getattr(models, kind) is getattr(current, kind):
+                model_registry.evict(name)
+
+training_jobs = TrainingJobQueue(
+    model_store, TRAINING_KINDS, swap=swap_model, original=original_model,
+    executor_factory=get_training_executor,
+    deployments_path=os.path.join(model_store.root, 'deployments.json'),
+    jobs_dir=os.path.join(model_store.root, 'training_jobs')
+)
+
+model_registry = ModelRegistry(load_tenant, max_bytes=int(MODEL_REGISTRY_MAX_MB * 2**20), tenants=list_tenants)
+model_registry.put(DEFAULT_TENANT, load_tenant(DEFAULT_TENANT), pin=True)
+
+def _tenant_models():
+    """Models of the tenant named by the 'tenant' field or query parameter (the default tenant if none)."""
+    # Other workers' deployments are applied by a background thread, never by the request
+    training_jobs.start_sync(TRAINING_SYNC_INTERVAL)
+    data = request.get_json(silent=True) if request.is_json else None
+    tenant = (data or {}).get('tenant') if isinstance(data, dict) else None
+    return model_registry.get(str(tenant or request.args.get('tenant') or DEFAULT_TENANT))
+
+@app.errorhandler(UnknownTenantError)
+def unknown_tenant(e):
+    return jsonify({'error': e.args[0]}), 404
+
+def _taxonomy_level(data):
+    """Taxonomy depth requested through the optional 'level' field (0, the sectors, by default)."""
+    level = data.get('level', 0)
+    return LEAVES if level == LEAVES else int(level)
+
+def _taxonomy_fields(model, name, level):
+    """Parent and sector of a taxonomy node, added to entries below the top level."""
+    if level == 0:
+        return {}
+    taxonomy = model.taxonomy
+    node = taxonomy.index[name]
+    return {'parent': taxonomy.parent_name(name), 'topSector': taxonomy.names[taxonomy.root[node]]}
+
+metrics.add_collector(cache_collector({
+    'response': response_cache,
+    'tax_solution': lambda: model_registry.get(DEFAULT_TENANT).tax.cache_stats()
+}))
+metrics.add_collector(registry_collector(model_registry))
 
 @app.route('/')
 def index():
-    return app.send_static_file('index.html')
+    return send_from_directory(os.path.dirname(os.path.abspath(__file__)), 'index.html')
+
+@app.route('/<any({}):filename>'.format(', '.join(repr(name) for name in STATIC_FILES)))
+def static_file(filename):
+    return send_from_directory(os.path.dirname(os.path.abspath(__file__)), filename)
 
 @app.route('/api/calculate-disaster-fund', methods=['POST'])
 def calculate_disaster_fund():
+    models = _tenant_models()
     try:
         data = request.json
         severity = int(data.get('severity', 5))
         estimated_damage = float(data.get('estimatedDamage', 1000))
+        level = _taxonomy_level(data)
         
         # Calculate required fund
-        required_fund = disaster_model.calculate_disaster_fund(severity, estimated_damage)
+        required_fund = models.disaster.calculate_disaster_fund(severity, estimated_damage)
         
         # Get total budget from the request or use default
         total_budget = float(data.get('totalBudget', 225000))
         
+        # Optional original split sent by the frontend, and constraints on the cuts
+        heads = models.disaster.head_names(level)
+        split = _sector_budgets(data, heads)
+        policy = ReallocationPolicy.from_request(data)
+        
         # Calculate budget adjustments
-        original_budgets, adjusted_budgets = disaster_model.adjust_sector_budgets(total_budget, required_fund)
+        original_budgets, adjusted_budgets, unfunded = models.disaster.reallocate(
+            total_budget, required_fund, level, policy, split
+        )
         
         # Format the response
         sector_adjustments = []
-        for sector in disaster_model.sectors:
-            if sector in original_budgets and sector in adjusted_budgets:
-                sector_adjustments.append({
-                    'sector': sector,
-                    'originalBudget': round(original_budgets[sector]),
-                    'adjustedBudget': round(adjusted_budgets[sector]),
-                    'difference': round(adjusted_budgets[sector] - original_budgets[sector])
-                })
+        for sector, original, adjusted in zip(heads, original_budgets.tolist(), adjusted_budgets.tolist()):
+            sector_adjustments.append({
+                'sector': sector,
+                'originalBudget': round(original),
+                'adjustedBudget': round(adjusted),
+                'difference': round(adjusted - original),
+                **_taxonomy_fields(models.disaster, sector, level)
+            })
         
-        return jsonify({
+        response = {
             'requiredFund': round(required_fund),
             'sectorAdjustments': sector_adjustments
-        })
+        }
+        if unfunded > 0:
+            # The floors and max cuts leave part of the fund uncovered
+            response['unfundedAmount'] = round(float(unfunded))
+        return jsonify(response)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def _sector_budgets(data, heads):
+    """Original split from the optional 'sectorBudgets' field, aligned with heads (None if absent)."""
+    budgets = data.get('sectorBudgets')
+    if not budgets:
+        return None
+    missing = [head for head in heads if head not in budgets]
+    if missing:
+        raise ValueError(f"sectorBudgets is missing {missing}")
+    return np.array([float(budgets[head]) for head in heads])
+
+# Largest scenario sweep /api/calculate-disaster-fund/batch will accept
+MAX_DISASTER_SCENARIOS = 1_000_000
+# Scenarios scored and serialized per streamed chunk
+DISASTER_BATCH_CHUNK_SIZE = 5000
+
+def _disaster_scenarios(data):
+    """Turn a batch request into aligned severity, damage and budget arrays."""
+    if 'grid' in data:
+        # Cartesian product of every severity, damage and budget value
+        grid = data['grid']
+        axes = [
+            np.asarray(grid.get('severity', [5]), dtype=int).reshape(-1),
+            np.asarray(grid.get('estimatedDamage', [1000]), dtype=float).reshape(-1),
+            np.asarray(grid.get('totalBudget', [225000]), dtype=float).reshape(-1)
+        ]
+        count = int(np.prod([len(axis) for axis in axes]))
+        if count > MAX_DISASTER_SCENARIOS:
+            raise ValueError(f'At most {MAX_DISASTER_SCENARIOS} scenarios can be evaluated at once')
+        return [axis.reshape(-1) for axis in np.meshgrid(*axes, indexing='ij')]
+    
+    scenarios = data.get('scenarios', [])
+    if len(scenarios) > MAX_DISASTER_SCENARIOS:
+        raise ValueError(f'At most {MAX_DISASTER_SCENARIOS} scenarios can be evaluated at once')
+    return [
+        np.array([int(s.get('severity', 5)) for s in scenarios], dtype=int),
+        np.array([float(s.get('estimatedDamage', 1000)) for s in scenarios], dtype=float),
+        np.array([float(s.get('totalBudget', 225000)) for s in scenarios], dtype=float)
+    ]
+
+@app.route('/api/calculate-disaster-fund/batch', methods=['POST'])
+def calculate_disaster_fund_batch():
+    models = _tenant_models()
+    try:
+        severities, estimated_damages, total_budgets = _disaster_scenarios(request.json)
+        # One policy for every scenario; validated here so a bad one fails before streaming
+        policy = ReallocationPolicy.from_request(request.json)
+        if policy is not None:
+            policy.arrays(models.disaster.sectors)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    sectors = models.disaster.sectors
+    
+    def generate():
+        # Score one chunk at a time so large sweeps are never fully materialized
+        for start in range(0, len(severities), DISASTER_BATCH_CHUNK_SIZE):
+            chunk = slice(start, start + DISASTER_BATCH_CHUNK_SIZE)
+            required_funds = models.disaster.calculate_disaster_fund_batch(severities[chunk], estimated_damages[chunk])
+            original_budgets, adjusted_budgets, unfunded = models.disaster.reallocate(
+                total_budgets[chunk], required_funds, policy=policy
+            )
+            
+            rows = zip(
+                severities[chunk].tolist(),
+                estimated_damages[chunk].tolist(),
+                total_budgets[chunk].tolist(),
+                np.round(required_funds).tolist(),
+                np.round(original_budgets).tolist(),
+                np.round(adjusted_budgets).tolist(),
+                np.round(adjusted_budgets - original_budgets).tolist(),
+                np.round(unfunded).tolist()
+            )
+            lines = []
+            for severity, damage, budget, fund, originals, adjusteds, differences, shortfall in rows:
+                lines.append(json.dumps({
+                    'severity': severity,
+                    'estimatedDamage': damage,
+                    'totalBudget': budget,
+                    'requiredFund': int(fund),
+                    'unfundedAmount': int(shortfall),
+                    'sectorAdjustments': [{
+                        'sector': sector,
+                        'originalBudget': int(original),
+                        'adjustedBudget': int(adjusted),
+                        'difference': int(difference)
+                    } for sector, original, adjusted, difference in zip(sectors, originals, adjusteds, differences)]
+                }))
+            yield '\n'.join(lines) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/optimize-taxes', methods=['POST'])
 def optimize_taxes():
+    models = _tenant_models()
     try:
         data = request.json
         economic_condition = data.get('economicCondition', 'stable')  # 'recession', 'stable', 'growth'
         revenue_target = float(data.get('revenueTarget', 200000))
         
-        # Get tax optimization recommendations
-        recommendations = tax_model.optimize_taxes(economic_condition, revenue_target)
-        
-        # Prepare tax adjustments for revenue projection
-        tax_adjustments = {rec['tax_type']: float(rec['amount'].replace('%', '')) for rec in recommendations}
-        
-        # Project revenue with the recommended adjustments
-        revenue_projections = tax_model.project_revenue(tax_adjustments, revenue_target)
+        def compute():
+            # Get tax optimization recommendations
+            recommendations = models.tax.optimize_taxes(economic_condition, revenue_target)
+            
+            # Revenue the solver reaches with the recommended changes; the condition's
+            # rate bounds may not reach the target, so also say by how much it is missed
+            projected = models.tax.projected_revenue(economic_condition, recommendations)
+            lowest, highest = models.tax.revenue_range(economic_condition)
+            return {
+                'recommendations': recommendations,
+                'totalProjectedRevenue': round(projected),
+                'revenueShortfall': round(revenue_target - projected),
+                'reachableRevenue': {'min': round(lowest), 'max': round(highest)},
+                'economicCondition': economic_condition.capitalize()
+            }
         
-        return jsonify({
-            'recommendations': recommendations,
-            'totalProjectedRevenue': revenue_projections.get('Total', 0),
-            'economicCondition': economic_condition.capitalize()
-        })
+        key = ('optimize-taxes', economic_condition, revenue_target, models.tax.version)
+        return jsonify(response_cache.get_or_compute(key, compute))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# Most Monte Carlo trajectories /api/forecast-budget will draw per request
+MAX_SIMULATION_SAMPLES = 100000
+# Processes the simulation samples are spread over; 1 keeps them in the request thread
+SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', 1))
+_simulation_executor = None
+
+def get_simulation_executor():
+    """Process pool for Monte Carlo chunks, created on first use so it is never forked from a preloading master."""
+    global _simulation_executor
+    if SIMULATION_WORKERS > 1 and _simulation_executor is None:
+        _simulation_executor = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS)
+    return _simulation_executor
+
+def _uncertainty_options(data):
+    """Normalize the optional 'uncertainty' request field into a hashable tuple, or None."""
+    options = data.get('uncertainty')
+    if not options:
+        return None
+    if options is True:
+        options = {}
+    
+    samples = int(options.get('samples', 10000))
+    if not 1 <= samples <= MAX_SIMULATION_SAMPLES:
+        raise ValueError(f'samples must be between 1 and {MAX_SIMULATION_SAMPLES}')
+    percentiles = tuple(float(p) for p in options.get('percentiles', [5, 50, 95]))
+    if not all(0 <= p <= 100 for p in percentiles):
+        raise ValueError('percentiles must be between 0 and 100')
+    # Fixed default seed keeps the response a pure function of the request
+    return samples, percentiles, str(options.get('method', 'residual')), int(options.get('seed', 0))
+
 @app.route('/api/forecast-budget', methods=['POST'])
 def forecast_budget():
+    models = _tenant_models()
     try:
         data = request.json
         forecast_year = int(data.get('year', 2024))
         total_budget = float(data.get('totalBudget', 225000))
+        uncertainty = _uncertainty_options(data)
+        level = _taxonomy_level(data)
         
-        # Get budget distribution for the specified year
-        budget_distribution = budget_forecast_model.distribute_budget(total_budget, forecast_year)
+        def compute():
+            # Get budget distribution for the specified year
+            budget_distribution = models.forecast.distribute_budget(total_budget, forecast_year, level)
+            
+            # Format the response with percentages
+            sectors_data = []
+            for sector, amount in budget_distribution.items():
+                percentage = (amount / total_budget) * 100
+                sectors_data.append({
+                    'sector': sector,
+                    'amount': round(amount),
+                    'percentage': round(percentage, 2),
+                    **_taxonomy_fields(models.forecast, sector, level)
+                })
+            
+            response = {
+                'year': forecast_year,
+                'totalBudget': round(total_budget),
+                'sectors': sectors_data,
+                'message': f"AI-powered budget forecast for {forecast_year}"
+            }
+            
+            if uncertainty:
+                # Simulated share percentiles relative to the model's point share, applied
+                # to each sector's distributed amount so the bands surround that amount
+                samples, percentiles, method, seed = uncertainty
+                bands = models.forecast.simulate(
+                    [forecast_year], n_samples=samples, percentiles=percentiles, method=method,
+                    seed=seed, executor=get_simulation_executor(), as_shares=True
+                )
+                point = models.forecast.predict_many([forecast_year])[forecast_year]
+                point_shares = point / point.sum()
+                for entry in sectors_data:
+                    # Heads below the top level move with their sector's band
+                    sector = entry.get('topSector', entry['sector'])
+                    amount = budget_distribution[entry['sector']]
+                    entry['bands'] = {
+                        f"p{percentile:g}": round(amount * float(bands[percentile].at[sector, forecast_year]) / point_shares[sector])
+                        for percentile in percentiles
+                    }
+                response['uncertainty'] = {'samples': samples, 'percentiles': list(percentiles), 'method': method}
+            
+            # Sort by amount descending
+            sectors_data.sort(key=lambda x: x['amount'], reverse=True)
+            
+            return response
         
-        # Format the response with percentages
-        sectors_data = []
-        for sector, amount in budget_distribution.items():
-            percentage = (amount / total_budget) * 100
-            sectors_data.append({
-                'sector': sector,
-                'amount': round(amount),
-                'percentage': round(percentage, 2)
-            })
+        key = ('forecast-budget', forecast_year, total_budget, uncertainty, level, models.forecast.version)
+        return jsonify(response_cache.get_or_compute(key, compute))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Longest trajectory /api/forecast-budget/range will compute in one request
+MAX_FORECAST_YEARS = 200
+
+@app.route('/api/forecast-budget/range', methods=['POST'])
+def forecast_budget_range():
+    models = _tenant_models()
+    try:
+        data = request.json
+        start_year = int(data.get('startYear', 2024))
+        end_year = int(data.get('endYear', start_year + 9))
+        level = _taxonomy_level(data)
+        
+        if end_year < start_year:
+            return jsonify({'error': 'endYear must not be before startYear'}), 400
+        if end_year - start_year + 1 > MAX_FORECAST_YEARS:
+            return jsonify({'error': f'At most {MAX_FORECAST_YEARS} years can be forecast at once'}), 400
+        
+        years = np.arange(start_year, end_year + 1)
+        
+        # A single budget applies to every year, a list gives one budget per year
+        total_budget = data.get('totalBudget', 225000)
+        total_budgets = np.asarray(total_budget, dtype=float)
+        if total_budgets.ndim > 0 and total_budgets.shape != years.shape:
+            return jsonify({'error': 'totalBudget list must have one entry per year'}), 400
+        total_budgets = np.broadcast_to(total_budgets, years.shape)
         
-        # Sort by amount descending
-        sectors_data.sort(key=lambda x: x['amount'], reverse=True)
+        # Score the whole trajectory with one batched call per model
+        distribution = models.forecast.distribute_budget_many(total_budgets, years, level)
+        percentages = distribution.values / total_budgets[None, :] * 100
+        
+        sectors_data = [{
+            'sector': sector,
+            'amounts': np.round(distribution.values[i]).astype(int).tolist(),
+            'percentages': np.round(percentages[i], 2).tolist(),
+            **_taxonomy_fields(models.forecast, sector, level)
+        } for i, sector in enumerate(distribution.index)]
+        if level == 0:
+            # The regression models forecast sectors only
+            predicted = models.forecast.predict_many(years)
+            for i, entry in enumerate(sectors_data):
+                entry['predicted'] = np.round(predicted.values[i]).astype(int).tolist()
         
         return jsonify({
-            'year': forecast_year,
-            'totalBudget': round(total_budget),
+            'years': years.tolist(),
+            'totalBudgets': np.round(total_budgets).astype(int).tolist(),
             'sectors': sectors_data,
-            'message': f"AI-powered budget forecast for {forecast_year}"
+            'message': f"AI-powered budget forecast for {start_year}-{end_year}"
         })
     
     except Exception as e:
@@ -164,90 +628,18 @@ def forecast_budget():
 
 @app.route('/api/historical-budget', methods=['POST'])
 def historical_budget():
+    models = _tenant_models()
     try:
         data = request.json
         year = int(data.get('year', 2023))
         
-        # Historical budget data (using the same data from model initialization)
-        historical_data = {
-            2019: {
-                'total': 188000,
-                'sectors': {
-                    'Healthcare': 40000,
-                    'Education': 35000,
-                    'Defence': 30000,
-                    'Infrastructure': 38000,
-                    'Agriculture': 25000,
-                    'Environment': 20000
-                }
-            },
-            2020: {
-                'total': 195000,
-                'sectors': {
-                    'Healthcare': 43000,
-                    'Education': 37000,
-                    'Defence': 32000,
-                    'Infrastructure': 40000,
-                    'Agriculture': 26500,
-                    'Environment': 21000
-                }
-            },
-            2021: {
-                'total': 210000,
-                'sectors': {
-                    'Healthcare': 47000,
-                    'Education': 38500,
-                    'Defence': 33500,
-                    'Infrastructure': 42000,
-                    'Agriculture': 28000,
-                    'Environment': 22500
-                }
-            },
-            2022: {
-                'total': 217000,
-                'sectors': {
-                    'Healthcare': 48500,
-                    'Education': 39000,
-                    'Defence': 34000,
-                    'Infrastructure': 44000,
-                    'Agriculture': 29000,
-                    'Environment': 24000
-                }
-            },
-            2023: {
-                'total': 225000,
-                'sectors': {
-                    'Healthcare': 50000,
-                    'Education': 40000,
-                    'Defence': 35000,
-                    'Infrastructure': 45000,
-                    'Agriculture': 30000,
-                    'Environment': 25000
-                }
-            }
-        }
-        
-        if year not in historical_data:
+        sectors_data = models.historical.sector_breakdown(year)
+        if sectors_data is None:
             return jsonify({'error': f'No data available for year {year}'}), 404
         
-        year_data = historical_data[year]
-        
-        # Format the response with percentages
-        sectors_data = []
-        for sector, amount in year_data['sectors'].items():
-            percentage = (amount / year_data['total']) * 100
-            sectors_data.append({
-                'sector': sector,
-                'amount': amount,
-                'percentage': round(percentage, 2)
-            })
-        
-        # Sort by amount descending
-        sectors_data.sort(key=lambda x: x['amount'], reverse=True)
-        
         return jsonify({
             'year': year,
-            'totalBudget': year_data['total'],
+            'totalBudget': models.historical.total(year),
             'sectors': sectors_data
         })
     
@@ -256,6 +648,7 @@ def historical_budget():
 
 @app.route('/api/distribute-custom-budget', methods=['POST'])
 def distribute_custom_budget():
+    models = _tenant_models()
     try:
         data = request.json
         total_budget = float(data.get('totalBudget', 225000))
@@ -263,41 +656,232 @@ def distribute_custom_budget():
         if total_budget <= 0:
             return jsonify({'error': 'Budget amount must be greater than 0'}), 400
         
-        # Use current year as reference
-        current_year = 2023
+        # Use the latest year of actuals as reference
+        current_year = models.forecast.base_year
         
-        # Get budget distribution based on most recent patterns
-        budget_distribution = budget_forecast_model.distribute_budget(total_budget, current_year)
+        level = _taxonomy_level(data)
         
-        # Format the response with percentages
-        sectors_data = []
-        for sector, amount in budget_distribution.items():
-            percentage = (amount / total_budget) * 100
-            sectors_data.append({
-                'sector': sector,
-                'amount': round(amount),
-                'percentage': round(percentage, 2)
-            })
+        def compute():
+            # Get budget distribution based on most recent patterns
+            budget_distribution = models.forecast.distribute_budget(total_budget, current_year, level)
+            
+            # Format the response with percentages
+            sectors_data = []
+            for sector, amount in budget_distribution.items():
+                percentage = (amount / total_budget) * 100
+                sectors_data.append({
+                    'sector': sector,
+                    'amount': round(amount),
+                    'percentage': round(percentage, 2),
+                    **_taxonomy_fields(models.forecast, sector, level)
+                })
+            
+            # Sort by amount descending
+            sectors_data.sort(key=lambda x: x['amount'], reverse=True)
+            
+            return {
+                'totalBudget': round(total_budget),
+                'sectors': sectors_data,
+                'message': f"AI-optimized distribution of ₹{round(total_budget):,} Crores"
+            }
         
-        # Sort by amount descending
-        sectors_data.sort(key=lambda x: x['amount'], reverse=True)
+        key = ('distribute-custom-budget', total_budget, level, models.forecast.version)
+        return jsonify(response_cache.get_or_compute(key, compute))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Threads scoring /api/sweep chunks; the models are shared read-only and numpy releases the GIL
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', 4))
+# Grid rows scored and serialized per streamed chunk
+SWEEP_CHUNK_SIZE = 2000
+_sweep_executor = None
+
+def get_sweep_executor():
+    """Thread pool shared by sweep requests, created on first use."""
+    global _sweep_executor
+    if SWEEP_WORKERS > 1 and _sweep_executor is None:
+        _sweep_executor = ThreadPoolExecutor(max_workers=SWEEP_WORKERS, thread_name_prefix='sweep')
+    return _sweep_executor
+
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    models = _tenant_models()
+    engine = SweepEngine(models.forecast, models.disaster, models.tax, chunk_size=SWEEP_CHUNK_SIZE)
+    try:
+        axes = engine.parse(request.json or {})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    executor = get_sweep_executor()
+    rows = engine.stream(axes, executor=executor, max_in_flight=2 * SWEEP_WORKERS)
+    return Response(stream_with_context(rows), mimetype='application/x-ndjson')
+
+@app.route('/api/training-jobs', methods=['POST'])
+def submit_training_job():
+    models = _tenant_models()
+    try:
+        data = request.json
+        rows = data.get('rows')
+        if not isinstance(rows, list) or not rows:
+            raise ValueError('rows must be a non-empty list of training records')
+        job = training_jobs.submit(models.tenant, data.get('model', ''), pd.DataFrame(rows))
+        return jsonify(job.describe()), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/training-jobs', methods=['GET'])
+def list_training_jobs():
+    return jsonify(training_jobs.describe())
+
+@app.route('/api/training-jobs/<job_id>', methods=['GET'])
+def training_job_status(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.describe())
+
+@app.route('/api/training-jobs/<job_id>', methods=['DELETE'])
+def cancel_training_job(job_id):
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.describe())
+
+@app.route('/api/models/<kind>/rollback', methods=['POST'])
+def rollback_model(kind):
+    models = _tenant_models()
+    try:
+        if kind not in TRAINING_KINDS:
+            raise ValueError(f"Unknown model {kind!r}; expected one of {sorted(TRAINING_KINDS)}")
+        training_jobs.rollback(models.tenant, kind)
+        model = getattr(model_registry.get(models.tenant), kind)
+        return jsonify({'tenant': models.tenant, 'model': kind, 'version': (model.version or '')[:16]})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/tenants', methods=['GET'])
+def tenants():
+    return jsonify({'tenants': model_registry.tenants(), **model_registry.stats()})
+
+@app.route('/api/taxonomy', methods=['GET'])
+def taxonomy():
+    return jsonify({
+        'depth': len(sector_taxonomy.levels),
+        'nodes': sector_taxonomy.describe()
+    })
+
+@app.route('/api/export/<dataset>', methods=['POST'])
+def export(dataset):
+    models = _tenant_models()
+    exporter = AllocationExporter(models.forecast, models.disaster)
+    try:
+        data = request.get_json(silent=True) or {}
+        fmt = request.args.get('format', data.get('format', 'csv'))
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+        axes, level = exporter.parse(dataset, data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    if fmt not in available_formats():
+        return jsonify({'error': f'{fmt} exports are not available: install pyarrow'}), 503
+    
+    # Chunks are computed and encoded as the client reads, so memory stays flat for any export size
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(encode(exporter.chunks(dataset, axes, level), fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{dataset}{extension}"'
+    return response
+
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    return jsonify(document_library.describe())
+
+@app.route('/api/documents/search', methods=['GET'])
+def search_documents():
+    if not document_index.available:
+        return jsonify({'error': 'Document search is not available: install pypdf'}), 503
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            raise ValueError('Missing search query q')
+        limit = min(int(request.args.get('limit', 10)), 100)
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        
+        started = time.perf_counter()
+        # Picks up index files built since the last check; never parses a PDF in the request
+        document_index.refresh_if_stale(DOCUMENT_INDEX_CHECK_INTERVAL)
+        if not document_index.stats()['documents']:
+            return jsonify({'error': 'The document index has not been built: run python search_index.py'}), 503
+        results = document_index.search(query, limit=limit)
+        for result in results:
+            result['url'] = f"/documents/{quote(result['document'])}#page={result['page']}"
         
         return jsonify({
-            'totalBudget': round(total_budget),
-            'sectors': sectors_data,
-            'message': f"AI-optimized distribution of ₹{round(total_budget):,} Crores"
+            'query': query,
+            'results': results,
+            'tookMs': round((time.perf_counter() - started) * 1000, 3)
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/documents/reindex', methods=['POST'])
+def reindex_documents():
+    if not document_index.available:
+        return jsonify({'error': 'Document search is not available: install pypdf'}), 503
+    try:
+        # Loads index files built since the last check without waiting for the interval
+        changes = document_index.refresh(extract=False)
+        return jsonify({**changes, **document_index.stats()})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/documents/<path:name>', methods=['GET'])
+def serve_document(name):
+    path = document_library.path(name)
+    if path is None:
+        abort(404)
+    
+    etag = document_library.etag(name)
+    last_modified = os.path.getmtime(path)
+    as_attachment = request.args.get('download') == '1'
+    
+    # Whole-file requests may take a precompressed copy; ranges always address the original bytes
+    if 'Range' not in request.headers:
+        for encoding, _ in ENCODINGS:
+            variant = document_library.variant(name, encoding)
+            if variant and request.accept_encodings[encoding]:
+                response = send_file(variant, mimetype='application/pdf', as_attachment=as_attachment,
+                                     download_name=name, etag=f'{etag}-{encoding}', last_modified=last_modified,
+                                     max_age=DOCUMENT_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+    
+    # send_file answers Range and conditional requests and uses the server's
+    # sendfile-backed file wrapper (or X-Sendfile) for the body
+    response = send_file(path, mimetype='application/pdf', as_attachment=as_attachment, download_name=name,
+                         etag=etag, last_modified=last_modified, max_age=DOCUMENT_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
 if __name__ == '__main__':
+    # Development server only; use `gunicorn -c gunicorn.conf.py wsgi:app` in production
     port = int(os.environ.get('PORT', 5000))
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
     print("\n" + "="*50)
     print("Budget Allocation System with AI Models")
     print("="*50)
-    print("\nServer is running on http://localhost:5000")
+    print(f"\nServer is running on http://localhost:{port}")
     print("Open this URL in your browser to access the application.")
     print("\nAll AI Models are loaded and ready to use!")
     print("="*50 + "\n")
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=debug)
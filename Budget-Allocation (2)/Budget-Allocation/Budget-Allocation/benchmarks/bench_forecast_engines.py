@@ -0,0 +1,106 @@
+"""
+Compare the per-sector and multi-output BudgetForecastModel engines.
+
+Reports training time, prediction latency and model size for synthetic
+histories of a configurable number of years and sectors, and checks that
+updating a model reloaded from its artifact matches updating it in memory
+(exiting non-zero if not):
+
+    python benchmarks/bench_forecast_engines.py --years 30 --sectors 6 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from budget_forecast_model import ENGINES, BudgetForecastModel
+
+
+def synthetic_history(years: int, sectors: int, seed: int = 0) -> pd.DataFrame:
+    """Budgets growing 3-8% a year with noise, one column per sector."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(10000, 50000, sectors)
+    growth = rng.uniform(1.03, 1.08, sectors)
+    steps = np.arange(years)[:, None]
+    amounts = base * growth ** steps * rng.normal(1, 0.02, (years, sectors))
+
+    frame = pd.DataFrame(amounts.round(), columns=[f'Sector_{i}' for i in range(sectors)])
+    frame.insert(0, 'Year', 2023 - years + 1 + np.arange(years))
+    return frame
+
+
+def time_call(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': round(statistics.median(samples), 3), 'min_ms': round(min(samples), 3)}
+
+
+def artifact_bytes(model: BudgetForecastModel) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        model.save(directory)
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def update_after_load_difference(model: BudgetForecastModel, data: pd.DataFrame) -> float:
+    """Largest forecast difference between update() on a reloaded copy of a trained model and on the model itself."""
+    next_row = {'Year': int(data['Year'].iloc[-1]) + 1, **(data.iloc[-1].drop('Year') * 1.05).to_dict()}
+    with tempfile.TemporaryDirectory() as directory:
+        model.save(directory)
+        reloaded = BudgetForecastModel.load(directory)
+    model.update(next_row)
+    reloaded.update(next_row)
+    horizon = np.arange(next_row['Year'], next_row['Year'] + 5)
+    return float(np.abs(model.predict_many(horizon).to_numpy() - reloaded.predict_many(horizon).to_numpy()).max())
+
+
+def bench_engine(engine: str, data: pd.DataFrame, repeat: int) -> dict:
+    sectors = [column for column in data.columns if column != 'Year']
+    horizon = np.arange(2024, 2074)
+
+    model = BudgetForecastModel(engine=engine, sectors=sectors)
+    train = time_call(lambda: model.train_models(data), max(1, repeat // 10))
+
+    return {
+        'engine': engine,
+        'train': train,
+        'predict_1_year': time_call(lambda: model.predict(2024), repeat),
+        'predict_many_50_years': time_call(lambda: model.predict_many(horizon), repeat),
+        'artifact_bytes': artifact_bytes(model),
+        'update_after_load_max_diff': update_after_load_difference(model, data)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, default=30)
+    parser.add_argument('--sectors', type=int, nargs='+', default=[6, 50])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    results = []
+    for sector_count in args.sectors:
+        data = synthetic_history(args.years, sector_count)
+        for engine in ENGINES:
+            result = bench_engine(engine, data, args.repeat)
+            result.update({'years': args.years, 'sectors': sector_count})
+            results.append(result)
+
+    print(json.dumps(results, indent=2))
+    mismatched = [result['engine'] for result in results if result['update_after_load_max_diff'] > 1e-6]
+    if mismatched:
+        raise SystemExit(f"update() after load() diverges from the in-memory model for {mismatched}")
+
+
+if __name__ == '__main__':
+    main()
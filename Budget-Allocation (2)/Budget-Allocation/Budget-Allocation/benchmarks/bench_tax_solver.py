@@ -0,0 +1,75 @@
+"""
+Latency of TaxOptimizationModel.optimize_taxes over a grid of revenue targets.
+
+Each (condition, target) pair is solved once cold and once from the solution
+cache:
+
+    python benchmarks/bench_tax_solver.py --targets 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tax_model import TaxOptimizationModel
+
+TAX_DATA = pd.DataFrame({
+    'Tax_Type': ['Income Tax', 'Corporate Tax', 'GST', 'Property Tax', 'Customs Duty', 'Excise Duty'],
+    'Tax_Rate_Percent': [30, 25, 18, 10, 15, 12],
+    'Revenue_Generated_Cr': [50000, 30000, 45000, 15000, 20000, 18000],
+    'Collection_Efficiency_Percent': [85, 90, 92, 75, 88, 80]
+})
+
+
+def latency_summary(samples_ms: list) -> dict:
+    samples = np.array(samples_ms)
+    return {
+        'count': len(samples),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4),
+        'max_ms': round(float(samples.max()), 4)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--targets', type=int, default=1000)
+    parser.add_argument('--min-target', type=float, default=150000)
+    parser.add_argument('--max-target', type=float, default=210000)
+    args = parser.parse_args()
+
+    model = TaxOptimizationModel()
+    model.train_models(TAX_DATA)
+    targets = np.linspace(args.min_target, args.max_target, args.targets)
+
+    results = {}
+    for condition in model.condition_profiles:
+        cold, cached, misses = [], [], []
+        for target in targets:
+            started = time.perf_counter()
+            recommendations = model.optimize_taxes(condition, target)
+            cold.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            model.optimize_taxes(condition, target)
+            cached.append((time.perf_counter() - started) * 1000)
+
+            misses.append(abs(model.revenue_shortfall(condition, target, recommendations)))
+
+        results[condition] = {
+            'cold': latency_summary(cold),
+            'cached': latency_summary(cached),
+            'median_revenue_miss_cr': round(float(np.median(misses)), 1)
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
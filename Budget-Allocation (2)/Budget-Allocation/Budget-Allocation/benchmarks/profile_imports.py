@@ -0,0 +1,76 @@
+"""
+Startup import profile: how long importing the app spends in each package.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter (so
+nothing is already imported) and attributes every module's self time to its
+top-level package:
+
+    python benchmarks/profile_imports.py
+    SERVE_FROM_ARTIFACTS=1 python benchmarks/profile_imports.py --module app --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile(module: str) -> dict:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    self_us = defaultdict(int)
+    cumulative_us = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        self_us[name.split('.')[0]] += int(self_time)
+        cumulative_us[name] = int(cumulative)
+
+    return {
+        'module': module,
+        'wall_s': round(wall, 3),
+        'import_s': round(cumulative_us.get(module, 0) / 1e6, 3),
+        'packages': {
+            package: round(us / 1e6, 4)
+            for package, us in sorted(self_us.items(), key=lambda item: item[1], reverse=True)
+        },
+        'heavy_dependencies_loaded': [
+            package for package in ('xgboost', 'sklearn', 'scipy', 'pandas') if package in self_us
+        ]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--top', type=int, default=10, help='Packages to list, slowest first')
+    parser.add_argument('--json', action='store_true', help='Print the full profile as JSON')
+    args = parser.parse_args()
+
+    result = profile(args.module)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"import {result['module']}: {result['import_s']:.3f}s (process wall time {result['wall_s']:.3f}s)")
+    print(f"heavy dependencies loaded: {', '.join(result['heavy_dependencies_loaded']) or 'none'}")
+    for package, seconds in list(result['packages'].items())[:args.top]:
+        print(f"  {package:<24} {seconds:8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
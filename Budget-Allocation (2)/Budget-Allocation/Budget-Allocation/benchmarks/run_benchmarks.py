@@ -0,0 +1,275 @@
+"""
+Benchmark the Flask routes and the model hot paths, writing results as JSON.
+
+Routes are driven through the Flask test client, so the numbers cover request
+parsing, caching and serialization but not the network or the WSGI server.
+Model methods are timed directly on synthetic data scaled by --years and
+--sectors; --sectors sets the number of forecast and disaster heads and of
+taxes alike. Compare against an earlier run to catch regressions:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_forecast_engines import synthetic_history
+from budget_forecast_model import BudgetForecastModel
+from disaster_model import DisasterFundModel
+from reallocation import ReallocationPolicy
+from tax_model import TaxOptimizationModel
+from taxonomy import SectorTaxonomy
+
+
+def synthetic_disasters(events: int, seed: int = 0) -> pd.DataFrame:
+    """Past disasters whose allocation grows with severity and damage."""
+    rng = np.random.default_rng(seed)
+    severity = rng.integers(1, 11, events)
+    damage = rng.uniform(100, 10000, events).round()
+    allocated = damage * (0.2 + 0.07 * severity) * rng.normal(1, 0.05, events)
+    return pd.DataFrame({
+        'Severity(1-10)': severity,
+        'Estimated_Damage_Cr': damage,
+        'Budget_Allocated_Cr': allocated.round()
+    })
+
+
+def scaled_disaster_model(sectors: list, seed: int = 0) -> DisasterFundModel:
+    """Untrained disaster model adjusting ``sectors`` in random proportions."""
+    shares = np.random.default_rng(seed).uniform(1, 3, len(sectors))
+    model = DisasterFundModel()
+    model.sectors = list(sectors)
+    model.taxonomy = SectorTaxonomy.flat(model.sectors)
+    model.base_proportions = dict(zip(model.sectors, (shares / shares.sum()).tolist()))
+    model._build_lookup_tables()
+    return model
+
+
+def synthetic_taxes(types: int, seed: int = 0) -> pd.DataFrame:
+    """Tax data shaped like the sample data, one row per tax."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Tax_Type': [f'Tax_{i}' for i in range(types)],
+        'Tax_Rate_Percent': rng.integers(5, 31, types),
+        'Revenue_Generated_Cr': rng.uniform(10000, 50000, types).round(),
+        'Collection_Efficiency_Percent': rng.integers(70, 96, types)
+    })
+
+
+def scaled_tax_model(tax_data: pd.DataFrame) -> TaxOptimizationModel:
+    """Tax model trained on ``tax_data``, cycling the default bounds and impacts over its taxes."""
+    model = TaxOptimizationModel()
+    model.tax_types = list(tax_data['Tax_Type'])
+    model.condition_profiles = {
+        condition: dict(zip(model.tax_types, itertools.cycle(profile.values())))
+        for condition, profile in model.condition_profiles.items()
+    }
+    model.train_models(tax_data)
+    return model
+
+
+def summarize(samples_ms: list, elapsed_s: float = None) -> dict:
+    samples = np.array(samples_ms)
+    summary = {
+        'count': len(samples),
+        'mean_ms': round(float(samples.mean()), 4),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p90_ms': round(float(np.percentile(samples, 90)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4),
+        'max_ms': round(float(samples.max()), 4)
+    }
+    if elapsed_s:
+        summary['throughput_rps'] = round(len(samples) / elapsed_s, 1)
+    return summary
+
+
+def time_calls(fn, repeat: int, warmup: int = 3) -> dict:
+    """Latency summary of ``fn(i)`` over ``repeat`` calls."""
+    for i in range(warmup):
+        fn(i)
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(repeat):
+        call_started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - call_started) * 1000)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def bench_models(years: int, sectors: int, repeat: int) -> dict:
+    rng = np.random.default_rng(0)
+    budgets = rng.uniform(50000, 500000, repeat + 3)
+    severities = rng.integers(1, 11, repeat + 3)
+    damages = rng.uniform(100, 10000, repeat + 3)
+    # Around the synthetic taxes' current revenue, as the app's sample targets are
+    tax_data = synthetic_taxes(sectors)
+    targets = tax_data['Revenue_Generated_Cr'].sum() * rng.uniform(0.85, 1.4, repeat + 3)
+
+    history = synthetic_history(years, sectors)
+    forecast = BudgetForecastModel(sectors=[column for column in history.columns if column != 'Year'])
+    last_year = int(history['Year'].iloc[-1])
+
+    disaster = scaled_disaster_model(forecast.sectors)
+    disaster_data = synthetic_disasters(max(8, years))
+    tax = scaled_tax_model(tax_data)
+    adjustments = {tax_type: 1.0 for tax_type in tax.tax_types}
+    # Every other head has a floor that binds in large disasters
+    heads = forecast.sectors
+    policy = ReallocationPolicy(floors={head: 1000.0 for head in heads[::2]}, priorities={heads[-1]: 2.0})
+    head_budgets = rng.uniform(500, 5000, (1000, len(heads)))
+    demands = head_budgets.sum(axis=1) * rng.uniform(0.05, 0.9, 1000)
+
+    return {
+        'BudgetForecastModel.train_models': time_calls(
+            lambda i: forecast.train_models(history), max(1, repeat // 20), warmup=0
+        ),
+        'BudgetForecastModel.predict': time_calls(lambda i: forecast.predict(last_year + 1 + i % 10), repeat),
+        'BudgetForecastModel.distribute_budget': time_calls(
+            lambda i: forecast.distribute_budget(budgets[i], last_year + 1 + i % 10), repeat
+        ),
+        'DisasterFundModel.train_models': time_calls(
+            lambda i: disaster.train_models(disaster_data), max(1, repeat // 20), warmup=1
+        ),
+        'DisasterFundModel.calculate_disaster_fund': time_calls(
+            lambda i: disaster.calculate_disaster_fund(int(severities[i]), damages[i]), repeat
+        ),
+        'DisasterFundModel.adjust_sector_budgets': time_calls(
+            lambda i: disaster.adjust_sector_budgets(budgets[i], damages[i]), repeat
+        ),
+        'ReallocationPolicy.cuts (1000 scenarios)': time_calls(
+            lambda i: policy.cuts(head_budgets, demands, heads), max(1, repeat // 10)
+        ),
+        # Distinct targets so every call is a cache miss
+        'TaxOptimizationModel.optimize_taxes': time_calls(
+            lambda i: tax.optimize_taxes('stable', targets[i]), repeat
+        ),
+        'TaxOptimizationModel.project_revenue': time_calls(
+            lambda i: tax.project_revenue(adjustments, targets[i]), repeat
+        )
+    }
+
+
+def route_requests(year: int) -> dict:
+    """Payload factories per route; ``i`` varies the inputs to defeat the response cache."""
+    return {
+        'POST /api/forecast-budget': lambda i: {'year': year + i % 5, 'totalBudget': 200000 + i},
+        'POST /api/forecast-budget/range': lambda i: {
+            'startYear': year, 'endYear': year + 9, 'totalBudget': 200000 + i
+        },
+        'POST /api/historical-budget': lambda i: {'year': 2019 + i % 5},
+        'POST /api/distribute-custom-budget': lambda i: {'totalBudget': 100000 + i},
+        'POST /api/calculate-disaster-fund': lambda i: {
+            'severity': 1 + i % 10, 'estimatedDamage': 1000 + i, 'totalBudget': 225000
+        },
+        'POST /api/optimize-taxes': lambda i: {'economicCondition': 'stable', 'revenueTarget': 180000 + i},
+        'POST /api/calculate-disaster-fund/batch': lambda i: {
+            'grid': {'severity': list(range(1, 11)), 'estimatedDamage': [500, 1000 + i], 'totalBudget': [225000]}
+        }
+    }
+
+
+def bench_routes(repeat: int) -> dict:
+    # Keep the benchmark's artifacts out of the app's stores and skip the slow document
+    # start-up work, so the timings cover the routes and not PDF parsing or compression
+    with tempfile.TemporaryDirectory(prefix='bench-app-') as scratch:
+        os.environ.setdefault('MODEL_STORE_DIR', os.path.join(scratch, 'models'))
+        os.environ.setdefault('DOCUMENT_CACHE_DIR', os.path.join(scratch, 'documents'))
+        os.environ['DOCUMENT_INDEX'] = '0'
+        os.environ['DOCUMENT_PRECOMPRESS'] = '0'
+
+        # Imported here so --skip-routes does not load the app's models
+        import app as app_module
+
+        client = app_module.app.test_client()
+        requests = route_requests(app_module.model_registry.get(app_module.DEFAULT_TENANT).forecast.base_year + 1)
+        results = {}
+        for route, payload in requests.items():
+            method, path = route.split(' ', 1)
+
+            def call(i, path=path, payload=payload):
+                response = client.open(path, method=method, json=payload(i))
+                response.get_data()
+                if response.status_code != 200:
+                    raise RuntimeError(f"{route} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+            results[route] = time_calls(call, repeat)
+        return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Benchmarks whose p50 grew by more than ``tolerance`` relative to the baseline."""
+    regressions = []
+    for group in ('routes', 'models'):
+        for scale, entries in results.get(group, {}).items():
+            for name, summary in entries.items():
+                before = baseline.get(group, {}).get(scale, {}).get(name)
+                if before and summary['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+                    regressions.append({
+                        'benchmark': f'{group}/{scale}/{name}',
+                        'baseline_p50_ms': before['p50_ms'],
+                        'p50_ms': summary['p50_ms'],
+                        'ratio': round(summary['p50_ms'] / before['p50_ms'], 2)
+                    })
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, nargs='+', default=[5, 30])
+    parser.add_argument('--sectors', type=int, nargs='+', default=[6, 50])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--skip-routes', action='store_true')
+    parser.add_argument('--output', help='Write results to this JSON file instead of stdout')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative p50 slowdown before a benchmark counts as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'repeat': args.repeat
+        },
+        'models': {}
+    }
+
+    for years in args.years:
+        for sectors in args.sectors:
+            results['models'][f'{years}y_{sectors}s'] = bench_models(years, sectors, args.repeat)
+
+    if not args.skip_routes:
+        results['routes'] = {'app': bench_routes(args.repeat)}
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['regressions'] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
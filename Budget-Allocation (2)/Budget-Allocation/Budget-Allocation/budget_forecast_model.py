@@ -1,82 +1,269 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-import xgboost as xgb
-from sklearn.preprocessing import StandardScaler
-from typing import Dict, Union, List
+from typing import TYPE_CHECKING, Dict, Union, List, Optional, Tuple
 import logging
 
+# scikit-learn and XGBoost take seconds to import, so they are only imported
+# when estimators are first created or restored (see _sklearn and _xgboost)
+if TYPE_CHECKING:
+    import xgboost as xgb
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+
+from model_store import hash_training_data
+from taxonomy import DEFAULT_SECTORS, SectorTaxonomy
+from trends import TREND_METHODS, loo_residuals, ols_slopes, series_trends
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Serializes the first-use creation or restoration of a model's estimators
+_ESTIMATOR_LOCK = threading.Lock()
+
+def _sklearn():
+    """Import scikit-learn's estimators on first use."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+    return LinearRegression, StandardScaler
+
+def _xgboost():
+    """Import XGBoost on first use."""
+    import xgboost
+    return xgboost
+
+def _fit_sector_models(X: np.ndarray, y: np.ndarray, scaler: 'StandardScaler', linear: 'LinearRegression',
+                       booster: 'xgb.XGBRegressor') -> Tuple['StandardScaler', 'LinearRegression', 'xgb.XGBRegressor', float]:
+    """
+    Fit one sector's scaler, linear and XGBoost models.
+    
+    Module-level so it can be shipped to a process pool; the fitted estimators
+    are returned rather than relied on being mutated in place.
+    
+    Returns:
+        Tuple of the fitted scaler, linear model, XGBoost model and fit time in seconds
+    """
+    started = time.perf_counter()
+    X_scaled = scaler.fit_transform(X)
+    linear.fit(X_scaled, y)
+    booster.fit(X_scaled, y)
+    return scaler, linear, booster, time.perf_counter() - started
+
+# Engines selectable through BudgetForecastModel(engine=...)
+ENGINES = ('per_sector', 'multi_output')
+
+def _new_booster(**params) -> 'xgb.XGBRegressor':
+    return _xgboost().XGBRegressor(
+        objective='reg:squarederror',
+        n_estimators=100,
+        learning_rate=0.1,
+        max_depth=3,
+        **params
+    )
+
+def _booster_params(booster: 'xgb.XGBRegressor') -> Dict:
+    """
+    The wrapper parameters a booster was built with, as saved in the artifact.
+    
+    A booster restored with load_model() alone falls back to XGBoost's default
+    learning rate and depth, so update() would continue it differently from
+    the live one; the saved parameters are passed back to its constructor.
+    Thread counts are left to the restoring process.
+    """
+    return {
+        key: value for key, value in booster.get_params().items()
+        if value is not None and key not in ('n_jobs', 'missing')
+        and isinstance(value, (str, int, float, bool))
+    }
+
+def _continue_booster(booster: 'xgb.XGBRegressor', X_scaled: np.ndarray, y: np.ndarray, rounds: int) -> None:
+    """Add ``rounds`` trees to a fitted booster, starting from its current trees."""
+    n_estimators = booster.get_params().get('n_estimators')
+    booster.set_params(n_estimators=rounds)
+    booster.fit(X_scaled, y, xgb_model=booster.get_booster())
+    booster.set_params(n_estimators=n_estimators)
+
+# Resampling schemes accepted by BudgetForecastModel.simulate
+SIMULATION_METHODS = ('residual', 'bootstrap')
+
+def _simulate_chunk(method: str, point: np.ndarray, years: np.ndarray, horizons: np.ndarray,
+                    residuals: np.ndarray, history_years: np.ndarray, history_values: np.ndarray,
+                    n_samples: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Draw ``n_samples`` forecast trajectories around the point forecast.
+    
+    Module-level so chunks can be spread over a process pool.
+    
+    Args:
+        method: 'residual' adds resampled leave-one-out residuals, widened by the
+            square root of the horizon; 'bootstrap' adds the deviation of a linear trend
+            refitted on years resampled with replacement
+        point: Point forecast of shape (sectors, years)
+        years: Forecast years
+        horizons: Years ahead of the last training year, at least 1
+        residuals: Out-of-sample residuals of shape (sectors, history)
+        history_years: Training years
+        history_values: Training budgets of shape (history, sectors)
+        n_samples: Trajectories to draw
+        seed: Seed for this chunk's random generator
+        
+    Returns:
+        np.ndarray: Trajectories of shape (n_samples, sectors, years)
+    """
+    rng = np.random.default_rng(seed)
+    sector_count, year_count = point.shape
+    
+    if method == 'residual':
+        draws = rng.integers(0, residuals.shape[1], size=(n_samples, sector_count, year_count))
+        noise = residuals[np.arange(sector_count)[None, :, None], draws]
+        return point[None] + noise * np.sqrt(horizons)[None, None, :]
+    
+    # Pairs bootstrap of an OLS trend per sector, all samples at once
+    x = history_years - history_years.mean()
+    draws = rng.integers(0, len(x), size=(n_samples, len(x)))
+    x_sample = x[draws]
+    y_sample = history_values[draws]
+    x_centred = x_sample - x_sample.mean(axis=1, keepdims=True)
+    y_centred = y_sample - y_sample.mean(axis=1, keepdims=True)
+    
+    full_slopes = ols_slopes(history_values, x)
+    full_intercepts = history_values.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slopes = np.einsum('nh,nhs->ns', x_centred, y_centred) / np.square(x_centred).sum(axis=1, keepdims=True)
+    # A resample of a single repeated year carries no slope information
+    slopes = np.where(np.isfinite(slopes), slopes, full_slopes)
+    intercepts = y_sample.mean(axis=1) - slopes * x_sample.mean(axis=1, keepdims=True)
+    
+    x_forecast = years - history_years.mean()
+    deviation = (intercepts - full_intercepts)[:, :, None] + (slopes - full_slopes)[:, :, None] * x_forecast[None, None, :]
+    return point[None] + deviation
+
 class BudgetForecastModel:
-    def __init__(self):
+    def __init__(self, training_workers: Optional[int] = None, training_backend: str = 'thread',
+                 engine: str = 'per_sector', sectors: Optional[List[str]] = None,
+                 trend_method: str = 'ols', trend_half_life: float = 3.0):
+        """
+        Args:
+            training_workers: Sectors trained concurrently (default: one per sector, capped at the CPU count)
+            training_backend: 'thread' or 'process' pool used when no executor is passed to train_models
+            engine: 'per_sector' fits a scaler, linear model and XGBoost model per sector;
+                'multi_output' fits one shared scaler and one multi-target linear and
+                XGBoost model covering every sector
+            sectors: Sector names (default: DEFAULT_SECTORS)
+            trend_method: How sector proportion trends are fitted: 'ols', 'weighted'
+                (recency-weighted least squares) or 'theil_sen' (robust to outlying years)
+            trend_half_life: Half-life in years of the 'weighted' trend method
+        """
         try:
-            self.sectors = ['Healthcare', 'Education', 'Defence', 'Infrastructure', 'Agriculture', 'Environment']
-            self.models = {sector: {
-                'linear': LinearRegression(),
-                'xgb': xgb.XGBRegressor(
-                    objective='reg:squarederror',
-                    n_estimators=100,
-                    learning_rate=0.1,
-                    max_depth=3
-                )
-            } for sector in self.sectors}
-            self.scalers = {sector: StandardScaler() for sector in self.sectors}
+            if training_backend not in ('thread', 'process'):
+                raise ValueError(f"Unknown training backend: {training_backend}")
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown forecast engine: {engine}")
+            if trend_method not in TREND_METHODS:
+                raise ValueError(f"Unknown trend method: {trend_method}")
+            
+            self.sectors = list(sectors) if sectors else list(DEFAULT_SECTORS)
+            # Heads below the sectors that distributions can be broken down to (see set_taxonomy)
+            self.taxonomy = SectorTaxonomy.flat(self.sectors)
+            self.engine = engine
+            self.trend_method = trend_method
+            self.trend_half_life = trend_half_life
+            # Estimators are created (or restored from an artifact) by _ensure_estimators
+            self.models = {}
+            self.scalers = {}
+            self.shared_models = {}
+            self.shared_scaler = None
+            self._estimator_source = None  # Artifact directory to restore estimators from
+            self._estimators_ready = False
             self.sector_proportions = {}  # Store historical proportions
+            self.running_stats = {}  # Sufficient statistics maintained by update()
+            self.base_year = None  # Last year of training data
+            self.training_workers = training_workers
+            self.training_backend = training_backend
+            self.training_times = {}  # Seconds spent fitting each sector
             self.is_trained = False
+            self.version = None  # Hash of the training data (see hash_training_data)
             logger.info("BudgetForecastModel initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing BudgetForecastModel: {str(e)}")
             raise
 
+    def _ensure_estimators(self) -> None:
+        """
+        Create the scalers, linear models and boosters on first use, or restore
+        them from the artifact a lazy load() deferred them to.
+        
+        Proportion-based methods never call this, so a model that only
+        distributes budgets never imports scikit-learn or XGBoost.
+        """
+        if self._estimators_ready:
+            return
+        with _ESTIMATOR_LOCK:
+            if self._estimators_ready:
+                return
+            if self._estimator_source is not None:
+                self._restore_estimators(self._estimator_source)
+            else:
+                self._new_estimators()
+            self._estimators_ready = True
+
+    def _new_estimators(self) -> None:
+        LinearRegression, StandardScaler = _sklearn()
+        if self.engine == 'per_sector':
+            self.models = {sector: {
+                'linear': LinearRegression(),
+                'xgb': _new_booster()
+            } for sector in self.sectors}
+            self.scalers = {sector: StandardScaler() for sector in self.sectors}
+        else:
+            # A single tree ensemble whose leaves hold one value per sector
+            self.shared_models = {
+                'linear': LinearRegression(),
+                'xgb': _new_booster(tree_method='hist', multi_strategy='multi_output_tree')
+            }
+            self.shared_scaler = StandardScaler()
+
     def calculate_sector_proportions(self, data: pd.DataFrame) -> None:
         """
         Calculate historical proportions for each sector.
         
+        The mean share and trend of every sector are computed together as array
+        operations; ``data`` is not modified.
+        
         Args:
             data: DataFrame containing historical budget data
         """
         try:
+            values = data[self.sectors].to_numpy(dtype=float)
+            
             # Calculate total budget for each year
-            data['Total'] = data[self.sectors].sum(axis=1)
+            totals = values.sum(axis=1)
             
             # Calculate proportion for each sector
-            for sector in self.sectors:
-                self.sector_proportions[sector] = {
-                    'mean': data[sector].mean() / data['Total'].mean(),
-                    'trend': self._calculate_trend(data[sector] / data['Total'])
-                }
+            means = values.mean(axis=0) / totals.mean()
+            trends = series_trends(values / totals[:, None], self.trend_method, self.trend_half_life)
+            self.sector_proportions = {
+                sector: {'mean': float(mean), 'trend': float(trend)}
+                for sector, mean, trend in zip(self.sectors, means, trends)
+            }
             
         except Exception as e:
             logger.error(f"Error calculating sector proportions: {str(e)}")
             raise
 
-    def _calculate_trend(self, proportions: pd.Series) -> float:
-        """
-        Calculate the trend in sector proportions over time.
-        
-        Args:
-            proportions: Series of historical proportions
-            
-        Returns:
-            float: Trend coefficient
-        """
-        try:
-            X = np.arange(len(proportions)).reshape(-1, 1)
-            y = proportions.values
-            model = LinearRegression()
-            model.fit(X, y)
-            return model.coef_[0]
-        except Exception as e:
-            logger.error(f"Error calculating trend: {str(e)}")
-            raise
-
     def preprocess_data(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
         """
         Preprocess input data for prediction.
         
+        Reuses the scalers fitted by train_models; they are only fitted here
+        when the model has not been trained yet.
+        
         Args:
             data: DataFrame containing historical budget data
             
@@ -84,11 +271,21 @@ class BudgetForecastModel:
             Dict[str, np.ndarray]: Preprocessed features for each sector
         """
         try:
+            self._ensure_estimators()
             processed_data = {}
+            X = data[['Year']].values
+            if self.engine == 'multi_output':
+                if self.is_trained:
+                    X_scaled = self.shared_scaler.transform(X)
+                else:
+                    X_scaled = self.shared_scaler.fit_transform(X)
+                return {sector: X_scaled for sector in self.sectors}
+            
             for sector in self.sectors:
-                # Create features: year and previous year's budget
-                X = data[['Year']].values
-                processed_data[sector] = self.scalers[sector].fit_transform(X)
+                if self.is_trained:
+                    processed_data[sector] = self.scalers[sector].transform(X)
+                else:
+                    processed_data[sector] = self.scalers[sector].fit_transform(X)
             return processed_data
             
         except Exception as e:
@@ -105,106 +302,441 @@ class BudgetForecastModel:
         Returns:
             Dict[str, float]: Predicted budgets for each sector
         """
+        try:
+            predictions = self.predict_many([year])
+            return {sector: float(predictions.at[sector, year]) for sector in self.sectors}
+            
+        except Exception as e:
+            logger.error(f"Error in predict: {str(e)}")
+            raise
+
+    def predict_many(self, years: Union[List[int], np.ndarray]) -> pd.DataFrame:
+        """
+        Make predictions for all sectors over many years at once.
+        
+        Each sector's linear and XGBoost model is called once with the whole
+        column of years instead of once per year; the multi-output engine makes
+        a single call per model for all sectors.
+        
+        Args:
+            years: Years to predict budgets for
+            
+        Returns:
+            pd.DataFrame: Predicted budgets indexed by sector with one column per year
+        """
         try:
             if not self.is_trained:
                 raise RuntimeError("Model must be trained before making predictions")
-                
-            predictions = {}
-            for sector in self.sectors:
-                # Prepare input data
-                X = np.array([[year]])
+            self._ensure_estimators()
+            
+            years = np.asarray(years, dtype=int).reshape(-1)
+            X = years.reshape(-1, 1)
+            
+            if self.engine == 'multi_output':
+                # One call per model scores every sector and year together
+                X_scaled = self.shared_scaler.transform(X)
+                linear_pred = self.shared_models['linear'].predict(X_scaled)
+                xgb_pred = self.shared_models['xgb'].predict(X_scaled).reshape(len(years), len(self.sectors))
+                predictions = (0.3 * linear_pred + 0.7 * xgb_pred).T
+                return pd.DataFrame(predictions, index=self.sectors, columns=years)
+            
+            predictions = np.empty((len(self.sectors), len(years)))
+            for i, sector in enumerate(self.sectors):
                 X_scaled = self.scalers[sector].transform(X)
                 
-                # Get predictions from both models
                 linear_pred = self.models[sector]['linear'].predict(X_scaled)
                 xgb_pred = self.models[sector]['xgb'].predict(X_scaled)
                 
                 # Combine predictions with weighted average
-                final_prediction = (0.3 * linear_pred[0] + 0.7 * xgb_pred[0])
-                predictions[sector] = float(final_prediction)
+                predictions[i] = 0.3 * linear_pred + 0.7 * xgb_pred
             
-            return predictions
+            return pd.DataFrame(predictions, index=self.sectors, columns=years)
             
         except Exception as e:
-            logger.error(f"Error in predict: {str(e)}")
+            logger.error(f"Error in predict_many: {str(e)}")
             raise
 
-    def train_models(self, data: pd.DataFrame) -> None:
+    def simulate(self, years: Union[List[int], np.ndarray], n_samples: int = 10000,
+                 percentiles: Tuple[float, ...] = (5, 50, 95), method: str = 'residual',
+                 seed: Optional[int] = None, executor: Optional[Executor] = None,
+                 as_shares: bool = False) -> Dict[float, pd.DataFrame]:
+        """
+        Monte Carlo percentile bands around the point forecast.
+        
+        Trajectories are drawn as arrays over the sample axis. With an executor
+        the samples are split into one chunk per worker, each with an
+        independent random stream.
+        
+        Args:
+            years: Years to forecast
+            n_samples: Trajectories to draw
+            percentiles: Percentiles (0-100) to report
+            method: 'residual' or 'bootstrap' (see _simulate_chunk)
+            seed: Seed for reproducible bands
+            executor: Optional pool to spread the sample chunks over
+            as_shares: Report each sector's share of the simulated total instead
+                of its budget
+            
+        Returns:
+            Dict[float, pd.DataFrame]: For each percentile, values indexed by sector
+            with one column per year
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before making predictions")
+            if method not in SIMULATION_METHODS:
+                raise ValueError(f"Unknown simulation method: {method}")
+            
+            years = np.asarray(years, dtype=int).reshape(-1)
+            point = self.predict_many(years).to_numpy()
+            horizons = np.maximum(years - self.base_year, 1).astype(float)
+            
+            history_years = np.asarray(self.history_years, dtype=float)
+            history_values = np.asarray(self.history_values, dtype=float)
+            # The boosters reproduce the few training years almost exactly, so their
+            # in-sample residuals would give bands of a fraction of a percent; the
+            # trend's leave-one-out residuals measure how far an unseen year lands
+            if method == 'residual' and len(history_years) < 3:
+                raise ValueError("Residual bands need at least three years of history")
+            residuals = loo_residuals(history_values, history_years).T
+            
+            args = (method, point, years.astype(float), horizons, residuals, history_years, history_values)
+            if executor is None:
+                samples = _simulate_chunk(*args, n_samples, np.random.SeedSequence(seed))
+            else:
+                chunks = getattr(executor, '_max_workers', None) or os.cpu_count() or 1
+                sizes = [len(part) for part in np.array_split(np.arange(n_samples), chunks) if len(part)]
+                seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+                futures = [executor.submit(_simulate_chunk, *args, size, chunk_seed)
+                           for size, chunk_seed in zip(sizes, seeds)]
+                samples = np.concatenate([future.result() for future in futures])
+            
+            if as_shares:
+                samples = samples / samples.sum(axis=1, keepdims=True)
+            
+            bands = np.percentile(samples, percentiles, axis=0)
+            return {
+                percentile: pd.DataFrame(band, index=self.sectors, columns=years)
+                for percentile, band in zip(percentiles, bands)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in simulate: {str(e)}")
+            raise
+
+    def train_models(self, data: pd.DataFrame, executor: Optional[Executor] = None) -> None:
         """
         Train models and calculate sector proportions.
         
+        Sectors are fitted concurrently. XGBoost's own thread count is divided
+        among the concurrent sectors so the pool does not oversubscribe the cores.
+        
         Args:
             data: DataFrame containing historical budget data
+            executor: Executor to fit sectors on; a thread or process pool sized by
+                ``training_workers`` is created (and shut down) when omitted
         """
         try:
+            self.version = hash_training_data(data)
+            self._ensure_estimators()
+            
             # Calculate sector proportions
             self.calculate_sector_proportions(data)
+            self._reset_running_stats(data)
             
-            # Train prediction models
-            for sector in self.sectors:
-                X = data[['Year']].values
-                y = data[sector].values
-                X_scaled = self.scalers[sector].fit_transform(X)
+            if self.engine == 'multi_output':
+                self._train_shared_models(data)
+                self.is_trained = True
+                logger.info(f"Multi-output models trained successfully for all sectors "
+                            f"({self.training_times['all'] * 1000:.1f}ms)")
+                return
+            
+            cpu_count = os.cpu_count() or 1
+            workers = self.training_workers or min(len(self.sectors), cpu_count)
+            threads_per_model = max(1, cpu_count // workers)
+            
+            X = data[['Year']].values
+            owns_executor = executor is None
+            if owns_executor:
+                pool_cls = ProcessPoolExecutor if self.training_backend == 'process' else ThreadPoolExecutor
+                executor = pool_cls(max_workers=workers)
+            
+            try:
+                # Train prediction models
+                futures = {}
+                for sector in self.sectors:
+                    booster = self.models[sector]['xgb']
+                    booster.set_params(n_jobs=threads_per_model)
+                    futures[sector] = executor.submit(
+                        _fit_sector_models, X, data[sector].values,
+                        self.scalers[sector], self.models[sector]['linear'], booster
+                    )
                 
-                self.models[sector]['linear'].fit(X_scaled, y)
-                self.models[sector]['xgb'].fit(X_scaled, y)
+                training_times = {}
+                for sector, future in futures.items():
+                    scaler, linear, booster, elapsed = future.result()
+                    self.scalers[sector] = scaler
+                    self.models[sector] = {'linear': linear, 'xgb': booster}
+                    training_times[sector] = elapsed
+            finally:
+                if owns_executor:
+                    executor.shutdown()
             
+            self.training_times = training_times
             self.is_trained = True
-            logger.info("Models trained successfully for all sectors")
+            logger.info("Models trained successfully for all sectors ("
+                        + ", ".join(f"{sector}: {seconds * 1000:.1f}ms" for sector, seconds in training_times.items())
+                        + ")")
             
         except Exception as e:
             logger.error(f"Error in train_models: {str(e)}")
             raise
 
-    def distribute_budget(self, total_budget: float, year: int) -> Dict[str, float]:
+    def _train_shared_models(self, data: pd.DataFrame) -> None:
+        """
+        Fit the shared scaler and the multi-target linear and XGBoost models.
+        
+        Args:
+            data: DataFrame containing historical budget data
+        """
+        started = time.perf_counter()
+        X_scaled = self.shared_scaler.fit_transform(data[['Year']].values)
+        Y = data[self.sectors].values
+        
+        self.shared_models['linear'].fit(X_scaled, Y)
+        self.shared_models['xgb'].fit(X_scaled, Y)
+        self.training_times = {'all': time.perf_counter() - started}
+
+    def _reset_running_stats(self, data: pd.DataFrame) -> None:
+        """
+        Build the sufficient statistics update() maintains from a full history.
+        
+        Years are stored relative to the first training year so the sums of
+        squares stay small enough to difference without losing precision.
+        
+        Args:
+            data: DataFrame containing historical budget data
+        """
+        years = data['Year'].to_numpy(dtype=float)
+        values = data[self.sectors].to_numpy(dtype=float)
+        totals = values.sum(axis=1)
+        proportions = values / totals[:, None]
+        steps = np.arange(len(years), dtype=float)
+        offsets = years - years[0]
+        
+        self.running_stats = {
+            'n': len(years),
+            'year0': float(years[0]),
+            # Proportion trend regresses each sector's share on the step index
+            'sum_t': steps.sum(),
+            'sum_t2': np.square(steps).sum(),
+            'sum_prop': proportions.sum(axis=0),
+            'sum_t_prop': steps @ proportions,
+            'sum_values': values.sum(axis=0),
+            'sum_total': totals.sum(),
+            # Linear models regress each sector's budget on the year
+            'sum_x': offsets.sum(),
+            'sum_x2': np.square(offsets).sum(),
+            'sum_x_values': offsets @ values
+        }
+        self.history_years = years.astype(int)
+        self.history_values = values
+        self.base_year = int(years.max())
+
+    def _refresh_from_running_stats(self) -> None:
+        """
+        Recompute sector proportions, trends and the linear models in closed form
+        from the running statistics, in O(sectors) for the default OLS trends.
+        """
+        stats = self.running_stats
+        n = stats['n']
+        
+        if self.trend_method == 'ols':
+            trend_denominator = n * stats['sum_t2'] - stats['sum_t'] ** 2
+            trends = (n * stats['sum_t_prop'] - stats['sum_t'] * stats['sum_prop']) / trend_denominator
+        else:
+            # Weighted and robust slopes have no running form; refit from the history
+            history = np.asarray(self.history_values)
+            trends = series_trends(history / history.sum(axis=1, keepdims=True),
+                                   self.trend_method, self.trend_half_life)
+        means = stats['sum_values'] / stats['sum_total']
+        self.sector_proportions = {
+            sector: {'mean': float(mean), 'trend': float(trend)}
+            for sector, mean, trend in zip(self.sectors, means, trends)
+        }
+        
+        # Ordinary least squares of budget on year, then re-expressed on the
+        # frozen scaler's standardized year so the fitted models stay compatible
+        slopes = (n * stats['sum_x_values'] - stats['sum_x'] * stats['sum_values']) / (n * stats['sum_x2'] - stats['sum_x'] ** 2)
+        intercepts = (stats['sum_values'] - slopes * stats['sum_x']) / n
+        
+        if self.engine == 'multi_output':
+            scaler = self.shared_scaler
+            centre = scaler.mean_[0] - stats['year0']
+            linear = self.shared_models['linear']
+            linear.coef_ = (slopes * scaler.scale_[0]).reshape(-1, 1)
+            linear.intercept_ = intercepts + slopes * centre
+        else:
+            for i, sector in enumerate(self.sectors):
+                scaler = self.scalers[sector]
+                centre = scaler.mean_[0] - stats['year0']
+                linear = self.models[sector]['linear']
+                linear.coef_ = np.array([slopes[i] * scaler.scale_[0]])
+                linear.intercept_ = float(intercepts[i] + slopes[i] * centre)
+
+    def update(self, year_row: Union[Dict[str, float], pd.Series], boost_rounds: int = 10) -> None:
+        """
+        Fold one new fiscal year of actuals into the trained model.
+        
+        Proportions, trends and linear models are updated from running sums in
+        O(sectors). Scalers are kept frozen and the XGBoost boosters continue
+        training from their current trees for ``boost_rounds`` extra rounds
+        instead of being refitted from scratch.
+        
+        Args:
+            year_row: Mapping with a ``Year`` key and one budget per sector
+            boost_rounds: Trees added to each booster
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before it can be updated")
+            if not self.running_stats:
+                raise RuntimeError("Model has no running statistics; retrain it with train_models")
+            self._ensure_estimators()
+            
+            year = int(year_row['Year'])
+            if year <= self.base_year:
+                raise ValueError(f"Year {year} is not after the last trained year {self.base_year}")
+            values = np.array([float(year_row[sector]) for sector in self.sectors])
+            total = values.sum()
+            proportions = values / total
+            
+            stats = self.running_stats
+            step = float(stats['n'])
+            offset = year - stats['year0']
+            stats['n'] += 1
+            stats['sum_t'] += step
+            stats['sum_t2'] += step ** 2
+            stats['sum_prop'] = stats['sum_prop'] + proportions
+            stats['sum_t_prop'] = stats['sum_t_prop'] + step * proportions
+            stats['sum_values'] = stats['sum_values'] + values
+            stats['sum_total'] += total
+            stats['sum_x'] += offset
+            stats['sum_x2'] += offset ** 2
+            stats['sum_x_values'] = stats['sum_x_values'] + offset * values
+            self.history_years = np.append(self.history_years, year)
+            self.history_values = np.vstack([self.history_values, values])
+            self._refresh_from_running_stats()
+            
+            X = self.history_years.reshape(-1, 1)
+            
+            started = time.perf_counter()
+            if self.engine == 'multi_output':
+                _continue_booster(self.shared_models['xgb'], self.shared_scaler.transform(X),
+                                  self.history_values, boost_rounds)
+            else:
+                for i, sector in enumerate(self.sectors):
+                    _continue_booster(self.models[sector]['xgb'], self.scalers[sector].transform(X),
+                                      self.history_values[:, i], boost_rounds)
+            
+            self.base_year = year
+            self.version = hashlib.sha256(
+                f"{self.version}:{year}:{values.tolist()}".encode('utf-8')
+            ).hexdigest()
+            logger.info(f"Model updated with {year} actuals in {(time.perf_counter() - started) * 1000:.1f}ms")
+            
+        except Exception as e:
+            logger.error(f"Error in update: {str(e)}")
+            raise
+
+    def set_taxonomy(self, taxonomy: SectorTaxonomy) -> None:
+        """
+        Break distributions down through a sector taxonomy.
+        
+        Args:
+            taxonomy: Taxonomy whose top level is this model's sectors
+        """
+        self.taxonomy = taxonomy.with_roots(self.sectors)
+
+    def distribute_budget(self, total_budget: float, year: int, level: Union[int, str] = 0) -> Dict[str, float]:
         """
         Distribute total budget across sectors based on historical proportions and trends.
         
         Args:
             total_budget: Total budget to distribute
             year: Year for which to make the distribution
+            level: Taxonomy depth to report (0 for the sectors) or 'leaves'
+            
+        Returns:
+            Dict[str, float]: Distributed budget for each sector (or taxonomy node)
+        """
+        try:
+            proportions = self.sector_proportion_matrix([year])[:, 0]
+            
+            # Split each sector's budget down the taxonomy in one pass per depth
+            amounts = self.taxonomy.distribute(total_budget * proportions)
+            return self.taxonomy.to_dict(amounts, level)
+            
+        except Exception as e:
+            logger.error(f"Error in distribute_budget: {str(e)}")
+            raise
+
+    def sector_proportion_matrix(self, years: Union[List[int], np.ndarray]) -> np.ndarray:
+        """
+        Trend-adjusted, normalized sector proportions for many years.
+        
+        Args:
+            years: Years for which to compute proportions
             
         Returns:
-            Dict[str, float]: Distributed budget for each sector
+            np.ndarray: Array of shape (sectors, years) whose columns sum to 1
         """
         try:
             if not self.is_trained:
                 raise RuntimeError("Model must be trained before making predictions")
             
-            # Calculate base proportions with trend adjustment
-            proportions = {}
-            total_proportion = 0
+            years = np.asarray(years, dtype=float).reshape(-1)
+            base_proportions = np.array([self.sector_proportions[sector]['mean'] for sector in self.sectors])
+            trends = np.array([self.sector_proportions[sector]['trend'] for sector in self.sectors])
             
-            for sector in self.sectors:
-                # Get base proportion and trend
-                base_proportion = self.sector_proportions[sector]['mean']
-                trend = self.sector_proportions[sector]['trend']
-                
-                # Adjust proportion based on trend
-                years_from_base = year - 2023  # Assuming 2023 is the last year in training data
-                adjusted_proportion = base_proportion + (trend * years_from_base)
-                
-                # Ensure proportion is not negative
-                adjusted_proportion = max(0.01, adjusted_proportion)  # Minimum 1% allocation
-                proportions[sector] = adjusted_proportion
-                total_proportion += adjusted_proportion
+            # Adjust proportion based on trend
+            years_from_base = years - self.base_year
+            proportions = base_proportions[:, None] + trends[:, None] * years_from_base[None, :]
+            
+            # Ensure proportion is not negative
+            proportions = np.maximum(proportions, 0.01)  # Minimum 1% allocation
             
             # Normalize proportions to sum to 1
-            normalized_proportions = {
-                sector: prop / total_proportion
-                for sector, prop in proportions.items()
-            }
+            return proportions / proportions.sum(axis=0, keepdims=True)
             
-            # Calculate final budget distribution
-            distribution = {
-                sector: total_budget * proportion
-                for sector, proportion in normalized_proportions.items()
-            }
+        except Exception as e:
+            logger.error(f"Error in sector_proportion_matrix: {str(e)}")
+            raise
+
+    def distribute_budget_many(self, total_budgets: Union[float, List[float], np.ndarray],
+                               years: Union[List[int], np.ndarray], level: Union[int, str] = 0) -> pd.DataFrame:
+        """
+        Distribute budgets across sectors for many years in one pass.
+        
+        Args:
+            total_budgets: Total budget per year, or a single budget used for every year
+            years: Years for which to make the distribution
+            level: Taxonomy depth to report (0 for the sectors) or 'leaves'
             
-            return distribution
+        Returns:
+            pd.DataFrame: Distributed budgets indexed by sector (or taxonomy node) with one column per year
+        """
+        try:
+            years = np.asarray(years, dtype=int).reshape(-1)
+            total_budgets = np.broadcast_to(np.asarray(total_budgets, dtype=float), years.shape)
+            
+            distribution = self.taxonomy.distribute(self.sector_proportion_matrix(years) * total_budgets[None, :])
+            nodes = self.taxonomy.select(level)
+            return pd.DataFrame(distribution[nodes], index=[self.taxonomy.names[i] for i in nodes.tolist()],
+                                columns=years)
             
         except Exception as e:
-            logger.error(f"Error in distribute_budget: {str(e)}")
+            logger.error(f"Error in distribute_budget_many: {str(e)}")
             raise
 
     def display_distribution(self, total_budget: float, year: int) -> None:
@@ -229,4 +761,173 @@ class BudgetForecastModel:
             
         except Exception as e:
             logger.error(f"Error in display_distribution: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def save(self, directory: str) -> None:
+        """
+        Save the trained model to a directory.
+
+        Linear and scaler parameters are stored as one .npy array per parameter
+        so they can be memory-mapped on load; XGBoost boosters use their native
+        UBJSON format.
+
+        Args:
+            directory: Existing directory to write the artifact files into
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before saving")
+            self._ensure_estimators()
+
+            if self.engine == 'multi_output':
+                scalers = [self.shared_scaler]
+                linear_coef = self.shared_models['linear'].coef_
+                linear_intercept = self.shared_models['linear'].intercept_
+            else:
+                scalers = [self.scalers[sector] for sector in self.sectors]
+                linear_coef = np.stack([self.models[sector]['linear'].coef_ for sector in self.sectors])
+                linear_intercept = np.array([self.models[sector]['linear'].intercept_ for sector in self.sectors])
+            
+            with open(os.path.join(directory, 'state.json'), 'w') as f:
+                json.dump({
+                    'engine': self.engine,
+                    'trend_method': self.trend_method,
+                    'trend_half_life': self.trend_half_life,
+                    'base_year': self.base_year,
+                    'running_stats': {
+                        key: value.tolist() if isinstance(value, np.ndarray) else value
+                        for key, value in self.running_stats.items()
+                    },
+                    'sectors': self.sectors,
+                    'n_samples': int(scalers[0].n_samples_seen_),
+                    'xgb_params': _booster_params(self.shared_models['xgb'] if self.engine == 'multi_output'
+                                                  else self.models[self.sectors[0]]['xgb']),
+                    'sector_proportions': {
+                        sector: {key: float(value) for key, value in proportion.items()}
+                        for sector, proportion in self.sector_proportions.items()
+                    }
+                }, f, indent=2)
+
+            np.save(os.path.join(directory, 'history_years.npy'), self.history_years)
+            np.save(os.path.join(directory, 'history_values.npy'), self.history_values)
+            np.save(os.path.join(directory, 'linear_coef.npy'), linear_coef)
+            np.save(os.path.join(directory, 'linear_intercept.npy'), linear_intercept)
+            np.save(os.path.join(directory, 'scaler_mean.npy'), np.stack([scaler.mean_ for scaler in scalers]))
+            np.save(os.path.join(directory, 'scaler_scale.npy'), np.stack([scaler.scale_ for scaler in scalers]))
+
+            if self.engine == 'multi_output':
+                self.shared_models['xgb'].save_model(os.path.join(directory, 'xgb_shared.ubj'))
+            else:
+                for i, sector in enumerate(self.sectors):
+                    self.models[sector]['xgb'].save_model(os.path.join(directory, f'xgb_{i}.ubj'))
+
+        except Exception as e:
+            logger.error(f"Error in save: {str(e)}")
+            raise
+
+    @classmethod
+    def load(cls, directory: str, lazy: bool = False) -> 'BudgetForecastModel':
+        """
+        Load a model previously written by save().
+
+        Args:
+            directory: Artifact directory
+            lazy: Defer restoring the scalers, linear models and boosters (and
+                importing scikit-learn and XGBoost) until a method needs them;
+                proportion-based distributions work without them
+
+        Returns:
+            BudgetForecastModel: Trained model ready for predictions
+        """
+        try:
+            with open(os.path.join(directory, 'state.json')) as f:
+                state = json.load(f)
+
+            model = cls(engine=state['engine'], sectors=state['sectors'],
+                        trend_method=state.get('trend_method', 'ols'),
+                        trend_half_life=state.get('trend_half_life', 3.0))
+            model.sector_proportions = state['sector_proportions']
+            model.base_year = state['base_year']
+            model.running_stats = {
+                key: np.array(value) if isinstance(value, list) else value
+                for key, value in state['running_stats'].items()
+            }
+            model.history_years = np.load(os.path.join(directory, 'history_years.npy'), mmap_mode='r')
+            model.history_values = np.load(os.path.join(directory, 'history_values.npy'), mmap_mode='r')
+
+            # Fail now rather than on the first prediction if a booster is missing
+            booster_files = (['xgb_shared.ubj'] if model.engine == 'multi_output'
+                             else [f'xgb_{i}.ubj' for i in range(len(model.sectors))])
+            for name in booster_files:
+                if not os.path.exists(os.path.join(directory, name)):
+                    raise FileNotFoundError(f"Missing booster file {name}")
+
+            model._estimator_source = directory
+            if not lazy:
+                model._ensure_estimators()
+
+            model.is_trained = True
+            return model
+
+        except Exception as e:
+            logger.error(f"Error in load: {str(e)}")
+            raise
+
+    def _restore_estimators(self, directory: str) -> None:
+        """
+        Rebuild the fitted scalers, linear models and boosters from an artifact.
+
+        Args:
+            directory: Artifact directory written by save()
+        """
+        LinearRegression, StandardScaler = _sklearn()
+        xgboost = _xgboost()
+
+        with open(os.path.join(directory, 'state.json')) as f:
+            state = json.load(f)
+        n_samples = state['n_samples']
+        # Artifacts saved before the parameters were recorded used the defaults of _new_booster
+        xgb_params = state.get('xgb_params') or _booster_params(
+            _new_booster(tree_method='hist', multi_strategy='multi_output_tree') if self.engine == 'multi_output'
+            else _new_booster()
+        )
+
+        linear_coef = np.load(os.path.join(directory, 'linear_coef.npy'), mmap_mode='r')
+        linear_intercept = np.load(os.path.join(directory, 'linear_intercept.npy'), mmap_mode='r')
+        scaler_mean = np.load(os.path.join(directory, 'scaler_mean.npy'), mmap_mode='r')
+        scaler_scale = np.load(os.path.join(directory, 'scaler_scale.npy'), mmap_mode='r')
+
+        def restore_scaler(i: int) -> 'StandardScaler':
+            scaler = StandardScaler()
+            scaler.mean_ = scaler_mean[i]
+            scaler.scale_ = scaler_scale[i]
+            scaler.var_ = np.square(scaler_scale[i])
+            scaler.n_features_in_ = scaler_mean.shape[1]
+            scaler.n_samples_seen_ = n_samples
+            return scaler
+
+        if self.engine == 'multi_output':
+            linear = LinearRegression()
+            linear.coef_ = linear_coef
+            linear.intercept_ = linear_intercept
+            linear.n_features_in_ = linear_coef.shape[1]
+
+            booster = xgboost.XGBRegressor(**xgb_params)
+            booster.load_model(os.path.join(directory, 'xgb_shared.ubj'))
+
+            self.shared_models = {'linear': linear, 'xgb': booster}
+            self.shared_scaler = restore_scaler(0)
+        else:
+            for i, sector in enumerate(self.sectors):
+                linear = LinearRegression()
+                linear.coef_ = linear_coef[i]
+                linear.intercept_ = float(linear_intercept[i])
+                linear.n_features_in_ = linear_coef.shape[1]
+
+                booster = xgboost.XGBRegressor(**xgb_params)
+                booster.load_model(os.path.join(directory, f'xgb_{i}.ubj'))
+
+                self.models[sector] = {'linear': linear, 'xgb': booster}
+                self.scalers[sector] = restore_scaler(i)
+
+        logger.info(f"Restored forecast estimators from {directory}")
\ No newline at end of file
@@ -1,9 +1,14 @@
+import json
+import os
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import logging
 
+from model_store import hash_training_data
+from reallocation import ReallocationPolicy
+from taxonomy import DEFAULT_SECTORS, SectorTaxonomy
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,12 +17,25 @@ class DisasterFundModel:
     def __init__(self):
         
         try:
-            self.sectors = ['Healthcare', 'Education', 'Defence', 'Infrastructure', 'Agriculture', 'Environment']
+            self.sectors = list(DEFAULT_SECTORS)
+            # Heads below the sectors that adjustments can be broken down to (see set_taxonomy)
+            self.taxonomy = SectorTaxonomy.flat(self.sectors)
             self.severity_weights = {
                 1: 0.1, 2: 0.2, 3: 0.3, 4: 0.4, 5: 0.5,
                 6: 0.6, 7: 0.7, 8: 0.8, 9: 0.9, 10: 1.0
             }
+            # Base proportions (can be adjusted based on sector priorities)
+            self.base_proportions = {
+                'Healthcare': 0.15,
+                'Education': 0.20,
+                'Defence': 0.25,
+                'Infrastructure': 0.20,
+                'Agriculture': 0.10,
+                'Environment': 0.10
+            }
+            self._build_lookup_tables()
             self.is_trained = False
+            self.version = None  # Hash of the training data (see hash_training_data)
             logger.info("DisasterFundModel initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing DisasterFundModel: {str(e)}")
@@ -31,6 +49,8 @@ class DisasterFundModel:
             disaster_data: DataFrame containing historical disaster information
         """
         try:
+            self.version = hash_training_data(disaster_data)
+            
             # Calculate average damage and allocation ratios
             self.avg_damage_ratio = disaster_data['Budget_Allocated_Cr'].mean() / disaster_data['Estimated_Damage_Cr'].mean()
             self.severity_allocation_ratio = disaster_data['Budget_Allocated_Cr'].mean() / disaster_data['Severity(1-10)'].mean()
@@ -70,48 +90,219 @@ class DisasterFundModel:
             logger.error(f"Error in calculate_disaster_fund: {str(e)}")
             raise
 
-    def adjust_sector_budgets(self, total_budget: float, disaster_fund: float) -> Tuple[Dict[str, float], Dict[str, float]]:
+    def set_taxonomy(self, taxonomy: SectorTaxonomy) -> None:
+        """
+        Break budget adjustments down through a sector taxonomy.
+        
+        Args:
+            taxonomy: Taxonomy whose top level is this model's sectors
+        """
+        self.taxonomy = taxonomy.with_roots(self.sectors)
+
+    def adjust_sector_budgets(self, total_budget: float, disaster_fund: float, level: Union[int, str] = 0,
+                              policy: Optional[ReallocationPolicy] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
         """
         Calculate budget adjustments for each sector to accommodate disaster fund.
         
         Args:
             total_budget: Total available budget in crores
             disaster_fund: Required disaster fund in crores
+            level: Taxonomy depth to report (0 for the sectors) or 'leaves'
+            policy: Floors, priorities and max cuts of the heads at ``level``
             
         Returns:
-            Tuple[Dict[str, float], Dict[str, float]]: Original and adjusted sector budgets
+            Tuple[Dict[str, float], Dict[str, float]]: Original and adjusted budgets
+            per sector (or taxonomy node)
+        """
+        try:
+            original_budgets, adjusted_budgets, _ = self.reallocate(total_budget, disaster_fund, level, policy)
+            names = self.head_names(level)
+            return dict(zip(names, original_budgets.tolist())), dict(zip(names, adjusted_budgets.tolist()))
+            
+        except Exception as e:
+            logger.error(f"Error in adjust_sector_budgets: {str(e)}")
+            raise
+
+    def head_names(self, level: Union[int, str] = 0) -> List[str]:
+        """Names of the heads adjustments at ``level`` are reported for, in column order."""
+        return [self.taxonomy.names[i] for i in self.taxonomy.select(level).tolist()]
+
+    def reallocate(self, total_budgets: np.ndarray, disaster_funds: np.ndarray, level: Union[int, str] = 0,
+                   policy: Optional[ReallocationPolicy] = None,
+                   original_budgets: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Carve disaster funds out of the budget heads at a taxonomy level.
+        
+        Without a policy every head gives up the same share of the fund as it
+        holds of the budget, and no head is cut below zero. The policy's floors,
+        priorities and max cuts are solved for all scenarios at once by water
+        filling (see reallocation.waterfill).
+        
+        Args:
+            total_budgets: Total available budget in crores per scenario
+            disaster_funds: Required disaster fund in crores per scenario
+            level: Taxonomy depth to reallocate (0 for the sectors) or 'leaves'
+            policy: Floors, priorities and max cuts of the heads at ``level``
+            original_budgets: Optional original split of shape (scenarios, heads)
+                replacing the model's proportions of ``total_budgets``
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Original and adjusted
+            budgets of shape (scenarios, heads), with columns ordered as
+            ``head_names(level)``, and the fund left unfunded per scenario
         """
         try:
             if not self.is_trained:
                 raise RuntimeError("Model must be trained before making predictions")
             
-            # Calculate base proportions (can be adjusted based on sector priorities)
-            base_proportions = {
-                'Healthcare': 0.15,
-                'Education': 0.20,
-                'Defence': 0.25,
-                'Infrastructure': 0.20,
-                'Agriculture': 0.10,
-                'Environment': 0.10
-            }
+            nodes = self.taxonomy.select(level)
+            total_budgets, disaster_funds = np.broadcast_arrays(
+                np.asarray(total_budgets, dtype=float), np.asarray(disaster_funds, dtype=float)
+            )
+            shape = total_budgets.shape
             
-            # Calculate original sector budgets
-            original_budgets = {
-                sector: total_budget * proportion
-                for sector, proportion in base_proportions.items()
-            }
+            if original_budgets is None:
+                original_budgets = total_budgets.reshape(-1, 1) * self.base_proportion_vector
+                if level != 0:
+                    # Heads on the leading axis so each depth is one fancy-indexed multiply
+                    original_budgets = self.taxonomy.distribute(original_budgets.T)[nodes].T
+            else:
+                original_budgets = np.broadcast_to(np.asarray(original_budgets, dtype=float),
+                                                   (total_budgets.size, len(nodes)))
             
-            # Calculate proportional cuts
-            total_cut = disaster_fund
-            adjusted_budgets = {}
+            cuts, unfunded = (policy or ReallocationPolicy()).cuts(
+                original_budgets, disaster_funds.reshape(-1), self.head_names(level)
+            )
+            adjusted_budgets = original_budgets - cuts
+            heads = shape + (len(nodes),)
+            return original_budgets.reshape(heads), adjusted_budgets.reshape(heads), unfunded.reshape(shape)
             
-            for sector in self.sectors:
-                # Calculate proportional cut based on sector budget
-                sector_cut = (original_budgets[sector] / total_budget) * total_cut
-                adjusted_budgets[sector] = original_budgets[sector] - sector_cut
+        except Exception as e:
+            logger.error(f"Error in reallocate: {str(e)}")
+            raise
+
+    def _build_lookup_tables(self) -> None:
+        """
+        Precompute the array forms of the sector proportions and severity weights
+        used by the batch methods.
+        """
+        self.base_proportion_vector = np.array([self.base_proportions[sector] for sector in self.sectors])
+        self._severity_levels = np.array(sorted(self.severity_weights))
+        self._severity_level_weights = np.array([self.severity_weights[level] for level in self._severity_levels])
+
+    def _severity_factors(self, severities: np.ndarray) -> np.ndarray:
+        """
+        Look up severity weights for an array of severity levels.
+        
+        Args:
+            severities: Integer severity levels
             
+        Returns:
+            np.ndarray: Weight per level, 0.5 for levels without a weight
+        """
+        levels = self._severity_levels
+        positions = np.clip(np.searchsorted(levels, severities), 0, len(levels) - 1)
+        return np.where(levels[positions] == severities, self._severity_level_weights[positions], 0.5)
+
+    def calculate_disaster_fund_batch(self, severities: np.ndarray, estimated_damages: np.ndarray) -> np.ndarray:
+        """
+        Calculate required disaster funds for many scenarios at once.
+        
+        Args:
+            severities: Severity levels (1-10), one per scenario
+            estimated_damages: Estimated damages in crores, broadcast against severities
+            
+        Returns:
+            np.ndarray: Required disaster fund in crores per scenario
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before making predictions")
+            
+            severities, estimated_damages = np.broadcast_arrays(
+                np.asarray(severities, dtype=int), np.asarray(estimated_damages, dtype=float)
+            )
+            return estimated_damages * self.avg_damage_ratio * self._severity_factors(severities)
+            
+        except Exception as e:
+            logger.error(f"Error in calculate_disaster_fund_batch: {str(e)}")
+            raise
+
+    def adjust_sector_budgets_batch(self, total_budgets: np.ndarray, disaster_funds: np.ndarray,
+                                    level: Union[int, str] = 0,
+                                    policy: Optional[ReallocationPolicy] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate sector budget adjustments for many scenarios at once.
+        
+        Args:
+            total_budgets: Total available budget in crores per scenario
+            disaster_funds: Required disaster fund in crores per scenario
+            level: Taxonomy depth to report (0 for the sectors) or 'leaves'
+            policy: Floors, priorities and max cuts of the heads at ``level``
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Original and adjusted budgets, each of
+            shape (scenarios, heads) with columns ordered as ``self.sectors``, or
+            as ``taxonomy.select(level)`` below the top level
+        """
+        try:
+            original_budgets, adjusted_budgets, _ = self.reallocate(total_budgets, disaster_funds, level, policy)
             return original_budgets, adjusted_budgets
             
         except Exception as e:
-            logger.error(f"Error in adjust_sector_budgets: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error(f"Error in adjust_sector_budgets_batch: {str(e)}")
+            raise
+
+    def save(self, directory: str) -> None:
+        """
+        Save the trained model parameters to a directory.
+        
+        Args:
+            directory: Existing directory to write the artifact files into
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before saving")
+            
+            with open(os.path.join(directory, 'state.json'), 'w') as f:
+                json.dump({
+                    'sectors': self.sectors,
+                    'base_proportions': self.base_proportions,
+                    'severity_weights': {str(level): weight for level, weight in self.severity_weights.items()},
+                    'avg_damage_ratio': float(self.avg_damage_ratio),
+                    'severity_allocation_ratio': float(self.severity_allocation_ratio)
+                }, f, indent=2)
+            
+        except Exception as e:
+            logger.error(f"Error in save: {str(e)}")
+            raise
+
+    @classmethod
+    def load(cls, directory: str) -> 'DisasterFundModel':
+        """
+        Load a model previously written by save().
+        
+        Args:
+            directory: Artifact directory
+            
+        Returns:
+            DisasterFundModel: Trained model
+        """
+        try:
+            with open(os.path.join(directory, 'state.json')) as f:
+                state = json.load(f)
+            
+            model = cls()
+            model.sectors = state['sectors']
+            model.taxonomy = SectorTaxonomy.flat(model.sectors)
+            model.base_proportions = state['base_proportions']
+            model.severity_weights = {int(level): weight for level, weight in state['severity_weights'].items()}
+            model.avg_damage_ratio = state['avg_damage_ratio']
+            model.severity_allocation_ratio = state['severity_allocation_ratio']
+            model._build_lookup_tables()
+            model.is_trained = True
+            return model
+            
+        except Exception as e:
+            logger.error(f"Error in load: {str(e)}")
+            raise
\ No newline at end of file
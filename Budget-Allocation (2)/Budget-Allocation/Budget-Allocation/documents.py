@@ -0,0 +1,206 @@
+"""
+Write the precompressed copies of the budget PDFs that the server sends.
+
+    python documents.py
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import logging
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are produced without it
+    brotli = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File types served from the document folder
+DOCUMENT_EXTENSIONS = ('.pdf',)
+
+# A precompressed variant is kept only if it is at least this much smaller
+MIN_COMPRESSION_SAVING = 0.10
+
+# Content-Encoding values with their file suffix, in server preference order
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class DocumentLibrary:
+    """
+    Published budget documents served with validators and precompressed variants.
+
+    Each document's strong ETag is a content hash computed once per
+    (size, mtime) and cached, so conditional requests are answered without
+    reading the file. Compressed copies live in a separate cache directory;
+    they are written by precompress() as a build step (see main) and the
+    server only sends the ones that exist and are newer than their source.
+    """
+
+    def __init__(self, root: str, cache_dir: Optional[str] = None):
+        """
+        Args:
+            root: Folder holding the documents
+            cache_dir: Folder for precompressed variants (default: no variants)
+        """
+        self.root = os.path.abspath(root)
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        self._etags: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.lower().endswith(DOCUMENT_EXTENSIONS) and os.path.isfile(os.path.join(self.root, name))
+        )
+
+    def path(self, name: str) -> Optional[str]:
+        """Absolute path of a published document, or None for anything else (including traversal attempts)."""
+        if name not in self.names():
+            return None
+        return os.path.join(self.root, name)
+
+    def etag(self, name: str) -> str:
+        """
+        Strong entity tag of a document's current content.
+
+        Args:
+            name: Document file name
+
+        Returns:
+            str: Hex digest, recomputed only when the file's size or mtime changes
+        """
+        path = os.path.join(self.root, name)
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._etags.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        etag = digest.hexdigest()[:32]
+        with self._lock:
+            self._etags[name] = (key, etag)
+        return etag
+
+    def describe(self) -> List[Dict]:
+        documents = []
+        for name in self.names():
+            stat = os.stat(os.path.join(self.root, name))
+            documents.append({
+                'name': name,
+                'size': stat.st_size,
+                'lastModified': int(stat.st_mtime),
+                'encodings': [encoding for encoding, _ in ENCODINGS if self.variant(name, encoding)]
+            })
+        return documents
+
+    def _variant_path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, name + suffix)
+
+    def variant(self, name: str, encoding: str) -> Optional[str]:
+        """
+        Path of an up-to-date precompressed copy of a document.
+
+        Args:
+            name: Document file name
+            encoding: Content-Encoding ('br' or 'gzip')
+
+        Returns:
+            Optional[str]: Variant path, or None if there is no current variant
+        """
+        if self.cache_dir is None:
+            return None
+        suffix = dict(ENCODINGS).get(encoding)
+        variant = self._variant_path(name, suffix) if suffix else None
+        if variant is None or not os.path.exists(variant):
+            return None
+        if os.path.getmtime(variant) < os.path.getmtime(os.path.join(self.root, name)):
+            return None
+        return variant
+
+    def precompress(self) -> Dict[str, List[str]]:
+        """
+        Write gzip (and, if the brotli package is installed, brotli) copies of
+        every document whose variants are missing or older than the source.
+
+        Variants saving less than MIN_COMPRESSION_SAVING are not kept; PDF
+        streams are usually compressed already, so many documents have none.
+
+        Returns:
+            Dict[str, List[str]]: Encodings available per document
+        """
+        if self.cache_dir is None:
+            return {}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            compressors = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressors['br'] = lambda data: brotli.compress(data, quality=11)
+
+            available = {}
+            for name in self.names():
+                source = os.path.join(self.root, name)
+                source_mtime = os.path.getmtime(source)
+                data = None
+                available[name] = []
+                for encoding, suffix in ENCODINGS:
+                    if encoding not in compressors:
+                        continue
+                    variant = self._variant_path(name, suffix)
+                    # An empty marker records that compression was tried and did not pay off
+                    skipped = variant + '.skip'
+                    if os.path.exists(variant) and os.path.getmtime(variant) >= source_mtime:
+                        available[name].append(encoding)
+                        continue
+                    if os.path.exists(skipped) and os.path.getmtime(skipped) >= source_mtime:
+                        continue
+
+                    if data is None:
+                        with open(source, 'rb') as f:
+                            data = f.read()
+                    compressed = compressors[encoding](data)
+                    if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+                        open(skipped, 'w').close()
+                        continue
+
+                    # Write then rename so a concurrent reader never sees a partial file
+                    staging = f"{variant}.{os.getpid()}.tmp"
+                    with open(staging, 'wb') as f:
+                        f.write(compressed)
+                    os.replace(staging, variant)
+                    available[name].append(encoding)
+                    logger.info(f"Precompressed {name} with {encoding}: {len(data)} -> {len(compressed)} bytes")
+
+            return available
+
+        except Exception as e:
+            logger.error(f"Error in precompress: {str(e)}")
+            raise
+
+
+def main() -> None:
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', default=os.path.join(app_dir, 'pdf folder'))
+    parser.add_argument('--cache-dir',
+                        default=os.environ.get('DOCUMENT_CACHE_DIR', os.path.join(app_dir, 'document_cache')))
+    args = parser.parse_args()
+
+    available = DocumentLibrary(args.documents, cache_dir=args.cache_dir).precompress()
+    for name, encodings in available.items():
+        print(f"{name}: {', '.join(encodings) or 'no variant smaller than the original'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+import io
+from typing import Dict, Iterator, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from sweep import parse_axis
+from taxonomy import LEAVES
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only CSV exports (written by pandas) are available without it
+    pa = None
+    pa_csv = None
+    pq = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Output formats with their media type and file extension
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+
+# Scenario parameters of each dataset, in grid order, with their defaults
+EXPORT_AXES = {
+    'forecast': {'year': None, 'totalBudget': 225000.0},  # year defaults to the year after the training data
+    'disaster': {'severity': 5, 'estimatedDamage': 1000.0, 'totalBudget': 225000.0}
+}
+
+# Lowest and highest disaster severity the disaster model is calibrated for
+SEVERITY_RANGE = (1, 10)
+
+# Rows per written chunk: one CSV block, Arrow record batch or Parquet row group
+EXPORT_CHUNK_ROWS = 65536
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class AllocationExporter:
+    """
+    Builds scenario-by-sector allocation tables straight from the models' batch
+    methods, one chunk of rows at a time.
+
+    Each chunk is a DataFrame of numpy columns, with the sector as a
+    categorical column. It is encoded and yielded before the next one is
+    computed, so an export of millions of rows needs memory for one chunk only.
+    """
+
+    def __init__(self, forecast_model, disaster_model, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                 max_rows: int = 50_000_000):
+        self.forecast_model = forecast_model
+        self.disaster_model = disaster_model
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+
+    def parse(self, dataset: str, spec: Dict) -> Tuple[Dict[str, np.ndarray], Union[int, str]]:
+        """
+        Build the scenario axes and taxonomy level of an export request.
+
+        Args:
+            dataset: 'forecast' or 'disaster'
+            spec: Axis specs as accepted by sweep.parse_axis, plus an optional ``level``
+
+        Returns:
+            Tuple of the axes (in EXPORT_AXES order) and the taxonomy level
+        """
+        if dataset not in EXPORT_AXES:
+            raise ValueError(f"Unknown export {dataset!r}; expected one of {sorted(EXPORT_AXES)}")
+
+        level = spec.get('level', 0)
+        level = LEAVES if level == LEAVES else int(level)
+        defaults = dict(EXPORT_AXES[dataset])
+        if 'year' in defaults:
+            defaults['year'] = self.forecast_model.base_year + 1
+        axes = {name: parse_axis(name, spec.get(name, default)) for name, default in defaults.items()}
+        if not np.all(axes['totalBudget'] > 0):
+            raise ValueError("Budget amount must be greater than 0")
+        if 'severity' in axes and not np.all((axes['severity'] >= SEVERITY_RANGE[0])
+                                             & (axes['severity'] <= SEVERITY_RANGE[1])):
+            raise ValueError(f"Severity must be between {SEVERITY_RANGE[0]} and {SEVERITY_RANGE[1]}")
+        if 'estimatedDamage' in axes and not np.all(axes['estimatedDamage'] >= 0):
+            raise ValueError("Estimated damage must not be negative")
+
+        model = self.forecast_model if dataset == 'forecast' else self.disaster_model
+        rows = int(np.prod([len(values) for values in axes.values()])) * len(model.taxonomy.select(level))
+        if rows == 0:
+            raise ValueError("Every export parameter needs at least one value")
+        if rows > self.max_rows:
+            raise ValueError(f"Export of {rows} rows exceeds the limit of {self.max_rows}")
+        return axes, level
+
+    def _scenario_chunks(self, axes: Dict[str, np.ndarray], heads: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Scenario parameters in chunks of about chunk_rows output rows (heads rows per scenario)."""
+        shape = tuple(len(values) for values in axes.values())
+        scenarios = int(np.prod(shape))
+        step = max(1, self.chunk_rows // heads)
+        for start in range(0, scenarios, step):
+            indices = np.unravel_index(np.arange(start, min(start + step, scenarios)), shape)
+            yield {name: values[index] for (name, values), index in zip(axes.items(), indices)}
+
+    @staticmethod
+    def _sector_column(taxonomy, nodes: np.ndarray, scenarios: int) -> pd.Categorical:
+        """Head names repeated for every scenario, as codes into the level's names."""
+        names = [taxonomy.names[i] for i in nodes.tolist()]
+        return pd.Categorical.from_codes(np.tile(np.arange(len(nodes)), scenarios), categories=names)
+
+    def forecast_chunks(self, axes: Dict[str, np.ndarray], level: Union[int, str] = 0) -> Iterator[pd.DataFrame]:
+        """
+        Forecast allocations, one row per year, total budget and head.
+
+        Args:
+            axes: ``year`` and ``totalBudget`` axes from parse()
+            level: Taxonomy depth or 'leaves'
+
+        Yields:
+            pd.DataFrame: Chunk with year, total_budget, sector, amount and share
+            columns (plus the regression forecast as ``predicted`` at level 0)
+        """
+        try:
+            taxonomy = self.forecast_model.taxonomy
+            nodes = taxonomy.select(level)
+            for params in self._scenario_chunks(axes, len(nodes)):
+                years, year_rows = np.unique(params['year'], return_inverse=True)
+                budgets = params['totalBudget']
+                proportions = self.forecast_model.sector_proportion_matrix(years)[:, year_rows]
+                # (heads, scenarios) -> scenario-major rows
+                amounts = taxonomy.distribute(proportions * budgets[None, :])[nodes].T
+
+                chunk = {
+                    'year': np.repeat(params['year'], len(nodes)).astype(np.int32),
+                    'total_budget': np.repeat(budgets, len(nodes)),
+                    'sector': self._sector_column(taxonomy, nodes, len(budgets)),
+                    'amount': np.round(amounts.reshape(-1), 2),
+                    'share': np.round((amounts / budgets[:, None]).reshape(-1), 6)
+                }
+                if level == 0:
+                    predicted = self.forecast_model.predict_many(years).to_numpy()[:, year_rows]
+                    chunk['predicted'] = np.round(predicted.T.reshape(-1), 2)
+                yield pd.DataFrame(chunk)
+
+        except Exception as e:
+            logger.error(f"Error in forecast_chunks: {str(e)}")
+            raise
+
+    def disaster_chunks(self, axes: Dict[str, np.ndarray], level: Union[int, str] = 0) -> Iterator[pd.DataFrame]:
+        """
+        Disaster fund adjustments, one row per scenario and head.
+
+        Args:
+            axes: ``severity``, ``estimatedDamage`` and ``totalBudget`` axes from parse()
+            level: Taxonomy depth or 'leaves'
+
+        Yields:
+            pd.DataFrame: Chunk with the scenario parameters, required_fund, sector,
+            original_budget, adjusted_budget and difference columns
+        """
+        try:
+            taxonomy = self.disaster_model.taxonomy
+            nodes = taxonomy.select(level)
+            for params in self._scenario_chunks(axes, len(nodes)):
+                funds = self.disaster_model.calculate_disaster_fund_batch(params['severity'], params['estimatedDamage'])
+                original, adjusted = self.disaster_model.adjust_sector_budgets_batch(params['totalBudget'], funds, level)
+                scenarios = len(funds)
+
+                yield pd.DataFrame({
+                    'severity': np.repeat(params['severity'], len(nodes)).astype(np.int16),
+                    'estimated_damage': np.repeat(params['estimatedDamage'], len(nodes)),
+                    'total_budget': np.repeat(params['totalBudget'], len(nodes)),
+                    'required_fund': np.round(np.repeat(funds, len(nodes)), 2),
+                    'sector': self._sector_column(taxonomy, nodes, scenarios),
+                    'original_budget': np.round(original.reshape(-1), 2),
+                    'adjusted_budget': np.round(adjusted.reshape(-1), 2),
+                    'difference': np.round((adjusted - original).reshape(-1), 2)
+                })
+
+        except Exception as e:
+            logger.error(f"Error in disaster_chunks: {str(e)}")
+            raise
+
+    def chunks(self, dataset: str, axes: Dict[str, np.ndarray], level: Union[int, str] = 0) -> Iterator[pd.DataFrame]:
+        if dataset == 'forecast':
+            return self.forecast_chunks(axes, level)
+        return self.disaster_chunks(axes, level)
+
+
+def available_formats():
+    """Export formats usable with the installed packages."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt == 'csv' or pa is not None]
+
+
+def encode(chunks: Iterator[pd.DataFrame], fmt: str) -> Iterator[bytes]:
+    """
+    Encode DataFrame chunks as one CSV, Arrow IPC stream or Parquet file.
+
+    Args:
+        chunks: Chunks sharing one set of columns
+        fmt: Key of EXPORT_FORMATS
+
+    Yields:
+        bytes: Encoded output, one piece per chunk (plus the Parquet footer)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+    if fmt != 'csv' and pa is None:
+        raise RuntimeError(f"{fmt} exports need the pyarrow package (pip install pyarrow)")
+
+    if fmt == 'csv' and pa is None:
+        header = True
+        for chunk in chunks:
+            yield chunk.to_csv(index=False, header=header).encode('utf-8')
+            header = False
+        return
+
+    drain = _Drain()
+    writer, schema = None, None
+    for chunk in chunks:
+        if writer is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            sink = pa.PythonFile(drain, mode='w')
+            if fmt == 'csv':
+                # Arrow's CSV writer is several times faster than pandas'; it wants plain strings
+                schema = pa.schema([field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type)
+                                    else field for field in schema]).remove_metadata()
+                writer = pa_csv.CSVWriter(sink, schema)
+            elif fmt == 'arrow':
+                writer = pa.ipc.new_stream(sink, schema)
+            else:
+                writer = pq.ParquetWriter(sink, schema)
+        batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+        if fmt == 'csv':
+            batch = batch.cast(schema)
+        if fmt == 'parquet':
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield drain.take()
+    if writer is not None:
+        writer.close()
+        yield drain.take()
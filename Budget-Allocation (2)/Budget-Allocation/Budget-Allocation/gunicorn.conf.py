@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for serving the budget allocation API.
+
+Environment variables:
+    PORT              Port to bind (default 5000)
+    GUNICORN_WORKERS  Worker processes (default: one per CPU)
+    GUNICORN_THREADS  Threads per worker in the default threaded mode (default 4)
+    ASYNC_MODE        Set to 1 to use gevent workers so slow requests yield
+                      to others instead of holding a thread (requires gevent)
+    GEVENT_CONNECTIONS  Concurrent connections per gevent worker (default 1000)
+"""
+import gc
+import multiprocessing
+import os
+
+# Every worker runs its own XGBoost predictions; one OpenMP thread each keeps
+# the workers from oversubscribing the cores. Set before the app is preloaded.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+if os.environ.get('ASYNC_MODE', '0') == '1':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GEVENT_CONNECTIONS', 1000))
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Load the models once in the master and share them with the forked workers
+preload_app = True
+
+# Batch endpoints stream large responses
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Move the preloaded models into the permanent generation so the garbage
+    # collector never touches (and so copies) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    server.log.info("Models preloaded; forking %s %s workers", workers, worker_class)
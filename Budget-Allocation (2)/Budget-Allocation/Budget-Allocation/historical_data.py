@@ -0,0 +1,166 @@
+import os
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest factor by which merged years' sector totals may differ from the stored years'
+# median; beyond it the figures are in another unit (e.g. lakh crore) or another basis
+MAX_SCALE_RATIO = 3.0
+
+
+class HistoricalBudgetStore:
+    """
+    Year-indexed store of historical sector allocations.
+
+    The data is loaded once into a (years, sectors) array with totals,
+    percentages and a per-year descending sort order precomputed, so lookups
+    are a dict probe plus array slicing regardless of how many years or
+    sectors are loaded.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        Args:
+            data: One row per year with a ``Year`` column, one column per sector and
+                an optional ``Total`` column holding the published total budget
+                (defaults to the sum of the sector columns)
+        """
+        try:
+            data = data.sort_values('Year').reset_index(drop=True)
+
+            self.sectors = [column for column in data.columns if column not in ('Year', 'Total')]
+            self.years = data['Year'].to_numpy(dtype=int)
+            self.amounts = data[self.sectors].to_numpy()
+            if 'Total' in data.columns:
+                self.totals = data['Total'].to_numpy()
+            else:
+                self.totals = self.amounts.sum(axis=1)
+
+            self.percentages = np.round(self.amounts / self.totals[:, None] * 100, 2)
+            # Stable descending order keeps the column order for equal amounts
+            self.sort_order = np.argsort(-self.amounts, axis=1, kind='stable')
+            self.year_index = {year: row for row, year in enumerate(self.years.tolist())}
+
+            logger.info(f"Loaded historical budgets for {len(self.years)} years and {len(self.sectors)} sectors")
+
+        except Exception as e:
+            logger.error(f"Error initializing HistoricalBudgetStore: {str(e)}")
+            raise
+
+    @classmethod
+    def from_file(cls, path: str) -> 'HistoricalBudgetStore':
+        """
+        Load historical budgets from a CSV or Parquet file.
+
+        Args:
+            path: Path to a ``.csv`` or ``.parquet`` file
+
+        Returns:
+            HistoricalBudgetStore: Store built from the file
+        """
+        try:
+            if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+                data = pd.read_parquet(path)
+            else:
+                data = pd.read_csv(path)
+            return cls(data)
+
+        except Exception as e:
+            logger.error(f"Error loading historical budgets from {path}: {str(e)}")
+            raise
+
+    def __contains__(self, year: int) -> bool:
+        return year in self.year_index
+
+    @property
+    def last_year(self) -> int:
+        return int(self.years[-1])
+
+    def total(self, year: int) -> float:
+        return self.totals[self.year_index[year]].item()
+
+    def sector_breakdown(self, year: int) -> Optional[List[Dict]]:
+        """
+        Sector amounts and percentages for a year, sorted by amount descending.
+
+        Args:
+            year: Fiscal year
+
+        Returns:
+            Optional[List[Dict]]: One entry per sector, or None if the year is unknown
+        """
+        row = self.year_index.get(year)
+        if row is None:
+            return None
+
+        order = self.sort_order[row]
+        return [
+            {'sector': self.sectors[i], 'amount': amount, 'percentage': percentage}
+            for i, amount, percentage in zip(
+                order.tolist(), self.amounts[row, order].tolist(), self.percentages[row, order].tolist()
+            )
+        ]
+
+    def merged(self, data: pd.DataFrame) -> 'HistoricalBudgetStore':
+        """
+        A new store with years from ``data`` added, replacing any years already present.
+
+        Years must cover the same sectors as the stored ones and be on their
+        scale, so figures parsed in another unit or covering only part of the
+        budget are rejected instead of skewing the forecaster.
+
+        Args:
+            data: Rows with a ``Year`` column, a column per sector of this store and
+                an optional ``Total`` (defaults to the sum of the sectors)
+
+        Returns:
+            HistoricalBudgetStore: Store over the combined years
+
+        Raises:
+            ValueError: If ``data`` lacks a positive amount for a sector, or its
+                sector totals differ from the stored years' median by more than
+                MAX_SCALE_RATIO
+        """
+        missing = [sector for sector in self.sectors if sector not in data.columns]
+        if missing:
+            raise ValueError(f"Merged years lack the sectors {missing}")
+        amounts = data[self.sectors].to_numpy(dtype=float)
+        incomplete = [int(year) for year, row in zip(data['Year'], amounts) if not np.all(row > 0)]
+        if incomplete:
+            raise ValueError(f"Years {incomplete} lack a positive amount for every sector")
+
+        reference = float(np.median(self.amounts.sum(axis=1)))
+        ratios = amounts.sum(axis=1) / reference
+        off_scale = [int(year) for year, ratio in zip(data['Year'], ratios)
+                     if not 1 / MAX_SCALE_RATIO <= ratio <= MAX_SCALE_RATIO]
+        if off_scale:
+            raise ValueError(f"Years {off_scale} are not on the scale of the stored years "
+                             f"(median sector total {reference:,.0f}); check their unit")
+
+        current = self.training_frame()
+        current.insert(1, 'Total', self.totals)
+        incoming = data[['Year'] + self.sectors].copy()
+        if 'Total' in data.columns:
+            incoming.insert(1, 'Total', data['Total'].to_numpy())
+        else:
+            incoming.insert(1, 'Total', incoming[self.sectors].sum(axis=1))
+
+        combined = pd.concat([current[~current['Year'].isin(incoming['Year'])], incoming], ignore_index=True)
+        return HistoricalBudgetStore(combined)
+
+    def training_frame(self) -> pd.DataFrame:
+        """
+        Historical data in the layout BudgetForecastModel.train_models expects.
+
+        Returns:
+            pd.DataFrame: ``Year`` column followed by one column per sector
+        """
+        frame = pd.DataFrame(self.amounts, columns=self.sectors)
+        frame.insert(0, 'Year', self.years)
+        return frame
@@ -0,0 +1,254 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (Prometheus client defaults plus sub-millisecond buckets)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Metric families and their help text; each exposes <family>_duration_seconds and <family>_errors_total
+FAMILIES = {
+    'http_request': 'Flask route handling time, by route template, method and status class',
+    'model_call': 'Model method call time, by model class and method'
+}
+
+
+class LatencySeries:
+    """Histogram of call durations plus an error count for one label set."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.errors
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = '') -> str:
+    escaped = ((key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for key, value in labels)
+    parts = [f'{key}="{value}"' for key, value in escaped]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    """
+    In-process latency and error metrics rendered in the Prometheus text format.
+
+    Instrumentation is installed once at startup. A disabled registry installs
+    nothing, so turning metrics off leaves the routes and model methods exactly
+    as they were. Each gunicorn worker keeps its own registry; scrape the
+    workers individually or aggregate them in Prometheus.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, Tuple], LatencySeries] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]] = []
+        self._lock = threading.Lock()
+
+    def series(self, family: str, **labels) -> LatencySeries:
+        key = (family, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, LatencySeries(self.buckets))
+        return series
+
+    def instrument(self, fn: Callable, family: str, **labels) -> Callable:
+        """
+        Wrap a callable so every call is timed into the given series.
+
+        Args:
+            fn: Callable to wrap
+            family: Metric family from FAMILIES
+            **labels: Labels identifying the series
+
+        Returns:
+            Callable: The timed wrapper, or ``fn`` itself when metrics are disabled
+        """
+        if not self.enabled:
+            return fn
+
+        series = self.series(family, **labels)
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                series.observe(time.perf_counter() - started, error=True)
+                raise
+            series.observe(time.perf_counter() - started)
+            return result
+
+        return timed
+
+    def instrument_methods(self, cls: type, methods: Iterable[str]) -> None:
+        """Time the named methods of every instance of ``cls``, labelled by class and method."""
+        for method in methods:
+            setattr(cls, method, self.instrument(getattr(cls, method), 'model_call',
+                                                 model=cls.__name__, method=method))
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]) -> None:
+        """
+        Register a callable producing extra samples at scrape time.
+
+        Args:
+            collect: Returns ``(name, type, help, labels, value)`` tuples
+        """
+        self._collectors.append(collect)
+
+    def init_app(self, app, path: str = '/metrics') -> None:
+        """Time every Flask route and serve the metrics at ``path``."""
+        from flask import Response, g, request
+
+        @app.route(path, methods=['GET'])
+        def metrics():
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+        if not self.enabled:
+            return
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record(response):
+            # Streamed responses are timed until their first byte, not their last
+            started = g.pop('metrics_started', None)
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            if started is not None and rule != path:
+                series = self.series('http_request', route=rule, method=request.method,
+                                     status=f'{response.status_code // 100}xx')
+                series.observe(time.perf_counter() - started, error=response.status_code >= 400)
+            return response
+
+    def render(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        if not self.enabled:
+            return '# Metrics are disabled (set METRICS_ENABLED=1 to enable)\n'
+
+        with self._lock:
+            series = sorted(self._series.items())
+
+        lines = []
+        bounds = [f'{bound:g}' for bound in self.buckets] + ['+Inf']
+        for family, help_text in FAMILIES.items():
+            members = [(labels, entry.snapshot()) for (name, labels), entry in series if name == family]
+            duration = f'{family}_duration_seconds'
+            lines.append(f'# HELP {duration} {help_text}')
+            lines.append(f'# TYPE {duration} histogram')
+            for labels, (counts, total, _) in members:
+                cumulative = 0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels, 'le="' + bound + '"')
+                    lines.append(f'{duration}_bucket{bucket_labels} {cumulative}')
+                lines.append(f'{duration}_sum{_format_labels(labels)} {total:.9g}')
+                lines.append(f'{duration}_count{_format_labels(labels)} {cumulative}')
+
+            errors = f'{family}_errors_total'
+            lines.append(f'# HELP {errors} Failed calls, with the same labels as {duration}')
+            lines.append(f'# TYPE {errors} counter')
+            for labels, (_, _, error_count) in members:
+                lines.append(f'{errors}{_format_labels(labels)} {error_count}')
+
+        described = set()
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.error(f"Error in metrics collector: {str(e)}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {name} {help_text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{_format_labels(tuple(sorted(labels.items())))} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def cache_collector(caches: Dict[str, object]) -> Callable[[], List[Tuple[str, str, str, Dict, float]]]:
+    """
+    Collector exposing ResponseCache statistics.
+
+    Args:
+        caches: Cache name to ResponseCache, or to a zero-argument callable
+            returning its stats() (for caches owned by models that may be replaced)
+
+    Returns:
+        Callable: Collector for MetricsRegistry.add_collector
+    """
+    def collect():
+        samples = []
+        for name, cache in caches.items():
+            stats = cache() if callable(cache) else cache.stats()
+            labels = {'cache': name}
+            samples.extend([
+                ('cache_entries', 'gauge', 'Entries currently cached', labels, stats['entries']),
+                ('cache_max_entries', 'gauge', 'Cache capacity', labels, stats['maxEntries']),
+                ('cache_hits_total', 'counter', 'Cache lookups answered from the cache', labels, stats['hits']),
+                ('cache_misses_total', 'counter', 'Cache lookups that had to compute', labels, stats['misses'])
+            ])
+        # Group samples by metric name so each family is contiguous
+        return sorted(samples, key=lambda sample: sample[0])
+
+    return collect
+
+
+def registry_collector(registry) -> Callable[[], List[Tuple[str, str, str, Dict, float]]]:
+    """
+    Collector exposing ModelRegistry residency and load statistics.
+
+    Args:
+        registry: ModelRegistry of the per-tenant models
+
+    Returns:
+        Callable: Collector for MetricsRegistry.add_collector
+    """
+    def collect():
+        stats = registry.stats()
+        return [
+            ('model_registry_evictions_total', 'counter', 'Tenants evicted to stay under the memory cap', {},
+             stats['evictions']),
+            ('model_registry_hits_total', 'counter', 'Tenant lookups served by resident models', {}, stats['hits']),
+            ('model_registry_loads_total', 'counter', 'Tenant model loads', {}, stats['loads']),
+            ('model_registry_resident_bytes', 'gauge', 'Estimated size of the resident tenant models', {},
+             stats['residentBytes']),
+            ('model_registry_resident_tenants', 'gauge', 'Tenants whose models are resident', {},
+             len(stats['resident']))
+        ]
+
+    return collect
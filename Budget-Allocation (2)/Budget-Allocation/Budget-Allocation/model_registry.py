@@ -0,0 +1,199 @@
+import itertools
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tenant ids double as directory names, so only plain identifiers are accepted
+TENANT_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+# Tenant served when a request names none
+DEFAULT_TENANT = 'default'
+
+
+class UnknownTenantError(KeyError):
+    """Raised for tenant ids that are malformed or have no data."""
+
+
+class TenantModels:
+    """The models and historical data serving one tenant."""
+
+    def __init__(self, tenant: str, disaster, tax, forecast, historical, size_bytes: int = 0):
+        self.tenant = tenant
+        self.disaster = disaster
+        self.tax = tax
+        self.forecast = forecast
+        self.historical = historical
+        # Estimated resident size, used by ModelRegistry's memory cap
+        self.size_bytes = size_bytes
+
+    def replaced(self, **models) -> 'TenantModels':
+        """A copy with some models swapped (``disaster``, ``tax``, ``forecast``); the original is left untouched."""
+        fields = dict(disaster=self.disaster, tax=self.tax, forecast=self.forecast, historical=self.historical)
+        fields.update(models)
+        return TenantModels(self.tenant, size_bytes=self.size_bytes, **fields)
+
+
+def directory_size(paths: Iterable[str]) -> int:
+    """Total size in bytes of the files under the given directories (missing ones count as 0)."""
+    total = 0
+    for path in paths:
+        for folder, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+    return total
+
+
+class ModelRegistry:
+    """
+    Per-tenant models, loaded on first use and evicted least recently used
+    first once their estimated size passes a memory cap.
+
+    Lookups of resident tenants take no lock: entries are immutable and are
+    replaced whole by put(), so a request keeps using the models it fetched
+    while a retrained set is swapped in. Concurrent requests for a tenant that
+    is not resident share one load (single flight): the first caller runs the
+    loader and the rest wait on its result. Pinned tenants (the default one)
+    are never evicted, and a tenant that was just loaded stays resident even
+    if it alone exceeds the cap.
+    """
+
+    def __init__(self, loader: Callable[[str], TenantModels], max_bytes: int,
+                 tenants: Optional[Callable[[], List[str]]] = None):
+        """
+        Args:
+            loader: Builds the models of a tenant; raises UnknownTenantError for unknown ones
+            max_bytes: Estimated size the resident tenants may occupy
+            tenants: Lists the tenants that can be loaded (for listings only)
+        """
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self._list_tenants = tenants
+        self._entries: Dict[str, TenantModels] = {}
+        self._sizes: Dict[str, int] = {}
+        # Recency stamps for LRU eviction; next() on a count is atomic, so hits need no lock
+        self._clock = itertools.count()
+        self._last_used: Dict[str, int] = {}
+        self._loading: Dict[str, Future] = {}
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, tenant: str) -> TenantModels:
+        """
+        Models of a tenant, loading them if they are not resident.
+
+        Args:
+            tenant: Tenant id
+
+        Returns:
+            TenantModels: The tenant's loaded models
+        """
+        if not TENANT_PATTERN.match(tenant or ''):
+            raise UnknownTenantError(f"Invalid tenant id: {tenant!r}")
+
+        entry = self._entries.get(tenant)
+        if entry is not None:
+            self._last_used[tenant] = next(self._clock)
+            self.hits += 1  # Unlocked, so concurrent hits may occasionally be undercounted
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                return entry
+            pending = self._loading.get(tenant)
+            owner = pending is None
+            if owner:
+                pending = self._loading[tenant] = Future()
+
+        if not owner:
+            return pending.result()
+
+        try:
+            entry = self.loader(tenant)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[tenant]
+            pending.set_exception(e)
+            if not isinstance(e, UnknownTenantError):
+                logger.error(f"Error loading models for tenant {tenant}: {str(e)}")
+            raise
+
+        with self._lock:
+            self._insert(tenant, entry)
+            del self._loading[tenant]
+            self.loads += 1
+        pending.set_result(entry)
+        logger.info(f"Loaded models for tenant {tenant} (~{entry.size_bytes / 2**20:.1f} MiB)")
+        return entry
+
+    def put(self, tenant: str, entry: TenantModels, pin: bool = False) -> None:
+        """
+        Make an already built entry resident, replacing any current one.
+
+        Args:
+            tenant: Tenant id
+            entry: Loaded models
+            pin: Never evict this tenant
+        """
+        with self._lock:
+            if pin:
+                self._pinned.add(tenant)
+            self._insert(tenant, entry)
+
+    def _insert(self, tenant: str, entry: TenantModels) -> None:
+        """Store an entry and evict least recently used tenants over the cap; call with the lock held."""
+        self._entries[tenant] = entry
+        self._last_used[tenant] = next(self._clock)
+        self._sizes[tenant] = entry.size_bytes
+        for candidate in sorted(self._entries, key=self._last_used.get):
+            if self.resident_bytes() <= self.max_bytes:
+                break
+            if candidate == tenant or candidate in self._pinned:
+                continue
+            del self._entries[candidate]
+            del self._sizes[candidate]
+            del self._last_used[candidate]
+            self.evictions += 1
+            logger.info(f"Evicted models for tenant {candidate}")
+
+    def evict(self, tenant: str) -> bool:
+        """Drop a resident tenant so its next request reloads it; returns whether it was resident."""
+        with self._lock:
+            if tenant not in self._entries or tenant in self._pinned:
+                return False
+            del self._entries[tenant]
+            del self._sizes[tenant]
+            del self._last_used[tenant]
+            return True
+
+    def resident(self) -> Dict[str, TenantModels]:
+        """Snapshot of the resident tenants' models."""
+        return dict(self._entries)
+
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def tenants(self) -> List[str]:
+        available = set(self._list_tenants()) if self._list_tenants else set()
+        with self._lock:
+            return sorted(available | set(self._entries))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'resident': sorted(self._entries, key=self._last_used.get),
+                'residentBytes': self.resident_bytes(),
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Dict, Optional, Type
+import logging
+
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout written by any model's save() changes
+ARTIFACT_FORMAT_VERSION = 5
+
+MANIFEST_FILE = 'manifest.json'
+
+# Errors meaning an artifact's files cannot be decoded (JSON, NumPy and XGBoost
+# parse errors are ValueErrors); anything else, such as an ImportError or an IO
+# error, is re-raised rather than treated as a broken artifact
+DECODE_ERRORS = (ValueError, KeyError, EOFError, pickle.UnpicklingError)
+
+
+def hash_training_data(data: pd.DataFrame) -> str:
+    """
+    Compute a content hash of a training DataFrame.
+
+    Models store it as their ``version`` when trained or loaded, so it names
+    both the artifact built from the data and the response cache entries
+    computed with the model; retraining on new data changes it.
+
+    Args:
+        data: DataFrame the model is trained on
+
+    Returns:
+        str: Hex digest covering column names and every row value
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in data.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """
+    Versioned on-disk store for trained model artifacts.
+
+    Artifacts live under ``<root>/<name>/v<format>-<data hash>/`` so a change to
+    either the training data or the artifact layout produces a new directory and
+    forces a retrain, while unchanged data is loaded straight from disk.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def artifact_dir(self, name: str, data_hash: str) -> str:
+        return os.path.join(self.root, name, f"v{ARTIFACT_FORMAT_VERSION}-{data_hash[:16]}")
+
+    def load(self, name: str, model_cls: Type, data_hash: str, load_kwargs: Optional[Dict] = None):
+        """
+        Load a saved model if an artifact for this data hash exists.
+
+        Args:
+            name: Artifact name (one per model kind)
+            model_cls: Model class providing a ``load(directory)`` classmethod
+            data_hash: Content hash of the training data
+            load_kwargs: Extra keyword arguments for ``model_cls.load``
+
+        Returns:
+            The loaded model, or None if no artifact exists or it could not be
+            decoded (in which case it is deleted); other errors are raised
+        """
+        directory = self.artifact_dir(name, data_hash)
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except DECODE_ERRORS as e:
+            self._discard(name, directory, f"unreadable manifest: {str(e)}")
+            return None
+        if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION or manifest.get('data_hash') != data_hash:
+            self._discard(name, directory, "manifest does not match the artifact format or training data")
+            return None
+
+        try:
+            model = model_cls.load(directory, **(load_kwargs or {}))
+        except DECODE_ERRORS as e:
+            self._discard(name, directory, str(e))
+            return None
+        model.version = data_hash
+        logger.info(f"Loaded {name} model from {directory}")
+        return model
+
+    def _discard(self, name: str, directory: str, reason: str) -> None:
+        """Delete an artifact that can never be loaded, so the retrained model can replace it."""
+        logger.error(f"Discarding {name} artifact {directory}, retraining: {reason}")
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def save(self, name: str, model, data_hash: str) -> str:
+        """
+        Save a trained model, writing to a temporary directory first and renaming
+        it into place so concurrent workers never observe a partial artifact.
+
+        Args:
+            name: Artifact name (one per model kind)
+            model: Trained model providing a ``save(directory)`` method
+            data_hash: Content hash of the training data
+
+        Returns:
+            str: Directory the artifact was written to
+        """
+        directory = self.artifact_dir(name, data_hash)
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=parent)
+        try:
+            model.save(staging)
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump({
+                    'name': name,
+                    'model': type(model).__name__,
+                    'format_version': ARTIFACT_FORMAT_VERSION,
+                    'data_hash': data_hash
+                }, f, indent=2)
+
+            try:
+                os.rename(staging, directory)
+            except OSError:
+                # Another worker published the same artifact first
+                shutil.rmtree(staging, ignore_errors=True)
+
+            logger.info(f"Saved {name} model to {directory}")
+            return directory
+
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            logger.error(f"Error saving {name} artifact: {str(e)}")
+            raise
+
+    def load_or_train(self, name: str, model_cls: Type, data: pd.DataFrame, data_hash: Optional[str] = None,
+                      load_kwargs: Optional[Dict] = None, allow_train: bool = True, **model_kwargs):
+        """
+        Return a trained model, reusing the saved artifact when the training data
+        is unchanged and retraining (then saving) otherwise.
+
+        Args:
+            name: Artifact name (one per model kind)
+            model_cls: Model class to load or instantiate
+            data: Training data
+            data_hash: Precomputed content hash of ``data``
+            load_kwargs: Extra keyword arguments for ``model_cls.load``
+            allow_train: When False, a missing artifact raises instead of training
+            **model_kwargs: Constructor arguments used when the model must be trained
+
+        Returns:
+            A trained model instance
+        """
+        data_hash = data_hash or hash_training_data(data)
+
+        model = self.load(name, model_cls, data_hash, load_kwargs)
+        if model is not None:
+            return model
+        if not allow_train:
+            raise RuntimeError(f"No saved {name} model for the current training data in {self.root}; "
+                               f"start once with training enabled to create it")
+
+        model = model_cls(**model_kwargs)
+        model.train_models(data)
+        model.version = data_hash
+        try:
+            self.save(name, model, data_hash)
+        except Exception as e:
+            # A read-only or full disk should not stop the app from serving
+            logger.warning(f"Could not save {name} artifact, serving the unsaved model: {str(e)}")
+        return model
@@ -0,0 +1,324 @@
+"""
+Extract sector allocation tables from the budget PDFs into a columnar dataset.
+
+    python pdf_tables.py --output data/pdf_allocations.csv
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import pandas as pd
+
+from search_index import DocumentIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever parsing changes so cached tables are re-parsed
+PARSER_VERSION = 2
+
+# Published line items mapped to the model's sectors; items sharing a sector are summed
+SECTOR_ALIASES = {
+    'health': 'Healthcare',
+    'health and family welfare': 'Healthcare',
+    'education': 'Education',
+    'school education and literacy': 'Education',
+    'higher education': 'Education',
+    'defence': 'Defence',
+    'infrastructure': 'Infrastructure',
+    'transport': 'Infrastructure',
+    'road transport and highways': 'Infrastructure',
+    'railways': 'Infrastructure',
+    'urban development': 'Infrastructure',
+    'housing and urban affairs': 'Infrastructure',
+    'agriculture': 'Agriculture',
+    'agriculture and allied activities': 'Agriculture',
+    'agriculture and farmers welfare': 'Agriculture',
+    'environment': 'Environment',
+    'environment, forest and climate change': 'Environment',
+    # Major heads as named in the annual financial statement
+    'medical and public health': 'Healthcare',
+    'family welfare': 'Healthcare',
+    'general education': 'Education',
+    'technical education': 'Education',
+    'defence services - army': 'Defence',
+    'defence services - navy': 'Defence',
+    'defence services - air force': 'Defence',
+    'capital outlay on defence services': 'Defence',
+    'road transport': 'Infrastructure',
+    'roads and bridges': 'Infrastructure',
+    'capital outlay on roads and bridges': 'Infrastructure',
+    'housing': 'Infrastructure',
+    'capital outlay on housing': 'Infrastructure',
+    'capital outlay on urban development': 'Infrastructure',
+    'crop husbandry': 'Agriculture',
+    'capital outlay on crop husbandry': 'Agriculture',
+    'ecology and environment': 'Environment',
+    'forestry and wild life': 'Environment',
+}
+
+# Columns of the extracted dataset
+COLUMNS = ['source', 'page', 'year', 'label', 'sector', 'amount_cr']
+
+# Amounts in Indian (1,28,650) or international (128,650) grouping, plain decimals, or the "..." statements print for nil
+AMOUNT = r'\d{1,3}(?:,\d{2,3})+|\d+(?:\.\d+)?|\.\.\.|…'
+NIL_AMOUNTS = ('...', '…')
+# Bilingual statements print the Hindi label before the English one on the same line
+ROW_PATTERN = re.compile(
+    rf'^(?:[\u0900-\u097F][\u0900-\u097F\u200c\u200d,/()\'\s-]*\s)?'
+    rf'(?P<label>[A-Z][A-Za-z&,\'()/ -]*?[A-Za-z)])\s+(?P<amounts>(?:(?:{AMOUNT})\s*)+)$'
+)
+AMOUNT_ONLY_PATTERN = re.compile(rf'^(?:{AMOUNT})$')
+LABEL_ONLY_PATTERN = re.compile(r'^[A-Za-z][A-Za-z&,\'() -]*[A-Za-z)]$')
+FISCAL_YEAR_PATTERN = re.compile(r'\b(20\d{2})\s*-\s*(?:20)?(\d{2})\b')
+# Column headers of the financial statements, e.g. "Revised Estimates 2024-2025"
+ESTIMATE_PATTERN = re.compile(r'\b(?:Actuals?|Revised\s+Estimates?|Budget\s+Estimates?)\b', re.IGNORECASE)
+# When a statement prints several columns for one year, the most final figure is used
+ESTIMATE_PREFERENCE = ('actual', 'revised', 'budget')
+# Four-digit major head code statements print between the label and the amounts
+MAJOR_HEAD_PATTERN = re.compile(r'^\d{4}$')
+
+# Pages quoting figures in lakh crore are scaled to crore
+LAKH_CRORE = 100000
+
+
+def fiscal_years(text: str) -> List[int]:
+    """Starting years of the fiscal years (e.g. 2025 for 2025-26) mentioned in text, in order of first mention."""
+    years = []
+    for start, end in FISCAL_YEAR_PATTERN.findall(text):
+        year = int(start)
+        if (year + 1) % 100 == int(end) and year not in years:
+            years.append(year)
+    return years
+
+
+def statement_columns(text: str) -> List[Tuple[str, int]]:
+    """
+    Estimate and fiscal year of each amount column of a financial statement page.
+
+    Statement headers name one estimate per column (Actuals, Budget or
+    Revised Estimates), each over its fiscal year, so the same year can head
+    two columns. The text layer may keep each header cell together or print
+    all estimates before all years; both pair up in order.
+
+    Returns:
+        List[Tuple[str, int]]: E.g. [('budget', 2024), ('revised', 2024), ('budget', 2025)],
+        or [] if the page has no header of two or more columns
+    """
+    estimates = [match.split()[0].lower().rstrip('s') for match in ESTIMATE_PATTERN.findall(text)]
+    years = [int(start) for start, end in FISCAL_YEAR_PATTERN.findall(text) if (int(start) + 1) % 100 == int(end)]
+    if len(estimates) < 2 or len(estimates) != len(years):
+        return []
+    return list(zip(estimates, years))
+
+
+def _parse_amount(amount: str) -> float:
+    if amount in NIL_AMOUNTS:
+        return 0.0
+    return float(amount.replace(',', ''))
+
+
+def _parse_page(source: str, page: int, text: str, default_year: Optional[int]) -> List[Dict]:
+    """
+    Allocation rows on one page; module-level so pages can be parsed in a process pool.
+
+    A row is a capitalized label followed by one digit-grouped amount (for the
+    page's or document's latest fiscal year) or by one amount per fiscal year
+    named on the page; this skips page numbers and figures quoted in prose.
+    Labels and amounts that the PDF text layer split onto separate lines are
+    paired in order when their counts match.
+
+    Financial statement pages (see statement_columns) are read by column
+    instead: a row has a major head code and one amount per column, and each
+    year takes its most final column (actuals over revised over budget
+    estimates).
+    """
+    lowered = text.lower()
+    if 'crore' not in lowered:
+        return []
+    scale = LAKH_CRORE if 'lakh crore' in lowered and not re.search(r'in\s*₹?\s*crore', lowered) else 1
+
+    page_years = fiscal_years(text)
+    year = page_years[-1] if page_years else default_year
+    columns = statement_columns(text)
+    # Column read for each year of a statement page
+    year_columns = {}
+    for column, (estimate, column_year) in enumerate(columns):
+        chosen = year_columns.get(column_year)
+        if chosen is None or ESTIMATE_PREFERENCE.index(estimate) < ESTIMATE_PREFERENCE.index(columns[chosen][0]):
+            year_columns[column_year] = column
+    rows, orphan_labels, orphan_amounts = [], [], []
+
+    def add(label: str, row_year: Optional[int], amount: float) -> None:
+        label = ' '.join(label.split())
+        rows.append({
+            'source': source,
+            'page': page + 1,
+            'year': row_year,
+            'label': label,
+            'sector': SECTOR_ALIASES.get(label.lower()),
+            'amount_cr': amount * scale
+        })
+
+    for line in (line.strip() for line in text.splitlines()):
+        match = ROW_PATTERN.match(line)
+        if match:
+            raw_amounts = re.findall(AMOUNT, match.group('amounts'))
+            if columns and len(raw_amounts) == len(columns) + 1 and MAJOR_HEAD_PATTERN.match(raw_amounts[0]):
+                raw_amounts = raw_amounts[1:]
+            amounts = [_parse_amount(amount) for amount in raw_amounts]
+            if columns and len(amounts) == len(columns):
+                for row_year, column in year_columns.items():
+                    add(match.group('label'), row_year, amounts[column])
+            elif len(amounts) == 1 and ',' in raw_amounts[0] and year is not None:
+                add(match.group('label'), year, amounts[0])
+            elif len(page_years) > 1 and len(amounts) == len(page_years):
+                for row_year, amount in zip(page_years, amounts):
+                    add(match.group('label'), row_year, amount)
+        elif AMOUNT_ONLY_PATTERN.match(line) and ',' in line:
+            orphan_amounts.append(_parse_amount(line))
+        elif LABEL_ONLY_PATTERN.match(line) and line.lower() in SECTOR_ALIASES:
+            orphan_labels.append(line)
+
+    if year is not None and orphan_labels and len(orphan_labels) == len(orphan_amounts):
+        for label, amount in zip(orphan_labels, orphan_amounts):
+            add(label, year, amount)
+    return rows
+
+
+def _parse_pages(source: str, first_page: int, texts: List[str], default_year: Optional[int]) -> List[Dict]:
+    return [row for offset, text in enumerate(texts)
+            for row in _parse_page(source, first_page + offset, text, default_year)]
+
+
+class AllocationTableExtractor:
+    """
+    Turns the allocation tables printed in the budget PDFs into rows of
+    (source, page, year, label, sector, amount in crore).
+
+    Page text comes from the search index, so each PDF version is read once
+    for both search and ingestion. Parsed rows are cached per content hash
+    and parser version; only new or replaced PDFs are parsed, page chunks
+    spread over the executor when one is given.
+    """
+
+    def __init__(self, index: DocumentIndex, cache_dir: str, pages_per_task: int = 8):
+        self.index = index
+        self.cache_dir = cache_dir
+        self.pages_per_task = pages_per_task
+
+    def _cache_file(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f'{content_hash}-v{PARSER_VERSION}.json')
+
+    def _document_rows(self, name: str, executor: Optional[Executor]) -> List[Dict]:
+        cached = self._cache_file(self.index.library.etag(name))
+        if os.path.exists(cached):
+            with open(cached) as f:
+                return json.load(f)
+
+        pages = self.index.pages(name, executor)
+        if not any(text.strip() for text in pages):
+            logger.warning(f"{name} has no text layer (its text is drawn as outlines or images); "
+                           f"OCR it to extract its tables")
+        years = fiscal_years('\n'.join(pages))
+        default_year = max(years) if years else None
+
+        chunks = [(start, pages[start:start + self.pages_per_task])
+                  for start in range(0, len(pages), self.pages_per_task)]
+        if executor is None:
+            parsed = [_parse_pages(name, start, texts, default_year) for start, texts in chunks]
+        else:
+            futures = [executor.submit(_parse_pages, name, start, texts, default_year) for start, texts in chunks]
+            parsed = [future.result() for future in futures]
+        rows = [row for chunk in parsed for row in chunk]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = f'{cached}.{os.getpid()}.tmp'
+        with open(staging, 'w') as f:
+            json.dump(rows, f)
+        os.replace(staging, cached)
+        logger.info(f"Parsed {len(rows)} allocation rows from {name}")
+        return rows
+
+    def extract(self, executor: Optional[Executor] = None) -> pd.DataFrame:
+        """
+        Allocation rows from every document.
+
+        Args:
+            executor: Optional process pool for text extraction and page parsing
+
+        Returns:
+            pd.DataFrame: One row per published line item and year, columns COLUMNS
+        """
+        try:
+            rows = [row for name in self.index.library.names() for row in self._document_rows(name, executor)]
+            frame = pd.DataFrame(rows, columns=COLUMNS)
+            return frame.astype({'page': 'int32', 'year': 'Int32', 'amount_cr': 'float64'})
+
+        except Exception as e:
+            logger.error(f"Error in extract: {str(e)}")
+            raise
+
+
+def training_frame(allocations: pd.DataFrame, sectors: List[str]) -> pd.DataFrame:
+    """
+    Pivot extracted rows into the Year-by-sector layout train_models expects.
+
+    Line items of the same sector are summed and a figure repeated across
+    documents counts once. Each year is taken from the one document covering
+    the most sectors for it, so a summary table and a detailed statement are
+    never added together, and only years with a figure for every sector are
+    kept.
+
+    Args:
+        allocations: Output of AllocationTableExtractor.extract
+        sectors: Sector columns required
+
+    Returns:
+        pd.DataFrame: ``Year`` column followed by one column per sector
+    """
+    mapped = allocations.dropna(subset=['sector', 'year'])
+    mapped = mapped.drop_duplicates(subset=['year', 'label', 'amount_cr'])
+    per_source = mapped.pivot_table(index=['year', 'source'], columns='sector', values='amount_cr', aggfunc='sum')
+    per_source = per_source.reindex(columns=sectors)
+    best_sources = per_source.notna().sum(axis=1).groupby(level='year').idxmax()
+    wide = per_source.loc[best_sources.tolist()].droplevel('source').dropna()
+    frame = wide.reset_index().rename(columns={'year': 'Year'})
+    frame.columns.name = None
+    return frame.astype({'Year': int})
+
+
+def main() -> None:
+    from concurrent.futures import ProcessPoolExecutor
+    from documents import DocumentLibrary
+
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = os.environ.get('DOCUMENT_CACHE_DIR', os.path.join(app_dir, 'document_cache'))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=os.path.join(app_dir, 'data', 'pdf_allocations.csv'),
+                        help='.parquet (needs pyarrow) or .csv file to write')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    library = DocumentLibrary(os.path.join(app_dir, 'pdf folder'), cache_dir=cache_dir)
+    extractor = AllocationTableExtractor(DocumentIndex(library, os.path.join(cache_dir, 'search')),
+                                         os.path.join(cache_dir, 'tables'))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        allocations = extractor.extract(executor)
+
+    if args.output.endswith(('.parquet', '.pq')):
+        allocations.to_parquet(args.output, index=False)
+    else:
+        allocations.to_csv(args.output, index=False)
+    mapped = allocations.dropna(subset=['sector'])
+    print(f"Wrote {len(allocations)} rows ({len(mapped)} mapped to sectors) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
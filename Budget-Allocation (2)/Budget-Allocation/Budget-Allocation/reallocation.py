@@ -0,0 +1,171 @@
+from typing import Dict, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Request fields of a reallocation policy, each a mapping of head name to value
+POLICY_FIELDS = {
+    'floors': 'floors',          # Lowest adjusted budget a head may be cut to, in crores
+    'priorities': 'priorities',  # Relative protection; a head's cut is proportional to budget / priority
+    'maxCuts': 'max_cuts'        # Most a head may give up, in crores
+}
+
+
+def waterfill(budgets: np.ndarray, demands: np.ndarray, weights: np.ndarray,
+              caps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split each demand into cuts proportional to ``weights`` without exceeding ``caps``.
+
+    Solves, per scenario, for the level ``lam`` at which the cuts
+    ``min(caps, lam * weights)`` add up to the demand. Heads that hit their cap
+    stay there and the rest of the demand is shared among the others in
+    proportion to their weights. The level is found exactly, without iterating:
+    sorting the breakpoints ``caps / weights`` makes the total cut piecewise
+    linear, so it is evaluated at every breakpoint at once, the segment holding
+    the demand is counted off, and ``lam`` is solved within it. That costs one
+    sort per scenario, O(heads log heads), vectorized over all scenarios.
+
+    Args:
+        budgets: Array of shape (scenarios, heads); only its shape is used
+        demands: Amount to cut per scenario, shape (scenarios,)
+        weights: Non-negative cut weights, broadcast to (scenarios, heads)
+        caps: Non-negative largest cut per head, broadcast to (scenarios, heads);
+            ``np.inf`` leaves a head uncapped
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Cuts of shape (scenarios, heads), and per
+        scenario the part of the demand the caps left unfunded
+    """
+    shape = np.shape(budgets)
+    demands = np.asarray(demands, dtype=float).reshape(-1)
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), shape)
+    caps = np.where(weights > 0, np.broadcast_to(np.asarray(caps, dtype=float), shape), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakpoints = np.where(weights > 0, caps / weights, np.inf)
+    order = np.argsort(breakpoints, axis=-1, kind='stable')
+    sorted_points = np.take_along_axis(breakpoints, order, axis=-1)
+    sorted_caps = np.take_along_axis(caps, order, axis=-1)
+    sorted_weights = np.take_along_axis(weights, order, axis=-1)
+
+    # Cut at the k-th breakpoint: heads before it are capped, the rest scale with the level.
+    # Infinite breakpoints sort last; their caps are left out of the sums (inf - inf would be
+    # nan) and the total there is unbounded if the scenario has a weighted head with no cap
+    unbounded = np.isinf(sorted_points)
+    finite_caps = np.where(unbounded, 0.0, sorted_caps)
+    capped_before = np.cumsum(finite_caps, axis=-1) - finite_caps
+    weight_from = np.cumsum(sorted_weights[:, ::-1], axis=-1)[:, ::-1]
+    uncapped = np.isinf(caps).any(axis=-1)
+    with np.errstate(invalid='ignore'):
+        totals = np.where(
+            unbounded,
+            np.where(uncapped[:, None], np.inf, capped_before),
+            capped_before + sorted_points * weight_from
+        )
+    segment = (totals < demands[:, None]).sum(axis=-1)
+
+    feasible = segment < shape[-1]
+    rows = np.arange(shape[0])
+    position = np.minimum(segment, shape[-1] - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        level = np.where(
+            feasible,
+            (demands - capped_before[rows, position]) / weight_from[rows, position],
+            np.inf
+        )
+    level = np.fmax(level, 0.0)  # Also zeroes the 0/0 of a zero demand on all-zero weights
+
+    with np.errstate(invalid='ignore'):
+        cuts = np.where(weights > 0, np.minimum(caps, level[:, None] * weights), 0.0)
+    unfunded = np.maximum(demands - cuts.sum(axis=-1), 0.0)
+    return cuts, np.where(feasible, 0.0, unfunded)
+
+
+class ReallocationPolicy:
+    """
+    Per-head constraints on how a disaster fund is carved out of the budget.
+
+    Heads are cut in proportion to their budget divided by their priority, so
+    by default every head gives up the same share of the fund as it holds of
+    the budget. A head is never cut below its floor (or below zero) nor by
+    more than its max cut; whatever it cannot give is shared among the heads
+    that still can (see waterfill).
+    """
+
+    def __init__(self, floors: Optional[Dict[str, float]] = None, priorities: Optional[Dict[str, float]] = None,
+                 max_cuts: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            floors: Head name to the lowest adjusted budget, in crores (default 0)
+            priorities: Head name to its positive priority (default 1); doubling
+                a priority halves the head's share of the cut
+            max_cuts: Head name to the most it may be cut, in crores (default unlimited)
+        """
+        self.floors = {name: float(value) for name, value in (floors or {}).items()}
+        self.priorities = {name: float(value) for name, value in (priorities or {}).items()}
+        self.max_cuts = {name: float(value) for name, value in (max_cuts or {}).items()}
+        if any(value < 0 for value in self.floors.values()):
+            raise ValueError("Floors must not be negative")
+        if any(not value > 0 for value in self.priorities.values()):
+            raise ValueError("Priorities must be positive")
+        if any(value < 0 for value in self.max_cuts.values()):
+            raise ValueError("Max cuts must not be negative")
+
+    @classmethod
+    def from_request(cls, data: Dict) -> Optional['ReallocationPolicy']:
+        """Policy from the optional ``floors``, ``priorities`` and ``maxCuts`` request fields, or None if absent."""
+        fields = {attribute: data[field] for field, attribute in POLICY_FIELDS.items() if data.get(field)}
+        if not fields:
+            return None
+        for field, value in fields.items():
+            if not isinstance(value, dict):
+                raise ValueError(f"{field} must map head names to numbers")
+        return cls(**fields)
+
+    def arrays(self, names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Floors, priorities and max cuts aligned with ``names``.
+
+        Args:
+            names: Heads being reallocated
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: One (heads,) array each
+        """
+        known = set(names)
+        unknown = sorted(name for values in (self.floors, self.priorities, self.max_cuts)
+                         for name in values if name not in known)
+        if unknown:
+            raise ValueError(f"Unknown heads {unknown}; constraints must name heads at the requested level")
+        return (
+            np.array([self.floors.get(name, 0.0) for name in names]),
+            np.array([self.priorities.get(name, 1.0) for name in names]),
+            np.array([self.max_cuts.get(name, np.inf) for name in names])
+        )
+
+    def cuts(self, budgets: np.ndarray, demands: np.ndarray, names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cut each scenario's demand out of its budgets under this policy.
+
+        Args:
+            budgets: Original budgets, shape (scenarios, heads)
+            demands: Fund to raise per scenario, shape (scenarios,)
+            names: Head name of each column
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Cuts of shape (scenarios, heads) and
+            the unfunded part of each demand
+        """
+        try:
+            floors, priorities, max_cuts = self.arrays(names)
+            budgets = np.asarray(budgets, dtype=float)
+            caps = np.clip(np.minimum(budgets - floors, max_cuts), 0.0, None)
+            return waterfill(budgets, demands, np.maximum(budgets, 0.0) / priorities, caps)
+
+        except Exception as e:
+            logger.error(f"Error in ReallocationPolicy.cuts: {str(e)}")
+            raise
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    Callers include the serving model's version in the key, so entries computed
+    by a model that has since been retrained are never returned again and age
+    out of the LRU order on their own.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key: Hashable cache key
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            # Computed outside the lock; concurrent misses may compute twice
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        logger.info("Response cache cleared")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
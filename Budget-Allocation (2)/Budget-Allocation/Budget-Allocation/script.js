@@ -2672,8 +2672,8 @@ function setupDocumentHandlers() {
             // Log the action
             console.log(`Opening document for viewing: ${pdfPath}`);
             
-            // Check if file exists (this would normally be done server-side)
-            fetch(pdfPath)
+            // Check the document exists without downloading it
+            fetch(pdfPath, { method: 'HEAD' })
                 .then(response => {
                     if (!response.ok) {
                         event.preventDefault();
@@ -2696,8 +2696,8 @@ function setupDocumentHandlers() {
             // Log the action
             console.log(`Downloading document: ${pdfPath}`);
             
-            // Check if file exists (this would normally be done server-side)
-            fetch(pdfPath)
+            // Check the document exists without downloading it
+            fetch(pdfPath, { method: 'HEAD' })
                 .then(response => {
                     if (!response.ok) {
                         event.preventDefault();
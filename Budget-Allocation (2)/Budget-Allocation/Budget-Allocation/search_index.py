@@ -0,0 +1,353 @@
+"""
+Build the full-text page index of the budget PDFs that document search loads.
+
+    python search_index.py --workers 4
+"""
+import argparse
+import html
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from documents import DocumentLibrary
+
+try:
+    import pypdf
+except ImportError:  # Optional: search is unavailable without it
+    pypdf = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lowercased word characters; apostrophes and hyphens split terms
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# BM25 parameters (standard defaults) with pages as the retrieval unit
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Characters of context kept on each side of the first match in a snippet
+SNIPPET_CONTEXT = 90
+
+# Pages extracted per task when an executor is used
+PAGES_PER_TASK = 16
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _page_count(path: str) -> int:
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); module-level so page ranges can run in a process pool."""
+    reader = pypdf.PdfReader(path)
+    return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def _page_postings(pages: List[str]) -> Dict[str, List[List[int]]]:
+    """Map each term to ``[page, term frequency]`` pairs, pages in ascending order."""
+    postings = {}
+    for page, text in enumerate(pages):
+        counts = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            postings.setdefault(term, []).append([page, count])
+    return postings
+
+
+class DocumentIndex:
+    """
+    Inverted index over the text of the published PDFs, one posting per page.
+
+    Each document's page text and postings are persisted under its content
+    hash, so a restart loads them from disk and only added or replaced files
+    are parsed again. Parsing is a build step (see main); servers refresh
+    with ``extract=False`` and only load index files that already exist. The per-document postings are merged into one array per
+    term (global page ids and term frequencies), and queries are scored with
+    BM25 by scattering those arrays into a page-score vector. A refresh builds
+    a new view and swaps it in whole, so searches never see a half-built index.
+    """
+
+    def __init__(self, library: DocumentLibrary, index_dir: str):
+        """
+        Args:
+            library: Documents to index (supplies names, paths and content hashes)
+            index_dir: Folder the per-document index files are persisted in
+        """
+        self.library = library
+        self.index_dir = index_dir
+        self.view = self._build({})
+        self._lock = threading.Lock()
+        self._last_checked = 0.0
+
+    @property
+    def available(self) -> bool:
+        return pypdf is not None
+
+    def _document_file(self, content_hash: str) -> str:
+        return os.path.join(self.index_dir, f'{content_hash}.json')
+
+    def _extract(self, path: str, executor: Optional[Executor] = None) -> List[str]:
+        if executor is None:
+            return _extract_pages(path, 0, _page_count(path))
+
+        page_count = _page_count(path)
+        futures = [executor.submit(_extract_pages, path, start, min(start + PAGES_PER_TASK, page_count))
+                   for start in range(0, page_count, PAGES_PER_TASK)]
+        return [text for future in futures for text in future.result()]
+
+    def _load_stored(self, name: str, content_hash: str) -> Optional[Dict]:
+        """A document's persisted index, or None if this version was never indexed."""
+        stored = self._document_file(content_hash)
+        if not os.path.exists(stored):
+            return None
+        try:
+            with open(stored) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading index file for {name}: {str(e)}")
+            return None
+
+    def _load_or_extract(self, name: str, content_hash: str, executor: Optional[Executor]) -> Dict:
+        document = self._load_stored(name, content_hash)
+        if document is not None:
+            return document
+
+        stored = self._document_file(content_hash)
+        started = time.perf_counter()
+        pages = self._extract(self.library.path(name), executor)
+        document = {'hash': content_hash, 'pages': pages, 'postings': _page_postings(pages)}
+
+        # Write then rename so a concurrent reader never sees a partial file
+        os.makedirs(self.index_dir, exist_ok=True)
+        staging = f'{stored}.{os.getpid()}.tmp'
+        with open(staging, 'w') as f:
+            json.dump(document, f)
+        os.replace(staging, stored)
+        logger.info(f"Indexed {name}: {len(pages)} pages in {time.perf_counter() - started:.1f}s")
+        return document
+
+    def refresh(self, executor: Optional[Executor] = None, extract: bool = True) -> Dict[str, List[str]]:
+        """
+        Bring the index in line with the document folder.
+
+        Unchanged documents are kept, documents whose content hash was indexed
+        before are loaded from disk, and only new content is parsed.
+
+        Args:
+            executor: Optional pool to extract page ranges of new documents on
+            extract: Parse documents that have no index file; when False they
+                are left out of the index (and reported as 'unindexed') until
+                the build step or an extracting refresh indexes them
+
+        Returns:
+            Dict[str, List[str]]: Document names that were 'indexed', 'removed',
+            'unchanged' or 'unindexed'
+        """
+        if extract and not self.available:
+            raise RuntimeError("Document search needs the pypdf package (pip install pypdf)")
+
+        try:
+            with self._lock:
+                current = {name: self.library.etag(name) for name in self.library.names()}
+                changes = {'indexed': [], 'removed': [], 'unchanged': [], 'unindexed': []}
+                documents = {}
+                for name, content_hash in current.items():
+                    existing = self.view['documents'].get(name)
+                    if existing is not None and existing['hash'] == content_hash:
+                        documents[name] = existing
+                        changes['unchanged'].append(name)
+                        continue
+                    document = (self._load_or_extract(name, content_hash, executor) if extract
+                                else self._load_stored(name, content_hash))
+                    if document is None:
+                        changes['unindexed'].append(name)
+                    else:
+                        documents[name] = document
+                        changes['indexed'].append(name)
+                # Replaced documents whose new version is not indexed yet drop out too
+                changes['removed'] = sorted(set(self.view['documents']) - set(documents))
+
+                if changes['indexed'] or changes['removed']:
+                    self.view = self._build(documents)
+                self._last_checked = time.monotonic()
+                return changes
+
+        except Exception as e:
+            logger.error(f"Error in refresh: {str(e)}")
+            raise
+
+    def pages(self, name: str, executor: Optional[Executor] = None) -> List[str]:
+        """
+        Page texts of a document, extracting (and persisting) them only if this
+        version of the file has never been parsed.
+
+        Args:
+            name: Document file name
+            executor: Optional pool to extract page ranges on
+
+        Returns:
+            List[str]: Text of each page
+        """
+        if not self.available:
+            raise RuntimeError("Document text extraction needs the pypdf package (pip install pypdf)")
+
+        content_hash = self.library.etag(name)
+        document = self.view['documents'].get(name)
+        if document is None or document['hash'] != content_hash:
+            document = self._load_or_extract(name, content_hash, executor)
+        return document['pages']
+
+    def refresh_if_stale(self, min_interval: float = 5.0) -> None:
+        """
+        Pick up index files written since the last check, at most once per
+        ``min_interval`` seconds. Never parses a PDF, so it is safe on the
+        request path; a check that finds no change only stats the files.
+        """
+        if time.monotonic() - self._last_checked >= min_interval:
+            self.refresh(extract=False)
+
+    @staticmethod
+    def _build(documents: Dict[str, Dict]) -> Dict:
+        """
+        Merge per-document postings into one global page-id array per term.
+
+        Args:
+            documents: Document name to its ``hash``, ``pages`` and ``postings``
+
+        Returns:
+            Dict: Search view with the documents, each global page's document,
+            page number and length, and per-term ``pages``/``tf`` arrays
+        """
+        page_documents, page_numbers, page_lengths = [], [], []
+        term_pages, term_tf = {}, {}
+        for name in sorted(documents):
+            document = documents[name]
+            offset = len(page_documents)
+            page_documents.extend([name] * len(document['pages']))
+            page_numbers.extend(range(len(document['pages'])))
+            page_lengths.extend(len(tokenize(text)) for text in document['pages'])
+            for term, postings in document['postings'].items():
+                pairs = np.asarray(postings, dtype=np.int64)
+                term_pages.setdefault(term, []).append(pairs[:, 0] + offset)
+                term_tf.setdefault(term, []).append(pairs[:, 1])
+
+        return {
+            'documents': documents,
+            'page_documents': page_documents,
+            'page_numbers': np.asarray(page_numbers, dtype=int),
+            'page_lengths': np.asarray(page_lengths, dtype=float),
+            'terms': {
+                term: {'pages': np.concatenate(term_pages[term]), 'tf': np.concatenate(term_tf[term]).astype(float)}
+                for term in term_pages
+            }
+        }
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Rank pages for a free-text query.
+
+        Args:
+            query: Words to search for; pages matching more of them rank higher
+            limit: Most results to return
+
+        Returns:
+            List[Dict]: ``document``, 1-based ``page``, ``score`` and an HTML
+            ``snippet`` with the matched words wrapped in ``<mark>``
+        """
+        try:
+            view = self.view
+            terms = list(dict.fromkeys(tokenize(query)))
+            page_count = len(view['page_documents'])
+            if not terms or page_count == 0:
+                return []
+
+            average_length = view['page_lengths'].mean() or 1.0
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * view['page_lengths'] / average_length)
+            scores = np.zeros(page_count)
+            for term in terms:
+                postings = view['terms'].get(term)
+                if postings is None:
+                    continue
+                pages, tf = postings['pages'], postings['tf']
+                idf = math.log(1 + (page_count - len(pages) + 0.5) / (len(pages) + 0.5))
+                np.add.at(scores, pages, idf * tf * (BM25_K1 + 1) / (tf + length_norm[pages]))
+
+            matched = np.flatnonzero(scores)
+            top = matched[np.argsort(-scores[matched], kind='stable')[:limit]]
+            results = []
+            for page in top.tolist():
+                name = view['page_documents'][page]
+                number = int(view['page_numbers'][page])
+                results.append({
+                    'document': name,
+                    'page': number + 1,
+                    'score': round(float(scores[page]), 4),
+                    'snippet': self._snippet(view['documents'][name]['pages'][number], terms)
+                })
+            return results
+
+        except Exception as e:
+            logger.error(f"Error in search: {str(e)}")
+            raise
+
+    @staticmethod
+    def _snippet(text: str, terms: List[str]) -> str:
+        """HTML-escaped window around the first match with every matched term highlighted."""
+        text = ' '.join(text.split())
+        pattern = re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\b', re.IGNORECASE)
+        first = pattern.search(text)
+        centre = first.start() if first else 0
+        start = max(0, centre - SNIPPET_CONTEXT)
+        stop = min(len(text), centre + SNIPPET_CONTEXT)
+        window = text[start:stop]
+
+        parts, position = [], 0
+        for match in pattern.finditer(window):
+            parts.append(html.escape(window[position:match.start()]))
+            parts.append(f'<mark>{html.escape(match.group(0))}</mark>')
+            position = match.end()
+        parts.append(html.escape(window[position:]))
+        return ('…' if start > 0 else '') + ''.join(parts) + ('…' if stop < len(text) else '')
+
+    def stats(self) -> Dict:
+        view = self.view
+        return {
+            'documents': len(view['documents']),
+            'pages': len(view['page_documents']),
+            'terms': len(view['terms'])
+        }
+
+
+def main() -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = os.environ.get('DOCUMENT_CACHE_DIR', os.path.join(app_dir, 'document_cache'))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    index = DocumentIndex(DocumentLibrary(os.path.join(app_dir, 'pdf folder'), cache_dir=cache_dir),
+                          os.path.join(cache_dir, 'search'))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        changes = index.refresh(executor=executor)
+    print(f"Indexed {len(changes['indexed'])} documents ({len(changes['unchanged'])} unchanged): {index.stats()}")
+
+
+if __name__ == '__main__':
+    main()
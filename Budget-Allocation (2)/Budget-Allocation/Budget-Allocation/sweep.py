@@ -0,0 +1,208 @@
+import json
+from collections import deque
+from concurrent.futures import Executor
+from typing import Dict, Iterator, Optional
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Swept parameters in grid order, with the default used when one is not swept
+SWEEP_AXES = {
+    'totalBudget': 225000.0,
+    'year': None,  # Defaults to the year after the forecaster's last training year
+    'severity': 5,
+    'estimatedDamage': 1000.0,
+    'economicCondition': 'stable',
+    'revenueTarget': 200000.0
+}
+
+# Most values a single swept parameter may expand to
+MAX_AXIS_VALUES = 1_000_000
+
+
+def parse_axis(name: str, spec) -> np.ndarray:
+    """
+    Expand one sweep parameter into its values.
+
+    Args:
+        name: Parameter name from SWEEP_AXES
+        spec: A scalar, a list of values, ``{"start", "stop", "step"}`` (stop
+            inclusive) or ``{"start", "stop", "num"}`` (evenly spaced)
+
+    Returns:
+        np.ndarray: The parameter's values
+    """
+    if isinstance(spec, dict):
+        missing = [field for field in ('start', 'stop') if field not in spec]
+        if missing:
+            raise ValueError(f"{name} range is missing {' and '.join(missing)}")
+        start, stop = float(spec['start']), float(spec['stop'])
+        if 'num' in spec:
+            count = int(spec['num'])
+        else:
+            step = float(spec.get('step', 1))
+            if step <= 0:
+                raise ValueError(f"{name} step must be positive")
+            count = int(np.floor((stop - start) / step + 0.5)) + 1
+        if count > MAX_AXIS_VALUES:
+            raise ValueError(f"{name} expands to more than {MAX_AXIS_VALUES} values")
+        values = np.linspace(start, stop, count) if 'num' in spec else start + step * np.arange(max(count, 0))
+    else:
+        values = np.asarray(spec if isinstance(spec, list) else [spec])
+
+    if name == 'economicCondition':
+        return values.astype(str)
+    if name in ('year', 'severity'):
+        return values.astype(int)
+    return values.astype(float)
+
+
+class SweepEngine:
+    """
+    Evaluates the cartesian product of budget, year, disaster and tax parameters
+    against all three models.
+
+    The grid is never materialized: each chunk of row numbers is unravelled into
+    parameter indices, scored through the models' batched methods and serialized
+    to NDJSON, with a bounded number of chunks in flight on the executor so
+    memory stays flat however large the sweep is.
+    """
+
+    def __init__(self, forecast_model, disaster_model, tax_model, chunk_size: int = 2000,
+                 max_rows: int = 10_000_000):
+        self.forecast_model = forecast_model
+        self.disaster_model = disaster_model
+        self.tax_model = tax_model
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+
+    def parse(self, spec: Dict) -> Dict[str, np.ndarray]:
+        """
+        Build the sweep axes from a request body.
+
+        Args:
+            spec: Mapping of parameter name to axis spec (see parse_axis)
+
+        Returns:
+            Dict[str, np.ndarray]: Values of every axis, in SWEEP_AXES order
+        """
+        defaults = dict(SWEEP_AXES, year=self.forecast_model.base_year + 1)
+        axes = {name: parse_axis(name, spec.get(name, default)) for name, default in defaults.items()}
+
+        rows = int(np.prod([len(values) for values in axes.values()]))
+        if rows == 0:
+            raise ValueError("Every sweep parameter needs at least one value")
+        if rows > self.max_rows:
+            raise ValueError(f"Sweep of {rows} rows exceeds the limit of {self.max_rows}")
+        return axes
+
+    def evaluate_chunk(self, axes: Dict[str, np.ndarray], start: int, stop: int) -> str:
+        """
+        Score grid rows [start, stop) and serialize them as NDJSON.
+
+        Args:
+            axes: Sweep axes from parse()
+            start: First row number
+            stop: Row number after the last
+
+        Returns:
+            str: One JSON line per row
+        """
+        try:
+            shape = tuple(len(values) for values in axes.values())
+            indices = np.unravel_index(np.arange(start, stop), shape)
+            params = {name: values[index] for (name, values), index in zip(axes.items(), indices)}
+
+            budgets = params['totalBudget']
+
+            # Forecast: one proportion column per distinct year in the chunk
+            years, year_rows = np.unique(params['year'], return_inverse=True)
+            allocations = self.forecast_model.sector_proportion_matrix(years)[:, year_rows].T * budgets[:, None]
+
+            # Disaster: batched fund and sector adjustments
+            funds = self.disaster_model.calculate_disaster_fund_batch(params['severity'], params['estimatedDamage'])
+            _, adjusted = self.disaster_model.adjust_sector_budgets_batch(budgets, funds)
+
+            # Tax: one (cached) solve per distinct condition and target, projected together
+            pairs = np.stack([params['economicCondition'], params['revenueTarget'].astype(str)], axis=1)
+            unique_pairs, pair_rows = np.unique(pairs, axis=0, return_inverse=True)
+            pair_rows = pair_rows.reshape(-1)
+            solutions = [self.tax_model.optimize_taxes(condition, float(target)) for condition, target in unique_pairs]
+            projected = np.array([self.tax_model.projected_revenue(condition, solution)
+                                  for (condition, _), solution in zip(unique_pairs, solutions)])
+            revenue_impacts = np.array([sum(rec['revenue_impact'] for rec in solution) for solution in solutions])
+
+            forecast_sectors = self.forecast_model.sectors
+            disaster_sectors = self.disaster_model.sectors
+            columns = zip(
+                budgets.tolist(), params['year'].tolist(), params['severity'].tolist(),
+                params['estimatedDamage'].tolist(), params['economicCondition'].tolist(),
+                params['revenueTarget'].tolist(), np.round(allocations).astype(int).tolist(),
+                np.round(funds).astype(int).tolist(), np.round(adjusted).astype(int).tolist(),
+                np.round(projected[pair_rows]).astype(int).tolist(),
+                revenue_impacts[pair_rows].tolist()
+            )
+
+            lines = []
+            for (budget, year, severity, damage, condition, target, allocation,
+                 fund, adjustment, projected, revenue_impact) in columns:
+                lines.append(json.dumps({
+                    'totalBudget': budget,
+                    'year': year,
+                    'severity': severity,
+                    'estimatedDamage': damage,
+                    'economicCondition': condition,
+                    'revenueTarget': target,
+                    'allocations': dict(zip(forecast_sectors, allocation)),
+                    'requiredFund': fund,
+                    'adjustedBudgets': dict(zip(disaster_sectors, adjustment)),
+                    'taxRevenueImpact': revenue_impact,
+                    'totalProjectedRevenue': projected
+                }))
+            return '\n'.join(lines) + '\n'
+
+        except Exception as e:
+            logger.error(f"Error in evaluate_chunk: {str(e)}")
+            raise
+
+    def stream(self, axes: Dict[str, np.ndarray], executor: Optional[Executor] = None,
+               max_in_flight: int = 4) -> Iterator[str]:
+        """
+        Yield the sweep as NDJSON text, one chunk at a time and in grid order.
+
+        The first line describes the sweep (row count and the length of each
+        axis, in grid order, not its values, which can run to millions); every
+        following line is one row.
+
+        Args:
+            axes: Sweep axes from parse()
+            executor: Pool to evaluate chunks on; chunks run inline when omitted
+            max_in_flight: Chunks submitted ahead of the one being yielded
+
+        Yields:
+            str: NDJSON text
+        """
+        rows = int(np.prod([len(values) for values in axes.values()]))
+        yield json.dumps({
+            'rows': rows,
+            'axes': {name: len(values) for name, values in axes.items()},
+            'sectors': self.forecast_model.sectors
+        }) + '\n'
+
+        bounds = ((start, min(start + self.chunk_size, rows)) for start in range(0, rows, self.chunk_size))
+        if executor is None:
+            for start, stop in bounds:
+                yield self.evaluate_chunk(axes, start, stop)
+            return
+
+        pending = deque()
+        for start, stop in bounds:
+            pending.append(executor.submit(self.evaluate_chunk, axes, start, stop))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -1,9 +1,14 @@
+import itertools
+import json
+import os
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
 from typing import Dict, List, Tuple
 import logging
 
+from model_store import hash_training_data
+from response_cache import ResponseCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,7 +22,46 @@ class TaxOptimizationModel:
                 'medium': 0.6,
                 'high': 0.9
             }
+            # Allowed rate change range (percentage points) and revenue impact level
+            # of each tax under each economic condition. A tax moves revenue by
+            # impact weight * avg_revenue_impact per point, so each condition can
+            # only reach targets within base revenue + sum(min or max * that slope)
+            # (see revenue_range). Recessions cap increases at 0.5-2 points and lean
+            # on cuts to support demand; growth allows up to 3-point increases. On
+            # the sample data that is roughly 167k-185k crore in a recession,
+            # 173k-185k when stable and 169k-196k in growth; targets outside the
+            # range are met as closely as the bounds allow and the remainder is
+            # reported by revenue_shortfall.
+            self.condition_profiles = {
+                'recession': {
+                    'Income Tax': {'min': -2, 'max': 1, 'impact': 'medium'},
+                    'Corporate Tax': {'min': -3, 'max': 0.5, 'impact': 'high'},
+                    'GST': {'min': -1, 'max': 1, 'impact': 'medium'},
+                    'Property Tax': {'min': -1, 'max': 1, 'impact': 'low'},
+                    'Customs Duty': {'min': -2, 'max': 1, 'impact': 'medium'},
+                    'Excise Duty': {'min': -1, 'max': 2, 'impact': 'high'}
+                },
+                'stable': {
+                    'Income Tax': {'min': -1, 'max': 1, 'impact': 'low'},
+                    'Corporate Tax': {'min': -1, 'max': 1, 'impact': 'medium'},
+                    'GST': {'min': -1, 'max': 1, 'impact': 'medium'},
+                    'Property Tax': {'min': -1, 'max': 2, 'impact': 'medium'},
+                    'Customs Duty': {'min': -1, 'max': 1, 'impact': 'low'},
+                    'Excise Duty': {'min': -1, 'max': 2, 'impact': 'medium'}
+                },
+                'growth': {
+                    'Income Tax': {'min': -1, 'max': 2, 'impact': 'high'},
+                    'Corporate Tax': {'min': -1, 'max': 3, 'impact': 'high'},
+                    'GST': {'min': -1, 'max': 2, 'impact': 'high'},
+                    'Property Tax': {'min': -1, 'max': 3, 'impact': 'medium'},
+                    'Customs Duty': {'min': -2, 'max': 1, 'impact': 'medium'},
+                    'Excise Duty': {'min': -1, 'max': 3, 'impact': 'high'}
+                }
+            }
+            self.rate_step = 0.5  # Recommended changes are rounded to this many percentage points
+            self._solution_cache = ResponseCache(max_entries=1024, ttl_seconds=float('inf'))
             self.is_trained = False
+            self.version = None  # Hash of the training data (see hash_training_data)
             logger.info("TaxOptimizationModel initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing TaxOptimizationModel: {str(e)}")
@@ -31,10 +75,19 @@ class TaxOptimizationModel:
             tax_data: DataFrame containing historical tax information
         """
         try:
+            self.version = hash_training_data(tax_data)
+            
             # Calculate average tax collection and revenue impacts
             self.avg_revenue_impact = tax_data['Revenue_Generated_Cr'].mean() / tax_data['Tax_Rate_Percent'].mean()
             self.avg_collection_efficiency = tax_data['Collection_Efficiency_Percent'].mean() / 100
             
+            # Current revenue per tax is the baseline the revenue target is measured against
+            self.base_revenues = {
+                tax_type: float(revenue)
+                for tax_type, revenue in zip(tax_data['Tax_Type'], tax_data['Revenue_Generated_Cr'])
+            }
+            self._solution_cache.clear()
+            
             self.is_trained = True
             logger.info("Tax optimization model trained successfully")
             
@@ -42,91 +95,200 @@ class TaxOptimizationModel:
             logger.error(f"Error in train_models: {str(e)}")
             raise
 
+    def _solve_rate_changes(self, slopes: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                            revenue_gap: float) -> np.ndarray:
+        """
+        Find rate changes that close a revenue gap with the least weighted disruption.
+        
+        Minimizes sum(delta_i^2 / w_i) subject to sum(slope_i * delta_i) = gap and
+        lower <= delta <= upper, where slope_i = w_i * avg_revenue_impact. The KKT
+        conditions give delta_i(lam) = clip(lam * slope_i * w_i, lower_i, upper_i),
+        a piecewise linear, non-decreasing revenue curve in lam. Its breakpoints
+        are evaluated together as one matrix of candidate rate vectors and the
+        segment containing the gap is solved exactly. When the gap is out of
+        reach the closest bound is returned.
+        
+        Args:
+            slopes: Revenue change per percentage point for each tax
+            lower: Lowest allowed change for each tax
+            upper: Highest allowed change for each tax
+            revenue_gap: Revenue change required
+            
+        Returns:
+            np.ndarray: Continuous rate change per tax in percentage points
+        """
+        weights = slopes / self.avg_revenue_impact
+        gains = slopes * weights
+        
+        # Every lam at which some tax reaches one of its bounds
+        breakpoints = np.unique(np.concatenate([[0.0], lower / gains, upper / gains]))
+        candidates = np.clip(breakpoints[:, None] * gains[None, :], lower, upper)
+        revenues = candidates @ slopes
+        
+        if revenue_gap <= revenues[0]:
+            return candidates[0]
+        if revenue_gap >= revenues[-1]:
+            return candidates[-1]
+        
+        segment = np.searchsorted(revenues, revenue_gap) - 1
+        span = revenues[segment + 1] - revenues[segment]
+        fraction = 0.0 if span == 0 else (revenue_gap - revenues[segment]) / span
+        lam = breakpoints[segment] + fraction * (breakpoints[segment + 1] - breakpoints[segment])
+        return np.clip(lam * gains, lower, upper)
+
+    def _round_rate_changes(self, changes: np.ndarray, slopes: np.ndarray, lower: np.ndarray,
+                            upper: np.ndarray, revenue_gap: float) -> np.ndarray:
+        """
+        Round continuous rate changes to ``rate_step`` while staying close to the gap.
+        
+        Every floor/ceiling combination is scored at once (up to 2^12 candidates;
+        beyond that changes are rounded to the nearest step).
+        """
+        step = self.rate_step
+        floors = np.maximum(np.floor(changes / step) * step, lower)
+        ceilings = np.minimum(np.ceil(changes / step) * step, upper)
+        if len(changes) > 12:
+            return np.clip(np.round(changes / step) * step, lower, upper)
+        
+        choices = np.array(list(itertools.product((0, 1), repeat=len(changes))), dtype=bool)
+        candidates = np.where(choices, ceilings, floors)
+        
+        # Closest revenue first, then the smallest total disruption
+        weights = slopes / self.avg_revenue_impact
+        miss = np.abs(candidates @ slopes - revenue_gap)
+        disruption = (np.square(candidates) / weights).sum(axis=1)
+        best = np.lexsort((disruption, np.round(miss, 6)))[0]
+        return candidates[best]
+
     def optimize_taxes(self, economic_condition: str, revenue_target: float) -> List[Dict]:
         """
         Generate tax optimization recommendations based on economic condition and revenue target.
         
+        Solves for the rate changes, within the condition's per-tax bounds, that
+        move current revenue as close as possible to ``revenue_target``.
+        Results are cached per (condition, target) until the model is retrained.
+        
         Args:
             economic_condition: Current economic condition ('recession', 'stable', 'growth')
             revenue_target: Target revenue in crores
             
         Returns:
-            List[Dict]: List of tax optimization recommendations
+            List[Dict]: List of tax optimization recommendations; ``change`` is the
+            signed rate change in percentage points and ``amount`` its display form
         """
         try:
             if not self.is_trained:
                 raise RuntimeError("Model must be trained before making recommendations")
             
-            # Adjust recommendations based on economic conditions
-            adjustments = {
-                'recession': {
-                    'Income Tax': {'action': 'decrease', 'amount': 2, 'impact': 'medium'},
-                    'Corporate Tax': {'action': 'decrease', 'amount': 3, 'impact': 'high'},
-                    'GST': {'action': 'decrease', 'amount': 1, 'impact': 'medium'},
-                    'Property Tax': {'action': 'maintain', 'amount': 0, 'impact': 'low'},
-                    'Customs Duty': {'action': 'decrease', 'amount': 2, 'impact': 'medium'},
-                    'Excise Duty': {'action': 'increase', 'amount': 1, 'impact': 'high'}
-                },
-                'stable': {
-                    'Income Tax': {'action': 'maintain', 'amount': 0, 'impact': 'low'},
-                    'Corporate Tax': {'action': 'maintain', 'amount': 0, 'impact': 'medium'},
-                    'GST': {'action': 'maintain', 'amount': 0, 'impact': 'medium'},
-                    'Property Tax': {'action': 'increase', 'amount': 1, 'impact': 'medium'},
-                    'Customs Duty': {'action': 'maintain', 'amount': 0, 'impact': 'low'},
-                    'Excise Duty': {'action': 'increase', 'amount': 1, 'impact': 'medium'}
-                },
-                'growth': {
-                    'Income Tax': {'action': 'increase', 'amount': 1, 'impact': 'high'},
-                    'Corporate Tax': {'action': 'increase', 'amount': 2, 'impact': 'high'},
-                    'GST': {'action': 'increase', 'amount': 1, 'impact': 'high'},
-                    'Property Tax': {'action': 'increase', 'amount': 2, 'impact': 'medium'},
-                    'Customs Duty': {'action': 'decrease', 'amount': 1, 'impact': 'medium'},
-                    'Excise Duty': {'action': 'increase', 'amount': 2, 'impact': 'high'}
-                }
-            }
-            
-            # Get adjustments for current economic condition
-            current_adjustments = adjustments.get(economic_condition, adjustments['stable'])
-            
-            # Calculate revenue impact
-            recommendations = []
-            total_projected_revenue = 0
-            
-            for tax_type, adjustment in current_adjustments.items():
-                impact_factor = self.impact_weights.get(adjustment['impact'], 0.5)
-                
-                # Estimate revenue impact based on action and amount
-                if adjustment['action'] == 'increase':
-                    revenue_impact = adjustment['amount'] * impact_factor * self.avg_revenue_impact
-                    implementation = 'Next Quarter'
-                elif adjustment['action'] == 'decrease':
-                    revenue_impact = -adjustment['amount'] * impact_factor * self.avg_revenue_impact
-                    implementation = 'Immediate'
-                else:
-                    revenue_impact = 0
-                    implementation = 'No Change Required'
-                
-                total_projected_revenue += revenue_impact
-                
-                # Create recommendation
-                recommendations.append({
-                    'tax_type': tax_type,
-                    'action': adjustment['action'].capitalize(),
-                    'amount': f"{adjustment['amount']}%",
-                    'impact': adjustment['impact'].capitalize(),
-                    'revenue_impact': round(revenue_impact),
-                    'implementation': implementation
-                })
-            
-            # Sort recommendations by impact
-            recommendations.sort(key=lambda x: self.impact_weights.get(x['impact'].lower(), 0), reverse=True)
-            
-            return recommendations
+            key = (economic_condition, float(revenue_target))
+            recommendations = self._solution_cache.get_or_compute(
+                key, lambda: self._recommend(economic_condition, float(revenue_target))
+            )
+            return [dict(recommendation) for recommendation in recommendations]
             
         except Exception as e:
             logger.error(f"Error in optimize_taxes: {str(e)}")
             raise
 
+    def cache_stats(self) -> Dict[str, float]:
+        """Hit, miss and size statistics of the optimize_taxes solution cache."""
+        return self._solution_cache.stats()
+
+    def _profile_arrays(self, economic_condition: str) -> Tuple[List[str], List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Tax types, impact levels, revenue slopes and lower and upper rate bounds of a condition's profile."""
+        profile = self.condition_profiles.get(economic_condition, self.condition_profiles['stable'])
+        tax_types = list(profile)
+        
+        impacts = [profile[tax_type]['impact'] for tax_type in tax_types]
+        slopes = np.array([self.impact_weights.get(impact, 0.5) for impact in impacts]) * self.avg_revenue_impact
+        lower = np.array([profile[tax_type]['min'] for tax_type in tax_types], dtype=float)
+        upper = np.array([profile[tax_type]['max'] for tax_type in tax_types], dtype=float)
+        return tax_types, impacts, slopes, lower, upper
+
+    def _base_revenue(self, tax_types: List[str]) -> float:
+        return sum(self.base_revenues.get(tax_type, 0.0) for tax_type in tax_types)
+
+    def revenue_range(self, economic_condition: str) -> Tuple[float, float]:
+        """
+        Lowest and highest revenue the condition's rate bounds can reach.
+        
+        Args:
+            economic_condition: Current economic condition ('recession', 'stable', 'growth')
+            
+        Returns:
+            Tuple[float, float]: Revenue in crores with every tax at its lower and at its upper bound
+        """
+        tax_types, _, slopes, lower, upper = self._profile_arrays(economic_condition)
+        base = self._base_revenue(tax_types)
+        return base + float(lower @ slopes), base + float(upper @ slopes)
+
+    def projected_revenue(self, economic_condition: str, recommendations: List[Dict]) -> float:
+        """
+        Revenue after the recommended rate changes, as the solver models it.
+        
+        Args:
+            economic_condition: Condition the recommendations were made for
+            recommendations: Output of optimize_taxes
+            
+        Returns:
+            float: Base revenue plus each change times its tax's revenue slope, in crores
+        """
+        tax_types, _, slopes, _, _ = self._profile_arrays(economic_condition)
+        changes = {rec['tax_type']: rec['change'] for rec in recommendations}
+        achieved = sum(changes.get(tax_type, 0.0) * slope for tax_type, slope in zip(tax_types, slopes.tolist()))
+        return self._base_revenue(tax_types) + achieved
+
+    def revenue_shortfall(self, economic_condition: str, revenue_target: float,
+                          recommendations: List[Dict]) -> float:
+        """
+        Revenue the recommended rate changes leave the target short by.
+        
+        Args:
+            economic_condition: Condition the recommendations were made for
+            revenue_target: Target revenue in crores
+            recommendations: Output of optimize_taxes
+            
+        Returns:
+            float: Target minus the revenue after the changes, in crores; positive
+            when the target is missed from below, negative when it is overshot
+            (both happen when the target is outside revenue_range, and by a
+            rounding step otherwise)
+        """
+        return float(revenue_target) - self.projected_revenue(economic_condition, recommendations)
+
+    def _recommend(self, economic_condition: str, revenue_target: float) -> List[Dict]:
+        # Get the constraints for current economic condition
+        tax_types, impacts, slopes, lower, upper = self._profile_arrays(economic_condition)
+        
+        revenue_gap = revenue_target - self._base_revenue(tax_types)
+        changes = self._solve_rate_changes(slopes, lower, upper, revenue_gap)
+        # Adding 0.0 turns -0.0 into 0.0 for unchanged taxes
+        changes = self._round_rate_changes(changes, slopes, lower, upper, revenue_gap) + 0.0
+        
+        recommendations = []
+        for tax_type, impact, change, slope in zip(tax_types, impacts, changes.tolist(), slopes.tolist()):
+            if change > 0:
+                action, implementation = 'increase', 'Next Quarter'
+            elif change < 0:
+                action, implementation = 'decrease', 'Immediate'
+            else:
+                action, implementation = 'maintain', 'No Change Required'
+            
+            recommendations.append({
+                'tax_type': tax_type,
+                'action': action.capitalize(),
+                'amount': f"{abs(change):g}%",
+                'change': change,
+                'impact': impact.capitalize(),
+                'revenue_impact': round(change * slope),
+                'implementation': implementation
+            })
+        
+        # Sort recommendations by impact
+        recommendations.sort(key=lambda x: self.impact_weights.get(x['impact'].lower(), 0), reverse=True)
+        
+        return recommendations
+
     def project_revenue(self, tax_adjustments: Dict[str, float], base_revenue: float) -> Dict[str, float]:
         """
         Project revenue based on tax adjustments.
@@ -138,26 +300,108 @@ class TaxOptimizationModel:
         Returns:
             Dict[str, float]: Projected revenue by tax type
         """
+        try:
+            tax_types = list(tax_adjustments)
+            adjustments = np.array([[tax_adjustments[tax_type] for tax_type in tax_types]], dtype=float)
+            result = self.project_revenue_matrix(adjustments, [base_revenue], by_tax=True)
+            
+            # Project revenue for each tax type
+            projections = {
+                tax_type: round(projected)
+                for tax_type, projected in zip(tax_types, result['by_tax'][0, 0].tolist())
+            }
+            projections['Total'] = round(float(result['total'][0, 0]))
+            
+            return projections
+            
+        except Exception as e:
+            logger.error(f"Error in project_revenue: {str(e)}")
+            raise
+
+    def project_revenue_matrix(self, adjustment_matrix: np.ndarray, base_revenues: np.ndarray,
+                               by_tax: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Project revenue for many adjustment scenarios against many base revenues at once.
+        
+        Args:
+            adjustment_matrix: Rate adjustments in percentage points, shape (scenarios, taxes)
+            base_revenues: Base revenues in crores, shape (bases,)
+            by_tax: Also return the per-tax projections, shape (scenarios, bases, taxes);
+                only the totals are computed otherwise
+            
+        Returns:
+            Dict[str, np.ndarray]: 'total' of shape (scenarios, bases), plus 'by_tax' if requested
+        """
         try:
             if not self.is_trained:
                 raise RuntimeError("Model must be trained before making projections")
             
-            # Project revenue for each tax type
-            projections = {}
-            total_projected = 0
+            adjustments = np.atleast_2d(np.asarray(adjustment_matrix, dtype=float))
+            bases = np.asarray(base_revenues, dtype=float).reshape(-1)
             
-            for tax_type, adjustment in tax_adjustments.items():
-                # Calculate revenue impact
-                impact = adjustment * self.avg_revenue_impact * self.avg_collection_efficiency
-                projected = base_revenue * (1 + impact/100)
-                
-                projections[tax_type] = round(projected)
-                total_projected += projected
+            # Revenue growth factor per tax: 1 + adjustment * impact * efficiency / 100
+            growth = 1 + adjustments * (self.avg_revenue_impact * self.avg_collection_efficiency / 100)
+            result = {'total': np.outer(growth.sum(axis=1), bases)}
+            if by_tax:
+                result['by_tax'] = bases[None, :, None] * growth[:, None, :]
+            return result
             
-            projections['Total'] = round(total_projected)
+        except Exception as e:
+            logger.error(f"Error in project_revenue_matrix: {str(e)}")
+            raise
+
+    def save(self, directory: str) -> None:
+        """
+        Save the trained model parameters to a directory.
+        
+        Args:
+            directory: Existing directory to write the artifact files into
+        """
+        try:
+            if not self.is_trained:
+                raise RuntimeError("Model must be trained before saving")
             
-            return projections
+            with open(os.path.join(directory, 'state.json'), 'w') as f:
+                json.dump({
+                    'tax_types': self.tax_types,
+                    'impact_weights': self.impact_weights,
+                    'avg_revenue_impact': float(self.avg_revenue_impact),
+                    'avg_collection_efficiency': float(self.avg_collection_efficiency),
+                    'base_revenues': self.base_revenues,
+                    'condition_profiles': self.condition_profiles,
+                    'rate_step': self.rate_step
+                }, f, indent=2)
             
         except Exception as e:
-            logger.error(f"Error in project_revenue: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error(f"Error in save: {str(e)}")
+            raise
+
+    @classmethod
+    def load(cls, directory: str) -> 'TaxOptimizationModel':
+        """
+        Load a model previously written by save().
+        
+        Args:
+            directory: Artifact directory
+            
+        Returns:
+            TaxOptimizationModel: Trained model
+        """
+        try:
+            with open(os.path.join(directory, 'state.json')) as f:
+                state = json.load(f)
+            
+            model = cls()
+            model.tax_types = state['tax_types']
+            model.impact_weights = state['impact_weights']
+            model.avg_revenue_impact = state['avg_revenue_impact']
+            model.avg_collection_efficiency = state['avg_collection_efficiency']
+            model.base_revenues = state['base_revenues']
+            model.condition_profiles = state['condition_profiles']
+            model.rate_step = state['rate_step']
+            model.is_trained = True
+            return model
+            
+        except Exception as e:
+            logger.error(f"Error in load: {str(e)}")
+            raise
\ No newline at end of file
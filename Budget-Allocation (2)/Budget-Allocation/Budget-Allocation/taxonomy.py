@@ -0,0 +1,282 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Top-level sectors the models are trained on
+DEFAULT_SECTORS = ['Healthcare', 'Education', 'Defence', 'Infrastructure', 'Agriculture', 'Environment']
+
+# Selects every node without children, whatever its depth
+LEAVES = 'leaves'
+
+
+class SectorTaxonomy:
+    """
+    Tree of budget heads (sectors, ministries, departments, schemes) stored as
+    flat arrays.
+
+    Nodes are kept in breadth-first order: every depth occupies one contiguous
+    range, and within it siblings are contiguous and ordered like their
+    parents. A node's share of its parent is its weight divided by its
+    siblings' total weight. Top-down distribution and bottom-up roll-ups are
+    then one vectorized step per depth rather than per node, so a tree with
+    thousands of heads costs a handful of array operations.
+
+    The top level holds the sectors the models forecast; deeper levels are
+    split by their static weights.
+    """
+
+    def __init__(self, names: Sequence[str], parents: Sequence[int], weights: Optional[Sequence[float]] = None):
+        """
+        Args:
+            names: Unique node names
+            parents: Index into ``names`` of each node's parent, -1 for top-level sectors
+            weights: Relative size of each node among its siblings; missing (NaN)
+                weights default to 1 for leaves and to the rolled-up weight of
+                the children for inner nodes
+        """
+        try:
+            if len(set(names)) != len(names):
+                raise ValueError("Taxonomy node names must be unique")
+            parents = np.asarray(parents, dtype=np.int64).reshape(-1)
+            if len(parents) != len(names):
+                raise ValueError("Every taxonomy node needs a parent index (-1 for top-level sectors)")
+            weights = (np.full(len(names), np.nan) if weights is None
+                       else np.asarray(weights, dtype=float).reshape(-1))
+
+            # Breadth-first order: roots in the given order, then each level's
+            # children grouped under their parents in the parents' order
+            children = [[] for _ in names]
+            for node, parent in enumerate(parents.tolist()):
+                if parent >= len(names) or parent < -1 or parent == node:
+                    raise ValueError(f"Invalid parent index {parent} for {names[node]}")
+                if parent >= 0:
+                    children[parent].append(node)
+            order = [node for node, parent in enumerate(parents.tolist()) if parent < 0]
+            level_starts = [0]
+            start = 0
+            while start < len(order):
+                stop = len(order)
+                for node in order[start:stop]:
+                    order.extend(children[node])
+                level_starts.append(stop)
+                start = stop
+            if len(order) != len(names):
+                raise ValueError("Taxonomy contains a cycle")
+
+            position = np.empty(len(names), dtype=np.int64)
+            position[order] = np.arange(len(order))
+            self.names = [names[node] for node in order]
+            self.parent = np.where(parents[order] >= 0, position[np.maximum(parents[order], 0)], -1)
+            self.index = {name: i for i, name in enumerate(self.names)}
+            # levels[d] is the slice of nodes at depth d
+            self.levels = [slice(level_starts[d], level_starts[d + 1]) for d in range(len(level_starts) - 1)]
+            self.depth = np.repeat(np.arange(len(self.levels)), [lvl.stop - lvl.start for lvl in self.levels])
+            # Top-level sector each node belongs to
+            self.root = np.arange(len(self.names))
+            for level in self.levels[1:]:
+                self.root[level] = self.root[self.parent[level]]
+            self.is_leaf = np.bincount(self.parent[self.parent >= 0], minlength=len(self.names)) == 0
+
+            # Start offset (within its level) and parent of each sibling group,
+            # the segments np.add.reduceat sums over
+            self._groups = []
+            for level in self.levels[1:]:
+                level_parents = self.parent[level]
+                starts = np.flatnonzero(np.r_[True, level_parents[1:] != level_parents[:-1]])
+                self._groups.append((starts, level_parents[starts]))
+
+            weights = weights[order]
+            self.weight = self.roll_up(np.where(self.is_leaf & np.isnan(weights), 1.0, np.nan_to_num(weights)),
+                                       keep=~np.isnan(weights))
+            if np.any(self.weight < 0):
+                raise ValueError("Taxonomy weights must not be negative")
+            self.share = self._shares(self.weight)
+
+        except Exception as e:
+            logger.error(f"Error initializing SectorTaxonomy: {str(e)}")
+            raise
+
+    @classmethod
+    def flat(cls, sectors: Sequence[str]) -> 'SectorTaxonomy':
+        """A single-level taxonomy of the given sectors."""
+        return cls(list(sectors), [-1] * len(sectors))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'SectorTaxonomy':
+        """
+        Build a taxonomy from ``name``/``parent``/``weight`` records.
+
+        Args:
+            records: One mapping per node; ``parent`` is a node name, or empty
+                for top-level sectors, and ``weight`` is optional
+
+        Returns:
+            SectorTaxonomy: Taxonomy over the records
+        """
+        records = list(records)
+        names = [str(record['name']) for record in records]
+        index = {name: i for i, name in enumerate(names)}
+        parents = []
+        for record in records:
+            parent = record.get('parent')
+            if parent is None or (isinstance(parent, float) and np.isnan(parent)) or parent == '':
+                parents.append(-1)
+            elif parent in index:
+                parents.append(index[parent])
+            else:
+                raise ValueError(f"Unknown parent {parent!r} of {record['name']!r}")
+        weights = [np.nan if record.get('weight') is None else float(record['weight']) for record in records]
+        return cls(names, parents, weights)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'SectorTaxonomy':
+        """
+        Load a taxonomy from a CSV, Parquet or JSON file with ``name``, ``parent``
+        and optional ``weight`` columns (a JSON file holds a list of records).
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            SectorTaxonomy: Taxonomy built from the file
+        """
+        try:
+            extension = os.path.splitext(path)[1].lower()
+            if extension == '.json':
+                with open(path) as f:
+                    return cls.from_records(json.load(f))
+            data = pd.read_parquet(path) if extension in ('.parquet', '.pq') else pd.read_csv(path)
+            if 'weight' not in data.columns:
+                data['weight'] = np.nan
+            return cls.from_records(data.astype(object).where(data.notna(), None).to_dict('records'))
+
+        except Exception as e:
+            logger.error(f"Error loading sector taxonomy from {path}: {str(e)}")
+            raise
+
+    @property
+    def roots(self) -> List[str]:
+        return self.names[self.levels[0]] if self.levels else []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def with_roots(self, sectors: Sequence[str]) -> 'SectorTaxonomy':
+        """
+        The same tree with its top level in the order of ``sectors``.
+
+        Args:
+            sectors: Every top-level sector name, in the order a model uses
+
+        Returns:
+            SectorTaxonomy: Reordered taxonomy (``self`` if already in that order)
+        """
+        if list(sectors) == self.roots:
+            return self
+        if sorted(sectors) != sorted(self.roots):
+            raise ValueError(f"Taxonomy top level {self.roots} does not match the sectors {list(sectors)}")
+        rank = {name: i for i, name in enumerate(sectors)}
+        order = sorted(range(len(self.names)), key=lambda i: (self.depth[i] > 0, rank.get(self.names[i], 0)))
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        parents = np.where(self.parent[order] >= 0, position[np.maximum(self.parent[order], 0)], -1)
+        return SectorTaxonomy([self.names[i] for i in order], parents, self.weight[order])
+
+    def _shares(self, weight: np.ndarray) -> np.ndarray:
+        """Each node's weight as a fraction of its sibling group's total (equal split for an all-zero group)."""
+        group_totals = np.zeros(len(self.names))
+        group_sizes = np.zeros(len(self.names))
+        top = self.levels[0]
+        group_totals[top] = weight[top].sum()
+        group_sizes[top] = top.stop - top.start
+        for level, (starts, _) in zip(self.levels[1:], self._groups):
+            sizes = np.diff(np.r_[starts, level.stop - level.start])
+            group_totals[level] = np.repeat(np.add.reduceat(weight[level], starts), sizes)
+            group_sizes[level] = np.repeat(sizes, sizes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(group_totals > 0, weight / group_totals, 1.0 / group_sizes)
+
+    def distribute(self, root_amounts: np.ndarray) -> np.ndarray:
+        """
+        Push top-level amounts down the tree by each node's share of its parent.
+
+        Args:
+            root_amounts: Array of shape (roots, ...) aligned with ``roots``; any
+                trailing axes (years, scenarios) are carried through
+
+        Returns:
+            np.ndarray: Array of shape (nodes, ...) holding every node's amount
+        """
+        root_amounts = np.asarray(root_amounts, dtype=float)
+        amounts = np.empty((len(self.names),) + root_amounts.shape[1:])
+        amounts[self.levels[0]] = root_amounts
+        share = self.share.reshape((-1,) + (1,) * (root_amounts.ndim - 1))
+        for level in self.levels[1:]:
+            amounts[level] = amounts[self.parent[level]] * share[level]
+        return amounts
+
+    def roll_up(self, values: np.ndarray, keep: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Total every node's own value with those of its descendants, deepest level first.
+
+        Args:
+            values: Array of shape (nodes, ...), usually non-zero only at leaves
+            keep: Optional boolean mask of nodes whose value is kept as given
+                instead of being replaced by their children's total
+
+        Returns:
+            np.ndarray: Array of the same shape with each node's subtree total
+        """
+        totals = np.array(values, dtype=float)
+        for level, (starts, parents) in zip(reversed(self.levels[1:]), reversed(self._groups)):
+            sums = np.add.reduceat(totals[level], starts, axis=0)
+            if keep is None:
+                totals[parents] += sums
+            else:
+                replaced = ~keep[parents]
+                totals[parents[replaced]] += sums[replaced]
+        return totals
+
+    def select(self, level: Union[int, str] = 0) -> np.ndarray:
+        """
+        Indices of the nodes at a depth, or of every leaf.
+
+        Args:
+            level: Depth (0 for the top-level sectors) or LEAVES
+
+        Returns:
+            np.ndarray: Node indices in taxonomy order
+        """
+        if level == LEAVES:
+            return np.flatnonzero(self.is_leaf)
+        level = int(level)
+        if not 0 <= level < len(self.levels):
+            raise ValueError(f"Taxonomy depth must be between 0 and {len(self.levels) - 1} or '{LEAVES}'")
+        return np.arange(self.levels[level].start, self.levels[level].stop)
+
+    def to_dict(self, amounts: np.ndarray, level: Union[int, str] = 0) -> Dict[str, float]:
+        """Node name to amount for the nodes ``select(level)`` picks from a (nodes,) array."""
+        nodes = self.select(level)
+        return dict(zip([self.names[i] for i in nodes.tolist()], amounts[nodes].tolist()))
+
+    def parent_name(self, name: str) -> Optional[str]:
+        parent = self.parent[self.index[name]]
+        return self.names[parent] if parent >= 0 else None
+
+    def describe(self) -> List[Dict]:
+        return [{
+            'name': name,
+            'parent': self.names[parent] if parent >= 0 else None,
+            'depth': int(depth),
+            'share': round(share, 6)
+        } for name, parent, depth, share in zip(
+            self.names, self.parent.tolist(), self.depth.tolist(), self.share.tolist()
+        )]
@@ -0,0 +1,464 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Type
+import logging
+
+import pandas as pd
+
+from model_store import ModelStore, hash_training_data
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lifecycle of a training job; a running job being cancelled reports CANCELLING until its worker returns
+QUEUED, RUNNING, CANCELLING = 'queued', 'running', 'cancelling'
+SUCCEEDED, FAILED, CANCELLED = 'succeeded', 'failed', 'cancelled'
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 200
+
+# Versions remembered per tenant and model for rollback
+MAX_DEPLOYED_VERSIONS = 10
+
+# Job ids are uuid4 hex; anything else is never looked up on disk
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on ``path`` held across threads and processes (server workers and training workers)."""
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_json(path: str, data: Dict) -> None:
+    # Write then rename so other processes never read a partial file
+    staging = f'{path}.{os.getpid()}.tmp'
+    with open(staging, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(staging, path)
+
+
+def _update_job(jobs_dir: str, job_id: str, update: Callable[[Dict], None]) -> Optional[Dict]:
+    """
+    Apply ``update`` to a job's record in its file, under the lock shared by every process.
+
+    Returns:
+        Optional[Dict]: The updated record, or None if the job has no file
+    """
+    path = os.path.join(jobs_dir, f'{job_id}.json')
+    with _file_lock(os.path.join(jobs_dir, '.lock')):
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        update(record)
+        _write_json(path, record)
+        return record
+
+
+def _train_artifact(store_root: str, jobs_dir: str, job_id: str, name: str, model_cls: Type, data: pd.DataFrame,
+                    data_hash: str, model_kwargs: Dict) -> str:
+    """
+    Train a model and publish its artifact; module-level so it runs in a worker process.
+
+    The trained model is not sent back: the serving process loads the published
+    artifact, which is cheaper than pickling estimators across processes. A job
+    cancelled from any server process before it starts is not trained.
+    """
+    def start(record: Dict) -> None:
+        if not record['cancel_requested']:
+            record['started'] = time.time()
+
+    record = _update_job(jobs_dir, job_id, start)
+    if record is None or record['cancel_requested']:
+        raise CancelledError()
+
+    store = ModelStore(store_root)
+    model = model_cls(**model_kwargs)
+    model.train_models(data)
+    store.save(name, model, data_hash)
+    return data_hash
+
+
+class TrainingJob:
+    """
+    Status of one background training run.
+
+    Jobs are stored as one JSON file each (see TrainingJobQueue), so every
+    server process can report or cancel a job whichever process queued it.
+    """
+
+    # Attributes saved in the job's file
+    FIELDS = ('id', 'tenant', 'kind', 'version', 'rows', 'outcome', 'error', 'previous_version',
+              'created', 'started', 'finished', 'cancel_requested')
+
+    def __init__(self, tenant: str, kind: str, data_hash: str, rows: int):
+        self.id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.kind = kind
+        self.version = data_hash
+        self.rows = rows
+        self.outcome = None  # SUCCEEDED, FAILED or CANCELLED once finished
+        self.error = None
+        self.previous_version = None
+        self.created = time.time()
+        self.started = None  # Set by the training worker when it picks the job up
+        self.finished = None
+        self.cancel_requested = False
+
+    @classmethod
+    def from_record(cls, record: Dict) -> 'TrainingJob':
+        job = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(job, field, record.get(field))
+        return job
+
+    def record(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @property
+    def state(self) -> str:
+        if self.outcome is not None:
+            return self.outcome
+        if self.cancel_requested:
+            return CANCELLING
+        return RUNNING if self.started is not None else QUEUED
+
+    def describe(self) -> Dict:
+        return {
+            'id': self.id,
+            'tenant': self.tenant,
+            'model': self.kind,
+            'state': self.state,
+            'version': self.version[:16],
+            'previousVersion': self.previous_version[:16] if self.previous_version else None,
+            'rows': self.rows,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished
+        }
+
+
+class TrainingJobQueue:
+    """
+    Trains models in a background process pool and hot-swaps them into service.
+
+    A job fits the model in a worker process and publishes the artifact to the
+    model store. The serving process then loads that artifact and hands the
+    model to ``swap``, which replaces the tenant's models with a new immutable
+    set (read-copy-update): requests in flight finish on the models they
+    started with, and nothing on the request path waits for training.
+
+    Deployed versions are recorded per tenant and model in a JSON file next to
+    the artifacts, so retrained models survive restarts, are picked up by the
+    other server processes (see sync), and can be rolled back to the previous
+    version. Every change to that file is made under a file lock on a fresh
+    read of it, so concurrent swaps and rollbacks in different processes are
+    never lost. Job status lives in one file per job in ``jobs_dir``, so any
+    process can answer for (or cancel) a job another one queued.
+    """
+
+    def __init__(self, store: ModelStore, kinds: Dict[str, Dict], swap: Callable[[str, str, object], None],
+                 original: Callable[[str, str], object], executor_factory: Callable[[], Executor],
+                 deployments_path: str, jobs_dir: str):
+        """
+        Args:
+            store: Model store the workers publish artifacts to
+            kinds: Model kind to its ``name`` (artifact name), ``cls``, ``columns``
+                (required training columns), ``model_kwargs`` and ``load_kwargs``
+            swap: Called as ``swap(tenant, kind, model)`` to put a model into service
+            original: Called as ``original(tenant, kind)`` for the model built from the
+                tenant's own data, restored when every deployed version is rolled back
+            executor_factory: Returns the (process) pool jobs run on, created on first use
+            deployments_path: JSON file recording the deployed versions
+            jobs_dir: Directory of the job files, shared by the server processes
+        """
+        self.store = store
+        self.kinds = kinds
+        self.swap = swap
+        self.original = original
+        self.executor_factory = executor_factory
+        self.deployments_path = deployments_path
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        # Futures of the jobs this process queued, until they finish
+        self.futures: Dict[str, Future] = {}
+        self.deployments = self._read_deployments()
+        self._deployments_mtime = self._mtime()
+        self._last_synced = time.monotonic()
+        # Serializes deployments (swaps, rollbacks, syncs); requests never take it
+        self._lock = threading.RLock()
+        # Process whose background sync thread is running (see start_sync)
+        self._sync_pid = None
+        self._sync_start_lock = threading.Lock()
+
+    def _mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.deployments_path)
+        except OSError:
+            return 0.0
+
+    def _read_deployments(self) -> Dict[str, Dict[str, List[str]]]:
+        try:
+            with open(self.deployments_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading deployments from {self.deployments_path}: {str(e)}")
+            return {}
+
+    def _write_deployments(self) -> None:
+        _write_json(self.deployments_path, self.deployments)
+        self._deployments_mtime = self._mtime()
+
+    @contextmanager
+    def _updating_deployments(self) -> Iterator[None]:
+        """
+        Hold the deployments lock, in this process and across processes, and
+        first apply the deployments file as other processes left it, so the
+        caller changes (and then writes) the current versions.
+        """
+        with self._lock, _file_lock(f'{self.deployments_path}.lock'):
+            self._apply(self._read_deployments())
+            yield
+
+    def _apply(self, current: Dict[str, Dict[str, List[str]]]) -> None:
+        """Swap in the models of ``current`` where it differs from what this process serves; holds _lock."""
+        tenants = set(current) | set(self.deployments)
+        for tenant in tenants:
+            for kind in set(current.get(tenant, {})) | set(self.deployments.get(tenant, {})):
+                versions = current.get(tenant, {}).get(kind)
+                version = versions[-1] if versions else None
+                if version == self.deployed(tenant, kind):
+                    continue
+                try:
+                    model = self.load_version(kind, version) if version else self.original(tenant, kind)
+                    self.swap(tenant, kind, model)
+                except Exception as e:
+                    logger.error(f"Error applying {kind} deployment for tenant {tenant}: {str(e)}")
+        self.deployments = current
+        self._deployments_mtime = self._mtime()
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        """A job queued by any server process, or None if unknown (or pruned)."""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._job_path(job_id)) as f:
+                return TrainingJob.from_record(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def deployed(self, tenant: str, kind: str) -> Optional[str]:
+        """Version (training data hash) a job deployed for a tenant's model, or None if it was never retrained."""
+        versions = self.deployments.get(tenant, {}).get(kind)
+        return versions[-1] if versions else None
+
+    def load_version(self, kind: str, version: str):
+        """Load a deployed version's artifact from the model store."""
+        spec = self.kinds[kind]
+        model = self.store.load(spec['name'], spec['cls'], version, spec.get('load_kwargs'))
+        if model is None:
+            raise RuntimeError(f"No saved {kind} model for version {version[:16]}")
+        return model
+
+    def submit(self, tenant: str, kind: str, data: pd.DataFrame) -> TrainingJob:
+        """
+        Queue a training run on new data.
+
+        Args:
+            tenant: Tenant whose model is retrained
+            kind: Model kind from ``kinds``
+            data: Training data
+
+        Returns:
+            TrainingJob: The queued job
+        """
+        spec = self.kinds.get(kind)
+        if spec is None:
+            raise ValueError(f"Unknown model {kind!r}; expected one of {sorted(self.kinds)}")
+        missing = [column for column in spec['columns'] if column not in data.columns]
+        if missing:
+            raise ValueError(f"Training data for {kind} is missing columns {missing}")
+        if len(data) < 2:
+            raise ValueError("Training data needs at least two rows")
+
+        data = data[spec['columns']]
+        job = TrainingJob(tenant, kind, hash_training_data(data), len(data))
+        self._prune()
+        with _file_lock(os.path.join(self.jobs_dir, '.lock')):
+            _write_json(self._job_path(job.id), job.record())
+
+        future = self.executor_factory().submit(
+            _train_artifact, self.store.root, self.jobs_dir, job.id, spec['name'], spec['cls'], data, job.version,
+            spec.get('model_kwargs', {})
+        )
+        self.futures[job.id] = future
+        future.add_done_callback(lambda done: self._finish(job, done))
+        logger.info(f"Queued {kind} training job {job.id} for tenant {tenant} ({len(data)} rows)")
+        return job
+
+    def _finish(self, job: TrainingJob, future: Future) -> None:
+        """Deploy a finished job's artifact, unless the job failed or was cancelled (from any process)."""
+        try:
+            future.result()
+            current = self.get(job.id)
+            if current is None or current.cancel_requested:
+                raise CancelledError()
+            model = self.load_version(job.kind, job.version)
+            with self._updating_deployments():
+                job.previous_version = self.deployed(job.tenant, job.kind)
+                self.swap(job.tenant, job.kind, model)
+                versions = self.deployments.setdefault(job.tenant, {}).setdefault(job.kind, [])
+                if not versions or versions[-1] != job.version:
+                    versions.append(job.version)
+                del versions[:-MAX_DEPLOYED_VERSIONS]
+                self._write_deployments()
+            job.outcome = SUCCEEDED
+            logger.info(f"Training job {job.id} deployed {job.kind} version {job.version[:16]} for tenant {job.tenant}")
+
+        except CancelledError:
+            job.outcome = CANCELLED
+            logger.info(f"Training job {job.id} cancelled")
+        except Exception as e:
+            job.outcome = FAILED
+            job.error = str(e)
+            logger.error(f"Error in training job {job.id}: {str(e)}")
+        finally:
+            job.finished = time.time()
+            finished = {'outcome': job.outcome, 'error': job.error, 'previous_version': job.previous_version,
+                        'finished': job.finished}
+            try:
+                _update_job(self.jobs_dir, job.id, lambda record: record.update(finished))
+            except OSError as e:
+                logger.error(f"Error recording training job {job.id}: {str(e)}")
+            self.futures.pop(job.id, None)
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """
+        Cancel a job queued by any server process. A queued job never runs; a
+        running job finishes in its worker but its model is discarded instead
+        of deployed.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Optional[TrainingJob]: The job, or None if unknown
+        """
+        def request(record: Dict) -> None:
+            if record['outcome'] is None:
+                record['cancel_requested'] = True
+
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        record = _update_job(self.jobs_dir, job_id, request)
+        if record is None:
+            return None
+        future = self.futures.get(job_id)
+        if record['cancel_requested'] and future is not None:
+            # Drops it from this process' pool if not started; _finish records the outcome
+            future.cancel()
+        return self.get(job_id)
+
+    def rollback(self, tenant: str, kind: str) -> Optional[str]:
+        """
+        Put the previously deployed version of a tenant's model back into service.
+
+        Args:
+            tenant: Tenant id
+            kind: Model kind
+
+        Returns:
+            Optional[str]: Version now serving, None for the original model
+        """
+        with self._updating_deployments():
+            versions = self.deployments.get(tenant, {}).get(kind)
+            if not versions:
+                raise ValueError(f"No retrained {kind} model to roll back for tenant {tenant}")
+
+            previous = versions[-2] if len(versions) > 1 else None
+            model = self.load_version(kind, previous) if previous else self.original(tenant, kind)
+            self.swap(tenant, kind, model)
+            versions.pop()
+            if not versions:
+                del self.deployments[tenant][kind]
+            self._write_deployments()
+            logger.info(f"Rolled back {kind} model for tenant {tenant} to {previous[:16] if previous else 'original'}")
+            return previous
+
+    def start_sync(self, interval: float = 5.0) -> None:
+        """
+        Apply other processes' deployments from a background thread, checking
+        the deployments file every ``interval`` seconds.
+
+        Loading their artifacts (or rebuilding an original model on a rollback)
+        then never happens on a request. Cheap enough to call per request: the
+        thread is started once per process, so workers forked from a
+        preloading master each start their own.
+        """
+        if self._sync_pid == os.getpid():
+            return
+        with self._sync_start_lock:
+            if self._sync_pid == os.getpid():
+                return
+            self._sync_pid = os.getpid()
+            threading.Thread(target=self._sync_loop, args=(interval,), name='deployment-sync', daemon=True).start()
+
+    def _sync_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.sync(0.0)
+            except Exception as e:
+                logger.error(f"Error syncing deployments: {str(e)}")
+
+    def sync(self, min_interval: float = 5.0) -> None:
+        """
+        Apply deployments made by other server processes, checking the
+        deployments file at most once per ``min_interval`` seconds. Runs on
+        the start_sync thread; requests only read deployed().
+        """
+        if time.monotonic() - self._last_synced < min_interval:
+            return
+        self._last_synced = time.monotonic()
+        if self._mtime() == self._deployments_mtime:
+            return
+
+        with self._lock:
+            self._apply(self._read_deployments())
+
+    def _jobs(self) -> List[TrainingJob]:
+        names = [name for name in os.listdir(self.jobs_dir) if name.endswith('.json')]
+        jobs = [self.get(name[:-len('.json')]) for name in names]
+        return [job for job in jobs if job is not None]
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs() if job.state in (SUCCEEDED, FAILED, CANCELLED)]
+        with _file_lock(os.path.join(self.jobs_dir, '.lock')):
+            for job in sorted(finished, key=lambda job: job.created)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                try:
+                    os.remove(self._job_path(job.id))
+                except FileNotFoundError:
+                    pass
+
+    def describe(self) -> List[Dict]:
+        return [job.describe() for job in sorted(self._jobs(), key=lambda job: job.created, reverse=True)]
@@ -0,0 +1,129 @@
+from typing import Optional
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TREND_METHODS = ('ols', 'weighted', 'theil_sen')
+
+
+def _steps(n: int, x: Optional[np.ndarray]) -> np.ndarray:
+    return np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+
+def ols_slopes(Y: np.ndarray, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Ordinary least squares slope of every column of Y against x.
+
+    Args:
+        Y: Array of shape (observations, series)
+        x: Regressor of length observations (default: 0, 1, 2, ...)
+
+    Returns:
+        np.ndarray: One slope per series
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = _steps(len(Y), x)
+    x_centred = x - x.mean()
+    return x_centred @ (Y - Y.mean(axis=0)) / (x_centred @ x_centred)
+
+
+def loo_residuals(Y: np.ndarray, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Leave-one-out residuals of an OLS trend fitted to every column of Y.
+
+    Each observation's residual is taken from the line fitted without it, in
+    closed form as the in-sample residual divided by one minus its leverage,
+    so it measures out-of-sample error without refitting. Needs at least
+    three observations.
+
+    Args:
+        Y: Array of shape (observations, series)
+        x: Regressor of length observations (default: 0, 1, 2, ...)
+
+    Returns:
+        np.ndarray: Residuals of the same shape as Y
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = _steps(len(Y), x)
+    x_centred = x - x.mean()
+    slopes = ols_slopes(Y, x)
+    fitted = Y.mean(axis=0) + x_centred[:, None] * slopes
+    leverage = 1.0 / len(x) + np.square(x_centred) / (x_centred @ x_centred)
+    return (Y - fitted) / (1.0 - leverage)[:, None]
+
+
+def weighted_slopes(Y: np.ndarray, weights: np.ndarray, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Weighted least squares slope of every column of Y against x.
+
+    Args:
+        Y: Array of shape (observations, series)
+        weights: Non-negative weight per observation
+        x: Regressor of length observations (default: 0, 1, 2, ...)
+
+    Returns:
+        np.ndarray: One slope per series
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = _steps(len(Y), x)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    x_centred = x - weights @ x
+    return (weights * x_centred) @ (Y - weights @ Y) / (weights @ np.square(x_centred))
+
+
+def theil_sen_slopes(Y: np.ndarray, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Theil-Sen slope (median of all pairwise slopes) of every column of Y,
+    robust to a few outlying years.
+
+    Args:
+        Y: Array of shape (observations, series)
+        x: Regressor of length observations (default: 0, 1, 2, ...)
+
+    Returns:
+        np.ndarray: One slope per series
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = _steps(len(Y), x)
+    first, second = np.triu_indices(len(Y), k=1)
+    pairwise = (Y[second] - Y[first]) / (x[second] - x[first])[:, None]
+    return np.median(pairwise, axis=0)
+
+
+def recency_weights(n: int, half_life: float) -> np.ndarray:
+    """Exponential weights halving every ``half_life`` observations back from the latest."""
+    return 0.5 ** ((n - 1 - np.arange(n)) / half_life)
+
+
+def series_trends(Y: np.ndarray, method: str = 'ols', half_life: float = 3.0) -> np.ndarray:
+    """
+    Slope of every column of Y against the observation index.
+
+    Args:
+        Y: Array of shape (observations, series), e.g. years by sector proportions
+        method: 'ols', 'weighted' (recency-weighted least squares) or 'theil_sen'
+        half_life: Half-life in observations for the 'weighted' method
+
+    Returns:
+        np.ndarray: One slope per series; zeros when there are fewer than two observations
+    """
+    try:
+        Y = np.asarray(Y, dtype=float)
+        if len(Y) < 2:
+            return np.zeros(Y.shape[1])
+
+        if method == 'ols':
+            return ols_slopes(Y)
+        if method == 'weighted':
+            return weighted_slopes(Y, recency_weights(len(Y), half_life))
+        if method == 'theil_sen':
+            return theil_sen_slopes(Y)
+        raise ValueError(f"Unknown trend method: {method}")
+
+    except Exception as e:
+        logger.error(f"Error calculating trends: {str(e)}")
+        raise
@@ -0,0 +1,12 @@
+"""
+Production entry point.
+
+Importing this module loads (or trains) every model once. Under gunicorn with
+``preload_app`` that happens in the master process, and the forked workers
+share the loaded models copy-on-write:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app
+
+__all__ = ['app']